@@ -0,0 +1,341 @@
+"""Vectorised attendance analytics for a department/semester.
+
+Attendance is loaded once into a boolean cube indexed by
+(student, subject, session day) and every report is a handful of NumPy
+reductions over it:
+
+- per-student, per-subject attendance percentages,
+- defaulters below a threshold (75% by default),
+- a day-by-subject heatmap of the share of the class present.
+
+A session is one subject on one day, which matches how attendance is edited
+from the admin dashboard. Only days with at least one attendance record are
+known to have been held, so a class that nobody attended does not count
+against anyone.
+
+A department-wide report mixes classes (year/semester) that take different
+subjects, so each student is only counted against the sessions their own
+class had: those attended by anyone of the same year and semester. A
+student whose class is unknown is counted against the subjects they have
+records for.
+
+Usage: python analytics.py   (runs the 2k-student benchmark)
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from snapshot import UNKNOWN_PARTITION
+
+DEFAULT_DEFAULTER_THRESHOLD = 75.0
+
+
+def _encode(values, vocabulary=(), sort=False):
+    """Return (vocabulary, codes) for a sequence of strings.
+
+    Values not in `vocabulary` (e.g. the roster) are appended in order of
+    first appearance; with `sort` the result is ordered by value instead.
+    """
+    index = {value: i for i, value in enumerate(vocabulary)}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                        dtype=np.intp, count=len(values))
+    names = np.array(list(index), dtype=str)
+    if not sort:
+        return names, codes
+    order = np.argsort(names, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return names[order], rank[codes]
+
+
+def _round(values, digits=1):
+    """Percentages as JSON-friendly floats, with None for 'no sessions'."""
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def cohort(year=None, semester=None):
+    """Key of a class within a department; '' when neither is known."""
+    if year in (None, '') and semester in (None, ''):
+        return ''
+    return f"{'' if year is None else year}/{'' if semester is None else semester}"
+
+
+class AttendanceCube:
+    """present[student, subject, day] for one department/semester.
+
+    cohorts[student] indexes cohort_held[cohort, subject, day], the sessions
+    each class had; cohort 0 is 'unknown'.
+    """
+
+    def __init__(self, students, subjects, days, present, held, cohorts, cohort_held):
+        self.students = students
+        self.subjects = subjects
+        self.days = days
+        self.present = present
+        self.held = held
+        self.cohorts = cohorts
+        self.cohort_held = cohort_held
+
+    @classmethod
+    def from_columns(cls, student_ids, subjects, days, roster=(), cohorts=None, roster_cohorts=()):
+        """Build a cube from parallel columns, one entry per attendance record.
+
+        `days` are 'YYYY-MM-DD' strings. Students in `roster` appear in the
+        reports even if they never attended anything. `cohorts` are the
+        records' classes and `roster_cohorts` the roster's (see cohort());
+        the roster wins where both are known.
+        """
+        students, student_codes = _encode(student_ids, vocabulary=roster)
+        subject_names, subject_codes = _encode(subjects, sort=True)
+        day_names, day_codes = _encode(days, sort=True)
+
+        present = np.zeros((len(students), len(subject_names), len(day_names)), dtype=bool)
+        present[student_codes, subject_codes, day_codes] = True
+        held = present.any(axis=0)
+
+        roster_cohorts = list(roster_cohorts)
+        cohort_names, cohort_codes = _encode(roster_cohorts + list(cohorts or ()), vocabulary=('',))
+        student_cohorts = np.zeros(len(students), dtype=np.intp)
+        if cohorts is not None:
+            student_cohorts[student_codes] = cohort_codes[len(roster_cohorts):]
+        known = cohort_codes[:len(roster_cohorts)]
+        student_cohorts[:len(known)] = np.where(known > 0, known, student_cohorts[:len(known)])
+
+        cohort_held = np.zeros((len(cohort_names), len(subject_names), len(day_names)), dtype=bool)
+        cohort_held[student_cohorts[student_codes], subject_codes, day_codes] = True
+        return cls(students, subject_names, day_names, present, held, student_cohorts, cohort_held)
+
+    @property
+    def sessions_held(self):
+        """Number of sessions held per subject."""
+        return self.held.sum(axis=1)
+
+    def attended(self):
+        """Sessions attended per (student, subject)."""
+        return self.present.sum(axis=2)
+
+    def sessions_due(self):
+        """Sessions of each subject held for each student's own class, per (student, subject)."""
+        due = self.cohort_held.sum(axis=2)[self.cohorts]
+        unknown = self.cohorts == 0
+        if unknown.any():
+            due[unknown] = np.where(self.present[unknown].any(axis=2), self.sessions_held, 0)
+        return due
+
+    def percentages(self):
+        """Attendance percentage per (student, subject); NaN where the student's class had none."""
+        due = self.sessions_due()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(due > 0, self.attended() * 100.0 / due, np.nan)
+
+    def overall_percentages(self):
+        """Attendance percentage per student across the subjects of their class."""
+        due = self.sessions_due().sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(due > 0, self.present.sum(axis=(1, 2)) * 100.0 / due, np.nan)
+
+    def defaulters(self, threshold=DEFAULT_DEFAULTER_THRESHOLD):
+        """Students below `threshold` overall or in any subject, worst first.
+
+        Returns (student_indexes, below) where below[i, j] marks subject j as
+        under the threshold for the i-th returned student.
+        """
+        below = self.percentages() < threshold
+        overall = self.overall_percentages()
+        flagged = np.flatnonzero(below.any(axis=1) | (overall < threshold))
+        flagged = flagged[np.argsort(overall[flagged], kind='stable')]
+        return flagged, below[flagged]
+
+    def heatmap(self):
+        """Share of the class present, in percent, per (day, subject).
+
+        NaN where the subject was not held that day.
+        """
+        if not len(self.students):
+            return np.full((len(self.days), len(self.subjects)), np.nan)
+        rate = self.present.sum(axis=0).T * 100.0 / len(self.students)
+        return np.where(self.held.T, rate, np.nan)
+
+
+def _record_day(data):
+    """'YYYY-MM-DD' of an attendance document."""
+    if data.get('date'):
+        return data['date']
+    timestamp = data.get('timestamp')
+    if isinstance(timestamp, datetime):
+        return timestamp.strftime('%Y-%m-%d')
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp / 1000).strftime('%Y-%m-%d')
+    return None
+
+
+def load_cube(db, department, semester=None, year=None):
+    """Load one department's attendance and roster from Firestore.
+
+    Returns (cube, labels) where labels maps student id -> email or name.
+    """
+    student_ids, subjects, days, cohorts = [], [], [], []
+    labels = {}
+
+    # Single-field filters only; the rest is applied in memory so no
+    # composite index is needed.
+    for doc in db.collection('attendance').where('department', '==', department).stream():
+        data = doc.to_dict()
+        if semester and data.get('semester') != semester:
+            continue
+        if year and data.get('year') != year:
+            continue
+        day = _record_day(data)
+        if not day or not data.get('student_id') or not data.get('subject'):
+            continue
+        student_ids.append(data['student_id'])
+        subjects.append(data['subject'])
+        days.append(day)
+        cohorts.append(cohort(data.get('year'), data.get('semester')))
+        labels.setdefault(data['student_id'], data.get('student_email') or data.get('student_name', ''))
+
+    roster, roster_cohorts = [], []
+    for doc in db.collection('students').where('department', '==', department).stream():
+        data = doc.to_dict()
+        if semester and data.get('semester') != semester:
+            continue
+        if year and data.get('year') != year:
+            continue
+        roster.append(doc.id)
+        roster_cohorts.append(cohort(data.get('year'), data.get('semester')))
+        labels[doc.id] = data.get('email') or data.get('name') or labels.get(doc.id, '')
+
+    cube = AttendanceCube.from_columns(student_ids, subjects, days, roster=roster,
+                                       cohorts=cohorts, roster_cohorts=roster_cohorts)
+    return cube, labels
+
+
+def _matches(table, name, value):
+    """Row mask for `name == value` on a dictionary-encoded column."""
+    return np.asarray(table.codes(name)) == table.code_of(name, value)
+
+
+def _present(table, name):
+    """Row mask for rows where a dictionary-encoded column is not empty."""
+    return ~_matches(table, name, '')
+
+
+def load_cube_from_snapshot(snapshot, department, semester=None, year=None):
+    """Same as load_cube(), but from a snapshot.Snapshot with no Firestore reads."""
+    student_ids, subjects, days, cohorts = [], [], [], []
+    labels = {}
+
+    for partition in ([semester] if semester else snapshot.semesters):
+        table = snapshot.attendance(partition)
+        if table is None:
+            continue
+        mask = _matches(table, 'department', department)
+        if year:
+            mask &= _matches(table, 'year', year)
+        mask &= _present(table, 'student_id') & _present(table, 'subject') & ~np.isnat(table.column('day'))
+        ids = table.column('student_id', mask).tolist()
+        student_ids += ids
+        subjects += table.column('subject', mask).tolist()
+        days += table.column('day', mask).astype(str).tolist()
+        known = '' if partition == UNKNOWN_PARTITION else partition
+        cohorts += [cohort(year, known) for year in table.column('year', mask).tolist()]
+        labels.update(zip(ids, table.column('student_email', mask).tolist()))
+
+    students = snapshot.students()
+    mask = _matches(students, 'department', department)
+    if semester:
+        mask &= _matches(students, 'semester', semester)
+    if year:
+        mask &= _matches(students, 'year', year)
+    roster = students.column('id', mask).tolist()
+    roster_cohorts = [cohort(year, semester) for year, semester
+                      in zip(students.column('year', mask).tolist(), students.column('semester', mask).tolist())]
+    for student_id, email, name in zip(roster, students.column('email', mask).tolist(),
+                                       students.column('name', mask).tolist()):
+        labels[student_id] = email or name or labels.get(student_id, '')
+
+    cube = AttendanceCube.from_columns(student_ids, subjects, days, roster=roster,
+                                       cohorts=cohorts, roster_cohorts=roster_cohorts)
+    return cube, labels
+
+
+def percentages_report(cube, labels):
+    percentages = cube.percentages()
+    overall = cube.overall_percentages()
+    return {
+        'subjects': cube.subjects.tolist(),
+        'sessions': cube.sessions_held.tolist(),
+        'students': [{
+            'id': student_id,
+            'label': labels.get(student_id, ''),
+            'percentages': _round(percentages[i]),
+            'overall': _round(overall[i:i + 1])[0],
+        } for i, student_id in enumerate(cube.students.tolist())],
+    }
+
+
+def defaulters_report(cube, labels, threshold=DEFAULT_DEFAULTER_THRESHOLD):
+    flagged, below = cube.defaulters(threshold)
+    percentages = cube.percentages()
+    overall = cube.overall_percentages()
+    subjects = cube.subjects.tolist()
+    return {
+        'threshold': threshold,
+        'total_students': len(cube.students),
+        'defaulters': [{
+            'id': cube.students[i].item(),
+            'label': labels.get(cube.students[i].item(), ''),
+            'overall': _round(overall[i:i + 1])[0],
+            'subjects': [{'subject': subjects[j], 'percentage': round(float(percentages[i, j]), 1)}
+                         for j in np.flatnonzero(row)],
+        } for i, row in zip(flagged.tolist(), below)],
+    }
+
+
+def heatmap_report(cube):
+    return {
+        'days': cube.days.tolist(),
+        'subjects': cube.subjects.tolist(),
+        'values': [_round(row) for row in cube.heatmap()],
+    }
+
+
+def _benchmark(n_students=2000, n_subjects=6, n_sessions=40, attendance_rate=0.8, seed=7):
+    """Time cube construction and reports for a synthetic semester."""
+    rng = np.random.default_rng(seed)
+    roster = np.array([f'student-{i:05d}' for i in range(n_students)])
+    subject_names = np.array([f'Subject {j}' for j in range(n_subjects)])
+    # Each subject meets on its own set of days over a ~20 week semester
+    calendar = np.arange('2024-01-01', '2024-05-20', dtype='datetime64[D]').astype(str)
+    session_days = np.stack([np.sort(rng.choice(calendar, n_sessions, replace=False))
+                             for _ in range(n_subjects)])
+
+    mask = rng.random((n_students, n_subjects, n_sessions)) < attendance_rate
+    s, j, k = np.nonzero(mask)
+    # Plain lists, as they come out of Firestore documents
+    student_ids = roster[s].tolist()
+    subjects = subject_names[j].tolist()
+    days = session_days[j, k].tolist()
+
+    start = time.perf_counter()
+    cube = AttendanceCube.from_columns(student_ids, subjects, days, roster=roster.tolist())
+    built = time.perf_counter()
+    percentages = cube.percentages()
+    flagged, _ = cube.defaulters()
+    heatmap = cube.heatmap()
+    done = time.perf_counter()
+
+    assert percentages.shape == (n_students, n_subjects)
+    assert heatmap.shape == (len(cube.days), n_subjects)
+    assert (cube.sessions_held == n_sessions).all()
+    expected = mask.sum(axis=2) * 100.0 / n_sessions
+    assert np.allclose(percentages, expected)
+
+    print(f'{len(student_ids)} records, {n_students} students x {n_subjects} subjects x '
+          f'{n_sessions} sessions: build {(built - start) * 1000:.1f} ms, '
+          f'reports {(done - built) * 1000:.1f} ms, {len(flagged)} defaulters')
+
+
+if __name__ == '__main__':
+    _benchmark()
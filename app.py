@@ -1,23 +1,49 @@
-from flask import Flask, render_template, request, jsonify, session, redirect
+from flask import Flask, render_template, request, jsonify, session, redirect, send_from_directory, abort
 from flask_cors import CORS
 import os
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import firebase_admin
 from firebase_admin import credentials, auth, firestore, storage
 import qrcode
 from pathlib import Path
 import json
+import mimetypes
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 import uuid
 import secrets
 import base64
+import functools
 from dotenv import load_dotenv
+import analytics
+import applog
+from attendance_cache import AttendanceCache
+import build_assets
+import challan_jobs
+import fanout
+import fees
+import library
+import library_search
+import metrics
+import notifications
+from qr_sessions import QrSessionRegistry
+import ratelimit
+import replica
+import resilience
+import results_engine
+import scheduling
+from scheduler import Scheduler, parse_duration
+import snapshot
+from id_tokens import IdTokenVerifier, InvalidIdTokenError
 
 # Load environment variables
 load_dotenv()
 
+# Structured logging through a background queue; see applog.py
+logger = applog.configure_logging()
+
 # Initialize Firebase with error handling
 try:
     # Check if running on Render or another cloud provider
@@ -31,23 +57,41 @@ try:
         cred_path = os.environ.get('FIREBASE_CREDENTIALS_PATH', "attendmax-a79f3-firebase-adminsdk-fbsvc-5b7357bc6d.json")
         cred = credentials.Certificate(cred_path)
     
-    firebase_admin.initialize_app(cred)
-    print("Firebase initialized successfully")
+    # Without httpTimeout an Auth call can hang for minutes on a degraded backend
+    firebase_admin.initialize_app(cred, {'httpTimeout': resilience.AUTH_TIMEOUT_SECONDS})
+    logger.info("Firebase initialized successfully")
 except (ValueError, FileNotFoundError) as e:
     if isinstance(e, ValueError) and "already exists" in str(e):
         # App already initialized
-        print("Firebase app already initialized")
+        logger.info("Firebase app already initialized")
     else:
-        print(f"Error initializing Firebase: {str(e)}")
+        logger.error("Error initializing Firebase: %s", e)
         raise
 
+# ID tokens are verified locally; the signing keys are fetched once and cached
+FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID') or getattr(cred, 'project_id', None)
+id_token_verifier = IdTokenVerifier(FIREBASE_PROJECT_ID)
+# Web API key lets the login page exchange email/password for an ID token
+FIREBASE_WEB_API_KEY = os.environ.get('FIREBASE_WEB_API_KEY', '')
+# The email-only login path checks no password; it stays off unless explicitly enabled
+ALLOW_LEGACY_LOGIN = os.environ.get('ALLOW_LEGACY_LOGIN', 'false').lower() == 'true'
+
 # Initialize Firestore
+metrics.instrument_firebase()
+# Deadlines, read retries and circuit breakers; see resilience.py
+resilience.install()
 db = firestore.client()
 
 app = Flask(__name__, 
     static_folder='static',
     static_url_path='/static')
 
+# Behind N reverse proxies, take the client address from the hop the outermost
+# trusted proxy appended to X-Forwarded-For; the rest is client-controlled
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
 # Generate a secure random key at startup or use environment variable
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
@@ -59,6 +103,13 @@ CORS(app,
                            "allow_headers": ["Content-Type", "Authorization"]}},
      expose_headers=["Content-Type", "Authorization"])
 
+# Request latency, status and backend call metrics served at /metrics
+metrics.init_app(app)
+# One structured log line per request
+applog.init_app(app)
+# 503 + Retry-After for requests that hit an open circuit breaker
+resilience.init_app(app)
+
 # Ensure the directories exist
 os.makedirs('templates', exist_ok=True)
 os.makedirs('static', exist_ok=True)
@@ -66,44 +117,86 @@ os.makedirs('static/css', exist_ok=True)
 os.makedirs('static/js', exist_ok=True)
 os.makedirs('static/qr_codes', exist_ok=True)
 
-# Keep track of active QR codes in memory
-active_qr_codes = {}
+# Keep track of active QR codes in memory, indexed by class and creator
+qr_sessions = QrSessionRegistry()
 QR_CODE_EXPIRY_SECONDS = int(os.environ.get('QR_CODE_EXPIRY_SECONDS', 60))  # Default 60 seconds expiry time
+metrics.set_function(metrics.ACTIVE_QR_SESSIONS, lambda: len(qr_sessions))
+
+# Admission control for mark-attendance: token buckets per student and per
+# client IP (shared across workers when RATE_LIMIT_REDIS_URL is set) plus a
+# per-worker cap on requests in flight
+rate_limit_backend = ratelimit.backend_from_url(os.environ.get('RATE_LIMIT_REDIS_URL'))
+student_scan_limit = ratelimit.RateLimit(
+    'student_scan',
+    rate=float(os.environ.get('STUDENT_SCAN_RATE_PER_SECOND', 0.2)),
+    burst=int(os.environ.get('STUDENT_SCAN_BURST', 5)),
+    backend=rate_limit_backend)
+ip_scan_limit = ratelimit.RateLimit(
+    'ip_scan',
+    rate=float(os.environ.get('IP_SCAN_RATE_PER_SECOND', 20)),
+    burst=int(os.environ.get('IP_SCAN_BURST', 200)),
+    backend=rate_limit_backend)
+mark_attendance_concurrency = ratelimit.ConcurrencyLimit(
+    'mark_attendance',
+    int(os.environ.get('MARK_ATTENDANCE_MAX_IN_FLIGHT', 32)))
+
+# Kiosk uploads: scans are accepted from when the session's QR code was
+# generated until this long after it expired, so a lecture's worth of
+# offline scans can be uploaded later
+KIOSK_SCAN_WINDOW_SECONDS = int(os.environ.get('KIOSK_SCAN_WINDOW_SECONDS', 3 * 60 * 60))
+KIOSK_CLOCK_SKEW_SECONDS = int(os.environ.get('KIOSK_CLOCK_SKEW_SECONDS', 120))
+KIOSK_MAX_SCANS = 500
 
 def cleanup_expired_qr_codes():
     """Remove expired QR codes and their files"""
     while True:
         try:
-            current_time = datetime.now()
-            expired_codes = []
+            expired_codes = qr_sessions.expire()
             
-            print(f"Running cleanup, active QR codes: {list(active_qr_codes.keys())}")
-            
-            for qr_data, info in list(active_qr_codes.items()):
-                if (current_time - info['timestamp']).total_seconds() >= QR_CODE_EXPIRY_SECONDS:
-                    expired_codes.append(qr_data)
-                    # Remove the QR code file
-                    try:
-                        qr_file = Path('static') / 'qr_codes' / f'{qr_data}.png'
-                        if qr_file.exists():
-                            qr_file.unlink()
-                    except Exception as e:
-                        print(f"Error deleting QR code file: {str(e)}")
+            for qr_data in expired_codes:
+                logger.debug("Expiring QR code", extra={'qr_code': qr_data})
+                # Remove the QR code file
+                try:
+                    qr_file = Path('static') / 'qr_codes' / f'{qr_data}.png'
+                    if qr_file.exists():
+                        qr_file.unlink()
+                except Exception as e:
+                    logger.warning("Error deleting QR code file: %s", e)
             
-            # Remove expired codes from active_qr_codes
-            for code in expired_codes:
-                print(f"Expiring QR code: {code}")
-                active_qr_codes.pop(code, None)
+            logger.debug("QR cleanup pass", extra={'active': len(qr_sessions),
+                                                   'expired': len(expired_codes),
+                                                   'sample_rate': 0.05})
             
             time.sleep(5)  # Check every 5 seconds
         except Exception as e:
-            print(f"Error in cleanup thread: {str(e)}")
+            logger.exception("Error in cleanup thread")
             time.sleep(5)  # Continue even if there's an error
 
 # Start cleanup thread
 cleanup_thread = threading.Thread(target=cleanup_expired_qr_codes, daemon=True)
 cleanup_thread.start()
 
+# Local SQLite copy of the attendance collection for the admin list views,
+# kept current by a watermark-based background sync; see attendance_cache.py
+attendance_cache = AttendanceCache(
+    db,
+    path=os.environ.get('ATTENDANCE_CACHE_PATH', 'attendance_cache.sqlite3'),
+    interval=float(os.environ.get('ATTENDANCE_SYNC_INTERVAL_SECONDS', 5)))
+if os.environ.get('ATTENDANCE_CACHE', 'on').lower() == 'on':
+    attendance_cache.start()
+
+# In-memory replicas of the small reference collections, kept current by
+# snapshot listeners; handlers fall back to Firestore until they are ready
+reference_data = replica.ReferenceData(db)
+if os.environ.get('REFERENCE_REPLICAS', 'on').lower() == 'on':
+    reference_data.start()
+
+# Time-based status transitions (scheduled notifications going live, exams
+# starting and finishing), persisted in `scheduled_jobs`; one worker runs them
+job_scheduler = Scheduler(db)
+if os.environ.get('SCHEDULER', 'on').lower() == 'on':
+    job_scheduler.start()
+
 # Session configuration
 app.config.update(
     SESSION_COOKIE_SECURE=True,
@@ -130,6 +223,36 @@ def check_session():
     session['last_activity'] = datetime.now().timestamp()
     return True
 
+# Fingerprinted assets produced by build_assets.py; empty if the build step has not run
+asset_manifest = build_assets.load_manifest()
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+@app.context_processor
+def inject_asset_url():
+    def asset_url(path):
+        """URL of the built copy of a static file, or the file itself if not built"""
+        return f"/static/{asset_manifest.get(path, path)}"
+    return {'asset_url': asset_url}
+
+@app.route('/static/build/<path:filename>')
+def built_asset(filename):
+    """Serve fingerprinted assets, preferring pre-compressed variants"""
+    build_dir = os.path.join(app.static_folder, 'build')
+    accepted = request.headers.get('Accept-Encoding', '')
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accepted and os.path.isfile(os.path.join(build_dir, filename + suffix)):
+            response = send_from_directory(build_dir, filename + suffix, max_age=31536000)
+            response.headers['Content-Encoding'] = encoding
+            response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            break
+    else:
+        if not os.path.isfile(os.path.join(build_dir, filename)):
+            abort(404)
+        response = send_from_directory(build_dir, filename, max_age=31536000)
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -146,17 +269,84 @@ def login_page():
             return redirect('/admin/dashboard')
         elif role == 'student':
             return redirect('/student/dashboard')
-    return render_template('login.html')
+    return render_template('login.html', firebase_api_key=FIREBASE_WEB_API_KEY)
 
 @app.route('/get-qr-code')
 def get_qr_code():
     if not check_session():
         return jsonify({'error': 'Session expired'}), 401
         
-    if not active_qr_codes:
+    # The current code of the given class, or else of the caller's own session
+    class_args = [request.args.get(name) for name in ('department', 'year', 'semester', 'subject')]
+    if all(class_args):
+        current = qr_sessions.current_for_class(*class_args)
+    else:
+        current = qr_sessions.current_for_creator(session.get('user_id'))
+    if not current:
         return jsonify({'error': 'No active QR code'}), 404
-    latest_qr = max(active_qr_codes.items(), key=lambda x: x[1]['timestamp'])
-    return jsonify({'qr_data': latest_qr[0]})
+    return jsonify({'qr_data': current[0]})
+
+def start_user_session(uid, role, email):
+    """Create a session for an authenticated user"""
+    session.permanent = True
+    session['user_id'] = uid
+    session['role'] = role
+    session['email'] = email
+    session['last_activity'] = datetime.now().timestamp()
+
+def record_student_login(uid, email, display_name, claims):
+    """Ensure a logged-in student has a record in Firestore and stamp last_login"""
+    student_ref = db.collection('students').document(uid)
+
+    if reference_data.students.ready():
+        exists = reference_data.students.get(uid) is not None
+    else:
+        exists = student_ref.get().exists
+    if not exists:
+        # Claims only seed a new record; later class changes are made on the record itself
+        student_ref.set({
+            'uid': uid,
+            'email': email,
+            'name': display_name or email.split('@')[0],
+            'department': claims.get('department', 'Unknown'),
+            'year': claims.get('year', '1st Year'),
+            'created_at': datetime.now(),
+            'last_login': datetime.now()
+        })
+    else:
+        student_ref.set({
+            'uid': uid,
+            'email': email,
+            'last_login': datetime.now()
+        }, merge=True)
+
+def login_with_id_token(id_token, role):
+    """Log in with a Firebase ID token verified locally against cached signing keys"""
+    try:
+        claims = id_token_verifier.verify(id_token)
+    except InvalidIdTokenError as e:
+        logger.info("Rejected ID token: %s", e)
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid authentication token'
+        }), 401
+
+    if claims.get('role', '') != role:
+        return jsonify({
+            'status': 'error',
+            'message': f'Invalid role. You are not authorized as a {role}'
+        }), 403
+
+    email = claims.get('email', '')
+    start_user_session(claims['uid'], role, email)
+    if role == 'student':
+        record_student_login(claims['uid'], email, claims.get('name'), claims)
+
+    return jsonify({
+        'status': 'success',
+        'message': 'Login successful',
+        'role': role
+    })
 
 @app.route('/auth/login', methods=['POST'])
 def auth_login():
@@ -168,9 +358,27 @@ def auth_login():
                 'message': 'No data received'
             }), 400
 
+        id_token = data.get('idToken')
+        role = data.get('role')
+
+        if id_token and role:
+            return login_with_id_token(id_token, role)
+
+        if not ALLOW_LEGACY_LOGIN:
+            if data.get('password'):
+                # The login page posts the password when FIREBASE_WEB_API_KEY is unset
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Password login is disabled; sign in with Firebase instead'
+                }), 403
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        # Legacy email-only login; does not verify the password
         username = data.get('username')
         password = data.get('password')
-        role = data.get('role')
 
         if not all([username, password, role]):
             return jsonify({
@@ -182,7 +390,7 @@ def auth_login():
             user = auth.get_user_by_email(username)
             
             # Get user's custom claims to verify role
-            custom_claims = auth.get_user(user.uid).custom_claims or {}
+            custom_claims = user.custom_claims or {}
             user_role = custom_claims.get('role', '')
             
             if user_role != role:
@@ -191,39 +399,11 @@ def auth_login():
                     'message': f'Invalid role. You are not authorized as a {role}'
                 }), 403
             
-            # Create a session for the user
-            session.permanent = True
-            session['user_id'] = user.uid
-            session['role'] = role
-            session['email'] = username
-            session['last_activity'] = datetime.now().timestamp()
+            start_user_session(user.uid, role, username)
 
             # If this is a student, ensure they have a record in Firestore
             if role == 'student':
-                # Check if student record exists
-                student_ref = db.collection('students').document(user.uid)
-                student_doc = student_ref.get()
-
-                if not student_doc.exists:
-                    # Get department and year from custom claims or use defaults
-                    department = custom_claims.get('department', 'Unknown')
-                    year = custom_claims.get('year', '1st Year')
-                    
-                    # Create student record
-                    student_ref.set({
-                        'uid': user.uid,
-                        'email': username,
-                        'name': user.display_name or username.split('@')[0],
-                        'department': department,
-                        'year': year,
-                        'created_at': datetime.now(),
-                        'last_login': datetime.now()
-                    })
-                else:
-                    # Update last login time
-                    student_ref.update({
-                        'last_login': datetime.now()
-                    })
+                record_student_login(user.uid, username, user.display_name, custom_claims)
             
             return jsonify({
                 'status': 'success',
@@ -235,14 +415,9 @@ def auth_login():
                 'status': 'error',
                 'message': 'Invalid email or password'
             }), 401
-        except auth.InvalidIdTokenError:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid authentication token'
-            }), 401
             
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.exception("Login error")
         return jsonify({
             'status': 'error',
             'message': 'An error occurred during login'
@@ -272,12 +447,12 @@ def admin_stats():
         student_count = sum(1 for user in users.users if auth.get_user(user.uid).custom_claims.get('role') == 'student')
         
         # Get today's attendance count
-        today = datetime.now().date()
-        attendance_ref = db.collection('attendance').where('date', '>=', today).get()
+        today = datetime.now().strftime('%Y-%m-%d')
+        attendance_ref = db.collection('attendance').where('date', '==', today).get()
         today_attendance = len(list(attendance_ref))
         
         # Get active sessions count
-        active_sessions = len(active_qr_codes)
+        active_sessions = len(qr_sessions)
         
         return jsonify({
             'totalStudents': student_count,
@@ -285,7 +460,7 @@ def admin_stats():
             'activeSessions': active_sessions
         })
     except Exception as e:
-        print(f"Error fetching admin stats: {str(e)}")
+        logger.exception("Error fetching admin stats")
         return jsonify({'error': 'Failed to fetch statistics'}), 500
 
 @app.route('/api/admin/recent-activity')
@@ -305,7 +480,7 @@ def admin_recent_activity():
         
         return jsonify({'activities': activities})
     except Exception as e:
-        print(f"Error fetching recent activities: {str(e)}")
+        logger.exception("Error fetching recent activities")
         return jsonify({'error': 'Failed to fetch recent activities'}), 500
 
 @app.route('/api/admin/generate-qr', methods=['POST'])
@@ -339,7 +514,7 @@ def admin_generate_qr():
         qr_img.save(f)
     
     # Store QR data in memory with expiration time
-    active_qr_codes[qr_data] = {
+    qr_sessions.add(qr_data, {
         'department': department,
         'year': year,
         'semester': semester,
@@ -347,7 +522,13 @@ def admin_generate_qr():
         'timestamp': datetime.now(),
         'created_by': session.get('user_id'),
         'expires_at': datetime.now() + timedelta(seconds=QR_CODE_EXPIRY_SECONDS)
-    }
+    })
+    
+    # Persist the session so kiosk uploads can be validated after it leaves memory
+    try:
+        db.collection('qr_sessions').document(qr_data).set(qr_sessions.get(qr_data))
+    except Exception:
+        logger.warning("Error persisting QR session", extra={'qr_code': qr_data}, exc_info=True)
     
     return jsonify({
         'qrCodeUrl': f'/static/qr_codes/{qr_data}.png',
@@ -360,7 +541,7 @@ def get_qr_status(qr_data):
     if not check_session():
         return jsonify({'error': 'Unauthorized'}), 401
         
-    qr_info = active_qr_codes.get(qr_data)
+    qr_info = qr_sessions.get(qr_data)
     if not qr_info:
         return jsonify({
             'active': False,
@@ -405,7 +586,7 @@ def student_stats():
         })
         
     except Exception as e:
-        print(f"Error fetching stats: {str(e)}")
+        logger.exception("Error fetching stats")
         return jsonify({'error': 'Error fetching stats'}), 500
 
 @app.route('/api/student/subject-attendance')
@@ -417,17 +598,22 @@ def get_subject_attendance():
         # Get the current student's ID
         user_id = session.get('user_id')
         
-        # Get student data from Firestore
-        student_ref = db.collection('students').where('uid', '==', user_id).limit(1).get()
-        if not student_ref:
+        # Get student data from the replica, or Firestore
+        if reference_data.students.ready():
+            matches = reference_data.students.where(uid=user_id)[:1]
+            student_data = matches[0][1] if matches else None
+        else:
+            student_ref = db.collection('students').where('uid', '==', user_id).limit(1).get()
+            student_data = student_ref[0].to_dict() if student_ref else None
+        if not student_data:
             return jsonify({'error': 'Student not found'}), 404
             
-        student_data = student_ref[0].to_dict()
         student_id = student_data['id']
         
-        # Query Firestore for subject-wise attendance
-        attendance_ref = db.collection('attendance').where('student_id', '==', student_id).get()
-        subjects_ref = db.collection('subjects').where('department_id', '==', student_data['department_id']).get()
+        # Query Firestore for subject-wise attendance and the subjects together
+        attendance_ref, subjects_ref = fanout.gather(
+            db.collection('attendance').where('student_id', '==', student_id).get,
+            db.collection('subjects').where('department_id', '==', student_data['department_id']).get)
         
         # Count attendance per subject
         subject_attendance = {}
@@ -456,8 +642,14 @@ def get_subject_attendance():
             'subjects': subjects
         })
 
+    except fanout.DeadlineExceeded:
+        logger.warning("Timed out fetching subject attendance")
+        return jsonify({
+            'success': False,
+            'error': 'Timed out fetching subject attendance data'
+        }), 504
     except Exception as e:
-        print(f"Error fetching subject attendance: {str(e)}")
+        logger.exception("Error fetching subject attendance")
         return jsonify({
             'success': False,
             'error': 'Failed to fetch subject attendance data'
@@ -487,71 +679,73 @@ def student_attendance_history():
         return jsonify({'history': history})
         
     except Exception as e:
-        print(f"Error fetching attendance history: {str(e)}")
+        logger.exception("Error fetching attendance history")
         return jsonify({'error': 'Error fetching attendance history'}), 500
 
 @app.route('/api/student/mark-attendance', methods=['POST'])
+@ratelimit.admission_control(
+    concurrency=mark_attendance_concurrency,
+    limits=[(ip_scan_limit, ratelimit.client_ip),
+            (student_scan_limit, lambda: session.get('user_id'))])
 def student_mark_attendance():
-    print(f"Mark attendance request - Session: {session}")
     if not check_session() or session.get('role') != 'student':
-        print(f"Unauthorized - User ID in session: {'user_id' in session}, Role: {session.get('role')}")
+        applog.annotate_request(outcome='unauthorized')
         return jsonify({
             'success': False,
             'message': 'Unauthorized access. Please log in again.'
         }), 401
     
     data = request.get_json()
-    print(f"Request data: {data}")
     qr_data = data.get('qrData')
     
     if not qr_data:
-        print("Missing QR data in request")
+        applog.annotate_request(outcome='missing_qr_data')
         return jsonify({
             'success': False,
             'message': 'Invalid QR code data'
         }), 400
     
     try:
-        # Get student data from Firestore
+        # Get student data from the in-memory replica, falling back to Firestore
         student_ref = db.collection('students').document(session['user_id'])
-        student_doc = student_ref.get()
+        student_data = reference_data.students.get(session['user_id']) if reference_data.students.ready() else None
         
-        if not student_doc.exists:
-            print(f"Student record not found: {session['user_id']}")
-            # Try to create student record from Firebase Auth
-            try:
-                user = auth.get_user(session['user_id'])
-                custom_claims = user.custom_claims or {}
+        if student_data is None:
+            student_doc = student_ref.get()
+        
+            if not student_doc.exists:
+                logger.info("Student record not found, creating from Auth", extra={'uid': session['user_id']})
+                # Try to create student record from Firebase Auth
+                try:
+                    user = auth.get_user(session['user_id'])
+                    custom_claims = user.custom_claims or {}
                 
-                # Create student record
-                student_data = {
-                    'uid': user.uid,
-                    'email': user.email,
-                    'name': user.display_name or user.email.split('@')[0],
-                    'department': custom_claims.get('department', 'Unknown'),
-                    'year': custom_claims.get('year', '1st Year'),
-                    'created_at': datetime.now(),
-                    'last_login': datetime.now()
-                }
-                student_ref.set(student_data)
-                print(f"Created new student record for: {user.uid}")
-                student_doc = student_ref.get()
-            except Exception as e:
-                print(f"Error creating student record: {str(e)}")
-                return jsonify({
-                    'success': False,
-                    'message': 'Unable to verify student information. Please contact support.'
-                }), 500
+                    # Create student record
+                    student_data = {
+                        'uid': user.uid,
+                        'email': user.email,
+                        'name': user.display_name or user.email.split('@')[0],
+                        'department': custom_claims.get('department', 'Unknown'),
+                        'year': custom_claims.get('year', '1st Year'),
+                        'created_at': datetime.now(),
+                        'last_login': datetime.now()
+                    }
+                    student_ref.set(student_data)
+                    student_doc = student_ref.get()
+                except Exception as e:
+                    logger.exception("Error creating student record")
+                    return jsonify({
+                        'success': False,
+                        'message': 'Unable to verify student information. Please contact support.'
+                    }), 500
 
-        student_data = student_doc.to_dict()
+            student_data = student_doc.to_dict()
         
         # Check if QR code exists and is active
-        qr_info = active_qr_codes.get(qr_data)
-        print(f"Active QR codes: {list(active_qr_codes.keys())}")
-        print(f"QR info for {qr_data}: {qr_info}")
+        qr_info = qr_sessions.get(qr_data)
         
         if not qr_info:
-            print(f"QR code not found or expired: {qr_data}")
+            applog.annotate_request(outcome='unknown_qr')
             return jsonify({
                 'success': False,
                 'message': 'Invalid or expired QR code. Please ask your teacher to generate a new one.'
@@ -559,7 +753,7 @@ def student_mark_attendance():
             
         # Check if QR code has expired
         if datetime.now() > qr_info['expires_at']:
-            print(f"QR code expired: {qr_data}")
+            applog.annotate_request(outcome='expired_qr')
             return jsonify({
                 'success': False,
                 'message': 'QR code has expired. Please ask your teacher to generate a new one.'
@@ -568,7 +762,7 @@ def student_mark_attendance():
         # Check if student belongs to the correct department and year
         if (student_data.get('department') != qr_info['department'] or 
             student_data.get('year') != qr_info['year']):
-            print(f"Department/Year mismatch - Student: {student_data}, QR: {qr_info}")
+            applog.annotate_request(outcome='class_mismatch')
             return jsonify({
                 'success': False,
                 'message': 'This QR code is not for your class'
@@ -581,7 +775,7 @@ def student_mark_attendance():
         
         attendance_docs = attendance_query.get()
         if len(list(attendance_docs)) > 0:
-            print(f"Attendance already marked for student: {session['user_id']}")
+            applog.annotate_request(outcome='duplicate')
             return jsonify({
                 'success': False,
                 'message': 'You have already marked attendance for this class'
@@ -597,13 +791,14 @@ def student_mark_attendance():
             'year': qr_info['year'],
             'semester': qr_info['semester'],
             'subject': qr_info['subject'],
+            'date': datetime.now().strftime('%Y-%m-%d'),
             'timestamp': datetime.now()
         }
         
         # Add attendance record to Firestore
         try:
-            attendance_ref = db.collection('attendance').add(attendance_data)
-            print(f"Attendance marked successfully. Document ID: {attendance_ref[1].id}")
+            attendance_ref = attendance_cache.add(attendance_data)
+            applog.annotate_request(outcome='marked', attendance_id=attendance_ref[1].id)
         
             # Return subject and department info for better feedback
             return jsonify({
@@ -618,19 +813,157 @@ def student_mark_attendance():
                 }
             })
         except Exception as e:
-            print(f"Firestore error adding attendance: {str(e)}")
+            logger.exception("Firestore error adding attendance")
             return jsonify({
                 'success': False,
                 'message': 'Error saving attendance record. Please try again.'
             }), 500
         
     except Exception as e:
-        print(f"Error marking attendance: {str(e)}")
+        logger.exception("Error marking attendance")
         return jsonify({
             'success': False,
             'message': 'An error occurred while marking attendance. Please try again.'
         }), 500
 
+def _local_datetime(value):
+    """Naive local datetime, as stored by this app, from a Firestore value or epoch ms."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, datetime):
+        # Naive datetimes are written as-is and read back labelled UTC
+        return value.replace(tzinfo=None)
+    return value
+
+def load_qr_session(qr_data):
+    """A QR session from memory, or from Firestore once it has expired here."""
+    info = qr_sessions.get(qr_data)
+    if info is None:
+        doc = db.collection('qr_sessions').document(qr_data).get()
+        if not doc.exists:
+            return None
+        info = doc.to_dict()
+        info['timestamp'] = _local_datetime(info['timestamp'])
+        info['expires_at'] = _local_datetime(info['expires_at'])
+    return info
+
+@app.route('/api/kiosk/sessions/<qr_data>/scans', methods=['POST'])
+@ratelimit.admission_control(concurrency=mark_attendance_concurrency)
+def kiosk_mark_attendance(qr_data):
+    """Mark a batch of ID-card scans from a proctor's kiosk for one session.
+
+    Body: {"scans": [{"student_id": ..., "scanned_at": epoch ms or ISO 8601}]}.
+    Scans may be queued offline and uploaded later; each is checked against
+    the time the session was open, not the upload time. Attendance ids are
+    derived from the session and student, so re-uploading a batch is safe.
+    """
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    scans = data.get('scans')
+    if not isinstance(scans, list) or not scans:
+        return jsonify({'error': 'scans must be a non-empty list'}), 400
+    if len(scans) > KIOSK_MAX_SCANS:
+        return jsonify({'error': f'At most {KIOSK_MAX_SCANS} scans per upload'}), 400
+    
+    try:
+        qr_info = load_qr_session(qr_data)
+        if not qr_info:
+            return jsonify({'error': 'Unknown attendance session'}), 404
+        applog.annotate_request(qr_code=qr_data, scans=len(scans))
+        
+        opens_at = qr_info['timestamp'] - timedelta(seconds=KIOSK_CLOCK_SKEW_SECONDS)
+        closes_at = qr_info['expires_at'] + timedelta(seconds=KIOSK_SCAN_WINDOW_SECONDS)
+        latest_allowed = datetime.now() + timedelta(seconds=KIOSK_CLOCK_SKEW_SECONDS)
+        
+        # One pass over the batch: parse and place each scan in its session window
+        results = [None] * len(scans)
+        pending = {}
+        for i, scan in enumerate(scans):
+            student_id = scan.get('student_id') if isinstance(scan, dict) else None
+            try:
+                scanned_at = _local_datetime(scan.get('scanned_at')) if student_id else None
+            except (TypeError, ValueError, OverflowError):
+                scanned_at = None
+            if not isinstance(student_id, str) or not isinstance(scanned_at, datetime):
+                results[i] = {'student_id': student_id, 'status': 'invalid'}
+            elif not opens_at <= scanned_at <= min(closes_at, latest_allowed):
+                results[i] = {'student_id': student_id, 'status': 'outside_session'}
+            elif student_id in pending:
+                results[i] = {'student_id': student_id, 'status': 'duplicate'}
+            else:
+                pending[student_id] = (i, scanned_at)
+        
+        # The roster check and the already-marked check are independent reads
+        def load_students():
+            if reference_data.students.ready():
+                return {student_id: reference_data.students.get(student_id) for student_id in pending}
+            refs = [db.collection('students').document(student_id) for student_id in pending]
+            found = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists} if refs else {}
+            return {student_id: found.get(student_id) for student_id in pending}
+        
+        def load_marked():
+            query = db.collection('attendance').where('qr_code', '==', qr_data)
+            return {doc.to_dict().get('student_id') for doc in query.stream()}
+        
+        students, marked = fanout.gather(load_students, load_marked)
+        
+        records = []
+        for student_id, (i, scanned_at) in pending.items():
+            student_data = students.get(student_id)
+            if student_data is None:
+                status = 'unknown_student'
+            elif (student_data.get('department') != qr_info['department'] or
+                  student_data.get('year') != qr_info['year']):
+                status = 'not_in_class'
+            elif student_id in marked:
+                status = 'duplicate'
+            else:
+                status = 'marked'
+                records.append((f'{qr_data}_{student_id}', {
+                    'student_id': student_id,
+                    'student_email': student_data.get('email', ''),
+                    'student_name': student_data.get('name', ''),
+                    'qr_code': qr_data,
+                    'department': qr_info['department'],
+                    'year': qr_info['year'],
+                    'semester': qr_info['semester'],
+                    'subject': qr_info['subject'],
+                    'date': scanned_at.strftime('%Y-%m-%d'),
+                    'timestamp': scanned_at,
+                    'marked_by': session.get('user_id'),
+                    'source': 'kiosk'
+                }))
+            results[i] = {'student_id': student_id, 'status': status}
+        
+        attendance_cache.add_many(records)
+        
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        applog.annotate_request(outcome='kiosk_upload', **{f'scans_{k}': v for k, v in counts.items()})
+        return jsonify({
+            'success': True,
+            'session': {
+                'subject': qr_info['subject'],
+                'department': qr_info['department'],
+                'year': qr_info['year'],
+                'semester': qr_info['semester']
+            },
+            'counts': counts,
+            'results': results
+        })
+    except fanout.DeadlineExceeded:
+        logger.warning("Timed out validating kiosk scans")
+        return jsonify({'error': 'Timed out validating scans, please retry the upload'}), 504
+    except Exception as e:
+        logger.exception("Error marking kiosk attendance")
+        return jsonify({'error': 'Error saving attendance, please retry the upload'}), 500
+
 @app.route('/api/admin/attendance-records')
 def admin_attendance_records():
     if not check_session() or session.get('role') != 'admin':
@@ -644,6 +977,19 @@ def admin_attendance_records():
         subject = request.args.get('subject')
         date = request.args.get('date')
         
+        if attendance_cache.ready():
+            records = [{
+                'id': record['id'],
+                'student_email': record['student_email'],
+                'subject': record['subject'],
+                'department': record['department'],
+                'year': record['year'],
+                'semester': record['semester'] or '',
+                'timestamp': record['timestamp']
+            } for record in attendance_cache.records(department=department, year=year, semester=semester,
+                                                     subject=subject, date=date)]
+            return jsonify({'records': records})
+        
         # Build query - use only one where clause to avoid requiring composite indexes
         query = db.collection('attendance')
         
@@ -695,7 +1041,7 @@ def admin_attendance_records():
         return jsonify({'records': records})
         
     except Exception as e:
-        print(f"Error fetching attendance records: {str(e)}")
+        logger.exception("Error fetching attendance records")
         return jsonify({'error': 'Error fetching attendance records'}), 500
 
 # API endpoints for student management
@@ -713,12 +1059,11 @@ def get_students():
             custom_claims = user.custom_claims or {}
             if custom_claims.get('role') == 'student':
                 # Get additional student data from Firestore if available
-                student_data = {}
-                student_ref = db.collection('students').document(user.uid)
-                student_doc = student_ref.get()
-                
-                if student_doc.exists:
-                    student_data = student_doc.to_dict()
+                if reference_data.students.ready():
+                    student_data = reference_data.students.get(user.uid) or {}
+                else:
+                    student_doc = db.collection('students').document(user.uid).get()
+                    student_data = student_doc.to_dict() if student_doc.exists else {}
                 
                 students.append({
                     'id': user.uid,
@@ -731,7 +1076,7 @@ def get_students():
         
         return jsonify({'students': students})
     except Exception as e:
-        print(f"Error fetching students: {str(e)}")
+        logger.exception("Error fetching students")
         return jsonify({'error': 'Error fetching students'}), 500
 
 @app.route('/api/admin/students', methods=['POST'])
@@ -783,7 +1128,7 @@ def add_student():
             }
         })
     except Exception as e:
-        print(f"Error adding student: {str(e)}")
+        logger.exception("Error adding student")
         return jsonify({'error': f'Error adding student: {str(e)}'}), 500
 
 @app.route('/api/admin/students/<student_id>', methods=['PUT'])
@@ -827,7 +1172,7 @@ def update_student(student_id):
             'message': 'Student updated successfully'
         })
     except Exception as e:
-        print(f"Error updating student: {str(e)}")
+        logger.exception("Error updating student")
         return jsonify({'error': f'Error updating student: {str(e)}'}), 500
 
 @app.route('/api/admin/students/<student_id>', methods=['DELETE'])
@@ -844,17 +1189,33 @@ def delete_student(student_id):
         
         # Delete attendance records for this student
         attendance_refs = db.collection('attendance').where('student_id', '==', student_id).stream()
-        for doc in attendance_refs:
-            doc.reference.delete()
+        attendance_cache.delete(doc.reference for doc in attendance_refs)
         
         return jsonify({
             'success': True,
             'message': 'Student deleted successfully'
         })
     except Exception as e:
-        print(f"Error deleting student: {str(e)}")
+        logger.exception("Error deleting student")
         return jsonify({'error': f'Error deleting student: {str(e)}'}), 500
 
+def class_roster(department, year=None, semester=None):
+    """[(student_id, data)] of the students in a department, optionally one year/semester"""
+    if reference_data.students.ready():
+        class_students = reference_data.students.where(department=department)
+    else:
+        students_query = db.collection('students')
+        
+        # Apply only one filter to avoid composite index requirements
+        if department:
+            students_query = students_query.where('department', '==', department)
+        class_students = [(doc.id, doc.to_dict()) for doc in students_query.stream()]
+    
+    # Apply remaining filters in memory
+    return [(student_id, student_data) for student_id, student_data in class_students
+            if (not year or student_data.get('year') == year)
+            and (not semester or student_data.get('semester') == semester)]
+
 # API endpoints for attendance editing
 @app.route('/api/admin/attendance', methods=['GET'])
 def get_attendance():
@@ -875,71 +1236,74 @@ def get_attendance():
         date_obj = datetime.strptime(date, '%Y-%m-%d')
         next_day = date_obj + timedelta(days=1)
         
-        # Build query to get attendance records for the specified date and subject
-        # Use only subject filter to avoid requiring composite indexes
-        query = db.collection('attendance').where('subject', '==', subject)
+        def load_records():
+            if attendance_cache.ready():
+                return [{
+                    'id': record['id'],
+                    'student_id': record['student_id'],
+                    'student_email': record['student_email'],
+                    'timestamp': record['timestamp']
+                } for record in attendance_cache.records(department=department, year=year, semester=semester,
+                                                         subject=subject, date=date)]
+
+            # Build query to get attendance records for the specified date and subject
+            # Use only subject filter to avoid requiring composite indexes
+            records = []
+            query = db.collection('attendance').where('subject', '==', subject)
+            for doc in query.stream():
+                data = doc.to_dict()
+                
+                # Apply remaining filters in memory
+                if department and data.get('department') != department:
+                    continue
+                if year and data.get('year') != year:
+                    continue
+                if semester and data.get('semester') != semester:
+                    continue
+                
+                record_date = data['timestamp']
+                
+                # Check if the record is from the specified date
+                if date_obj <= record_date < next_day:
+                    records.append({
+                        'id': doc.id,
+                        'student_id': data['student_id'],
+                        'student_email': data['student_email'],
+                        'timestamp': data['timestamp'].timestamp() * 1000
+                    })
+            return records
         
-        # Get all records for the subject
-        records = []
-        for doc in query.stream():
-            data = doc.to_dict()
-            
-            # Apply remaining filters in memory
-            if department and data.get('department') != department:
-                continue
-            if year and data.get('year') != year:
-                continue
-            if semester and data.get('semester') != semester:
-                continue
-            
-            record_date = data['timestamp']
-            
-            # Check if the record is from the specified date
-            if date_obj <= record_date < next_day:
-                records.append({
-                    'id': doc.id,
-                    'student_id': data['student_id'],
-                    'student_email': data['student_email'],
-                    'timestamp': data['timestamp'].timestamp() * 1000
-                })
+        def load_class_students():
+            return class_roster(department, year, semester)
         
-        # Get all students that should be in this class
-        students_query = db.collection('students')
+        # The attendance records and the class roster are independent
+        records, class_students = fanout.gather(load_records, load_class_students)
         
-        # Apply only one filter to avoid composite index requirements
-        if department:
-            students_query = students_query.where('department', '==', department)
+        # Get user data from Firebase Auth, 100 users per call with the calls in parallel
+        student_ids = [student_id for student_id, _ in class_students]
+        users = {}
+        for result in fanout.gather(*[
+                functools.partial(auth.get_users, [auth.UidIdentifier(uid) for uid in student_ids[i:i + 100]])
+                for i in range(0, len(student_ids), 100)]):
+            users.update((user.uid, user) for user in result.users)
         
+        present = {record['student_id'] for record in records}
         students = []
-        for doc in students_query.stream():
-            student_id = doc.id
-            student_data = doc.to_dict()
-            
-            # Apply remaining filters in memory
-            if year and student_data.get('year') != year:
-                continue
-            if semester and student_data.get('semester') != semester:
+        for student_id, student_data in class_students:
+            user = users.get(student_id)
+            if user is None:
+                # Skip if user not found
                 continue
             
-            # Get user data from Firebase Auth
-            try:
-                user = auth.get_user(student_id)
-                
-                # Check if student has attendance for this class
-                is_present = any(record['student_id'] == student_id for record in records)
-                
-                students.append({
-                    'id': student_id,
-                    'name': user.display_name or '',
-                    'email': user.email or '',
-                    'department': student_data.get('department', ''),
-                    'year': student_data.get('year', ''),
-                    'semester': student_data.get('semester', ''),
-                    'status': 'present' if is_present else 'absent'
-                })
-            except:
-                # Skip if user not found
-                pass
+            students.append({
+                'id': student_id,
+                'name': user.display_name or '',
+                'email': user.email or '',
+                'department': student_data.get('department', ''),
+                'year': student_data.get('year', ''),
+                'semester': student_data.get('semester', ''),
+                'status': 'present' if student_id in present else 'absent'
+            })
         
         return jsonify({
             'subject': subject,
@@ -949,8 +1313,11 @@ def get_attendance():
             'date': date,
             'students': students
         })
+    except fanout.DeadlineExceeded:
+        logger.warning("Timed out fetching attendance")
+        return jsonify({'error': 'Timed out fetching attendance'}), 504
     except Exception as e:
-        print(f"Error fetching attendance: {str(e)}")
+        logger.exception("Error fetching attendance")
         return jsonify({'error': f'Error fetching attendance: {str(e)}'}), 500
 
 @app.route('/api/admin/attendance', methods=['POST'])
@@ -1017,13 +1384,14 @@ def update_attendance():
                     student_email = user.email
                     
                     # Create attendance record
-                    db.collection('attendance').add({
+                    attendance_cache.add({
                         'student_id': student_id,
                         'student_email': student_email,
                         'subject': subject,
                         'department': department or '',
                         'year': year or '',
                         'semester': semester or '',
+                        'date': date,
                         'timestamp': date_obj,
                         'modified_by': session.get('user_id'),
                         'modified_at': datetime.now()
@@ -1036,18 +1404,84 @@ def update_attendance():
             
             # If status is absent and records exist, delete them
             elif status == 'absent' and existing_records:
-                for record_ref in existing_records:
-                    record_ref.delete()
-                    updated_count += 1
+                updated_count += attendance_cache.delete(existing_records)
         
         return jsonify({
             'success': True,
             'message': f'Attendance updated successfully for {updated_count} students'
         })
     except Exception as e:
-        print(f"Error updating attendance: {str(e)}")
+        logger.exception("Error updating attendance")
         return jsonify({'error': f'Error updating attendance: {str(e)}'}), 500
 
+# Attendance analytics
+# 'snapshot' answers analytics from the latest `python snapshot.py` output
+# instead of Firestore; either can be picked per request with ?source=
+ANALYTICS_SOURCE = os.environ.get('ANALYTICS_SOURCE', 'firestore')
+
+def _analytics_cube():
+    """Load the cube for the department/semester/year in the query string"""
+    department = request.args.get('department')
+    if not department:
+        return None, (jsonify({'error': 'Department is required'}), 400)
+    filters = {'semester': request.args.get('semester'), 'year': request.args.get('year')}
+    
+    if request.args.get('source', ANALYTICS_SOURCE) == 'snapshot':
+        latest = snapshot.Snapshot.latest()
+        if latest is None:
+            return None, (jsonify({'error': 'No attendance snapshot available'}), 404)
+        applog.annotate_request(snapshot=latest.created_at)
+        return analytics.load_cube_from_snapshot(latest, department, **filters), None
+    return analytics.load_cube(db, department, **filters), None
+
+@app.route('/api/admin/analytics/percentages')
+def analytics_percentages():
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        loaded, error = _analytics_cube()
+        if error:
+            return error
+        return jsonify(analytics.percentages_report(*loaded))
+    except Exception as e:
+        logger.exception("Error computing attendance percentages")
+        return jsonify({'error': 'Error computing attendance percentages'}), 500
+
+@app.route('/api/admin/analytics/defaulters')
+def analytics_defaulters():
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        threshold = float(request.args.get('threshold', analytics.DEFAULT_DEFAULTER_THRESHOLD))
+    except ValueError:
+        return jsonify({'error': 'Threshold must be a number'}), 400
+    
+    try:
+        loaded, error = _analytics_cube()
+        if error:
+            return error
+        return jsonify(analytics.defaulters_report(*loaded, threshold=threshold))
+    except Exception as e:
+        logger.exception("Error computing defaulters")
+        return jsonify({'error': 'Error computing defaulters'}), 500
+
+@app.route('/api/admin/analytics/heatmap')
+def analytics_heatmap():
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        loaded, error = _analytics_cube()
+        if error:
+            return error
+        cube, _ = loaded
+        return jsonify(analytics.heatmap_report(cube))
+    except Exception as e:
+        logger.exception("Error computing attendance heatmap")
+        return jsonify({'error': 'Error computing attendance heatmap'}), 500
+
 # ERP Module Routes
 
 # Faculty Management
@@ -1057,8 +1491,11 @@ def get_faculty():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        faculty_ref = db.collection('faculty')
-        faculty = [doc.to_dict() for doc in faculty_ref.stream()]
+        if reference_data.faculty.ready():
+            faculty = [data for _, data in reference_data.faculty.all()]
+        else:
+            faculty_ref = db.collection('faculty')
+            faculty = [doc.to_dict() for doc in faculty_ref.stream()]
         return jsonify({'faculty': faculty})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1099,8 +1536,11 @@ def get_courses():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        courses_ref = db.collection('courses')
-        courses = [doc.to_dict() for doc in courses_ref.stream()]
+        if reference_data.courses.ready():
+            courses = [data for _, data in reference_data.courses.all()]
+        else:
+            courses_ref = db.collection('courses')
+            courses = [doc.to_dict() for doc in courses_ref.stream()]
         return jsonify({'courses': courses})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1145,6 +1585,11 @@ def get_timetable():
         year = request.args.get('year')
         semester = request.args.get('semester')
         
+        if reference_data.timetable.ready():
+            timetable = [data for _, data in reference_data.timetable.where(
+                department=department, year=year, semester=semester)]
+            return jsonify({'timetable': timetable})
+        
         timetable_ref = db.collection('timetable')
         query = timetable_ref
         
@@ -1175,22 +1620,38 @@ def update_timetable():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        timetable_ref = db.collection('timetable')
-        
-        # First, delete existing entries for this department/year/semester
-        existing_docs = timetable_ref.where('department', '==', data['department'])\
-                                   .where('year', '==', data['year'])\
-                                   .where('semester', '==', data['semester'])\
-                                   .stream()
-        for doc in existing_docs:
-            doc.reference.delete()
-        
-        # Add new timetable entries
+        # Validate every slot before touching the stored timetable
+        bookings = []
         for slot in data['slots']:
             if not all(key in slot for key in ['day', 'time', 'subject', 'faculty', 'room']):
                 return jsonify({'error': 'Invalid slot data'}), 400
-                
-            timetable_ref.add({
+            try:
+                bookings.append(scheduling.slot_booking(slot, data['department'], data['year'], data['semester']))
+            except ValueError as e:
+                return jsonify({'error': f'Invalid slot: {e}'}), 400
+        
+        timetable_ref = db.collection('timetable')
+        existing_docs = list(timetable_ref.where('department', '==', data['department'])\
+                                          .where('year', '==', data['year'])\
+                                          .where('semester', '==', data['semester'])\
+                                          .stream())
+        
+        # The class's current slots are being replaced, so they cannot clash
+        replaced = {doc.id for doc in existing_docs}
+        exclude = lambda booking: booking.ref in replaced
+        if reference_data.timetable.ready():
+            clashes = reference_data.timetable.clashes(bookings, exclude)
+        else:
+            clashes = scheduling.IntervalIndex(timetable_bookings()).clashes(bookings, exclude)
+        if clashes:
+            return jsonify({'error': 'Timetable has clashes', 'clashes': clashes}), 409
+        
+        # Replace the class's entries in one batch
+        batch = db.batch()
+        for doc in existing_docs:
+            batch.delete(doc.reference)
+        for slot in data['slots']:
+            entry = {
                 'department': data['department'],
                 'year': data['year'],
                 'semester': data['semester'],
@@ -1200,12 +1661,61 @@ def update_timetable():
                 'faculty': slot['faculty'],
                 'room': slot['room'],
                 'created_at': datetime.now()
-            })
+            }
+            # Kept so later clash checks see the slot's full length
+            if slot.get('duration') not in (None, ''):
+                entry['duration'] = slot['duration']
+            batch.set(timetable_ref.document(), entry)
+        batch.commit()
         
         return jsonify({'message': 'Timetable updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _bookings(collection, booking, unparsed=None):
+    """Bookings of every document of `timetable` or `exams`; ids that cannot be placed go to `unparsed`."""
+    replica_docs = getattr(reference_data, collection)
+    if replica_docs.ready():
+        docs = replica_docs.all()
+    else:
+        docs = [(doc.id, doc.to_dict()) for doc in db.collection(collection).stream()]
+    bookings = []
+    for doc_id, data in docs:
+        try:
+            bookings.append(booking(data, doc_id))
+        except ValueError:
+            if unparsed is not None:
+                unparsed.append(doc_id)
+    return bookings
+
+def timetable_bookings(unparsed=None):
+    return _bookings('timetable', scheduling.timetable_booking, unparsed)
+
+def exam_bookings(unparsed=None):
+    return _bookings('exams', scheduling.exam_booking, unparsed)
+
+@app.route('/api/timetable/clashes', methods=['GET'])
+def get_schedule_clashes():
+    """Every clash in the institution's timetable and exam schedule, optionally for one department."""
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        department = request.args.get('department')
+        unparsed = {'timetable': [], 'exams': []}
+        clashes = {
+            'timetable': scheduling.find_clashes(timetable_bookings(unparsed['timetable'])),
+            'exams': scheduling.find_clashes(exam_bookings(unparsed['exams']), weekly=False),
+        }
+        if department:
+            clashes = {kind: [clash for clash in reports if department in clash['departments']]
+                       for kind, reports in clashes.items()}
+        return jsonify({'clashes': clashes, 'total': sum(len(reports) for reports in clashes.values()),
+                        'unparsed': unparsed})
+    except Exception as e:
+        logger.exception("Error checking schedule clashes")
+        return jsonify({'error': str(e)}), 500
+
 # Examination Management
 @app.route('/api/exams', methods=['GET'])
 def get_exams():
@@ -1213,8 +1723,11 @@ def get_exams():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        exams_ref = db.collection('exams')
-        exams = [doc.to_dict() for doc in exams_ref.stream()]
+        if reference_data.exams.ready():
+            exams = [data for _, data in reference_data.exams.all()]
+        else:
+            exams_ref = db.collection('exams')
+            exams = [doc.to_dict() for doc in exams_ref.stream()]
         return jsonify({'exams': exams})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1234,8 +1747,16 @@ def schedule_exam():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        exams_ref = db.collection('exams')
-        exams_ref.add({
+        try:
+            starts_at = datetime.strptime(f"{data['date']} {data['time']}", '%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            return jsonify({'error': 'date must be YYYY-MM-DD and time HH:MM'}), 400
+        try:
+            ends_at = starts_at + parse_duration(data['duration'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        exam = {
             'name': data['name'],
             'type': data['type'],
             'department': data['department'],
@@ -1245,7 +1766,29 @@ def schedule_exam():
             'subjects': data['subjects'],
             'status': 'upcoming',
             'created_at': datetime.now()
-        })
+        }
+        # Optional: the exam halls, so they are checked for double-booking too
+        if 'room' in data and not isinstance(data['room'], str):
+            return jsonify({'error': 'room must be a room name'}), 400
+        if 'rooms' in data and not (isinstance(data['rooms'], list)
+                                    and all(isinstance(room, str) for room in data['rooms'])):
+            return jsonify({'error': 'rooms must be a list of room names'}), 400
+        for field in ('room', 'rooms'):
+            if data.get(field):
+                exam[field] = data[field]
+
+        booking = scheduling.exam_booking(exam)
+        if reference_data.exams.ready():
+            clashes = reference_data.exams.clashes([booking], weekly=False)
+        else:
+            clashes = scheduling.IntervalIndex(exam_bookings()).clashes([booking], weekly=False)
+        if clashes:
+            return jsonify({'error': 'Exam clashes with the schedule', 'clashes': clashes}), 409
+
+        exams_ref = db.collection('exams')
+        _, exam_ref = exams_ref.add(exam)
+        job_scheduler.schedule('start_exam', exam_ref.id, starts_at)
+        job_scheduler.schedule('complete_exam', exam_ref.id, ends_at)
         return jsonify({'message': 'Exam scheduled successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1258,6 +1801,11 @@ def get_results():
     
     try:
         results_ref = db.collection('results')
+        # Drafts are visible to admins only; students see their own published results
+        if session.get('role') != 'admin':
+            results_ref = results_ref.where('status', '==', 'published')
+        if session.get('role') == 'student':
+            results_ref = results_ref.where('student_email', '==', session.get('email'))
         results = [doc.to_dict() for doc in results_ref.stream()]
         return jsonify({'results': results})
     except Exception as e:
@@ -1278,26 +1826,120 @@ def upload_results():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        results_ref = db.collection('results')
+        results_ref = db.collection(results_engine.RESULTS)
+        now = datetime.now()
+        rows = []
         
-        # Validate results data
+        # Validate results data; grades are optional, POST /api/results/compute grades from marks
         for result in data['results']:
-            if not all(key in result for key in ['student_email', 'marks', 'grade']):
+            if not all(key in result for key in ['student_email', 'marks']):
                 return jsonify({'error': 'Invalid result data'}), 400
+            try:
+                marks = float(result['marks'])
+                max_marks = float(result.get('max_marks', data.get('max_marks', results_engine.DEFAULT_MAX_MARKS)))
+            except (TypeError, ValueError):
+                return jsonify({'error': f"Invalid marks for {result['student_email']}"}), 400
+            if max_marks <= 0 or not 0 <= marks <= max_marks:
+                return jsonify({'error': f"Invalid marks for {result['student_email']}"}), 400
             
-            results_ref.add({
+            row = {
                 'exam_name': data['exam_name'],
                 'department': data['department'],
                 'subject': data['subject'],
                 'student_email': result['student_email'],
-                'marks': result['marks'],
-                'grade': result['grade'],
+                'marks': marks,
+                'max_marks': max_marks,
                 'status': 'draft',
-                'created_at': datetime.now()
-            })
-        
-        return jsonify({'message': 'Results uploaded successfully'})
+                'created_at': now
+            }
+            if 'grade' in result:
+                row['grade'] = result['grade']
+            rows.append((results_engine.result_id(data['exam_name'], data['department'], data['subject'],
+                                                  result['student_email']), row))
+        
+        # One document per student and subject, so uploading a corrected sheet replaces rows;
+        # rows already published stay published until the exam is regraded
+        for start in range(0, len(rows), results_engine.BATCH_LIMIT):
+            chunk = rows[start:start + results_engine.BATCH_LIMIT]
+            published = {doc.id for doc in db.get_all([results_ref.document(result_id) for result_id, _ in chunk])
+                         if doc.exists and doc.to_dict().get('status') == 'published'}
+            batch = db.batch()
+            for result_id, row in chunk:
+                if result_id in published:
+                    row['status'] = 'published'
+                batch.set(results_ref.document(result_id), row)
+            batch.commit()
+        
+        return jsonify({'message': 'Results uploaded successfully', 'uploaded': len(rows)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def course_credits(department):
+    """{course code or name: credits} for a department's courses."""
+    if reference_data.courses.ready():
+        courses = [data for _, data in reference_data.courses.where(department=department)]
+    else:
+        courses = [doc.to_dict() for doc in db.collection('courses').where('department', '==', department).stream()]
+    credits = {}
+    for course in courses:
+        if course.get('credits') is not None:
+            for key in (course.get('name'), course.get('code')):
+                if key:
+                    credits[key] = course['credits']
+    return credits
+
+def _grade_exam(publish):
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    for field in ['exam_name', 'department']:
+        if not data.get(field):
+            return jsonify({'error': f'Missing required field: {field}'}), 400
+    try:
+        bands = results_engine.GradeBands.parse(data.get('bands'))
+        credits = dict(course_credits(data['department']), **(data.get('credits') or {}))
+        summary = results_engine.compute(db, data['exam_name'], data['department'], bands, credits, publish)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error grading results")
+        return jsonify({'error': str(e)}), 500
+    for field in ('computed_at', 'published_at'):
+        if isinstance(summary.get(field), datetime):
+            summary[field] = epoch_ms(summary[field])
+    return jsonify(summary)
+
+@app.route('/api/results/compute', methods=['POST'])
+def compute_results():
+    """Grade an exam's results from marks and compute SGPAs and statistics, leaving drafts unpublished."""
+    return _grade_exam(publish=False)
+
+@app.route('/api/results/publish', methods=['POST'])
+def publish_results():
+    """Grade an exam's results and publish every row, in batched writes."""
+    return _grade_exam(publish=True)
+
+@app.route('/api/results/stats', methods=['GET'])
+def get_results_stats():
+    """Class statistics of an exam, as saved by the last compute or publish."""
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    exam_name, department = request.args.get('exam_name'), request.args.get('department')
+    if not exam_name or not department:
+        return jsonify({'error': 'exam_name and department are required'}), 400
+    try:
+        doc = db.collection(results_engine.SUMMARIES).document(results_engine.document_id(exam_name, department)).get()
+        if not doc.exists:
+            return jsonify({'error': 'No statistics computed for this exam'}), 404
+        summary = doc.to_dict()
+        for field in ('computed_at', 'published_at'):
+            if isinstance(summary.get(field), datetime):
+                summary[field] = epoch_ms(summary[field])
+        return jsonify(summary)
     except Exception as e:
+        logger.exception("Error fetching results statistics")
         return jsonify({'error': str(e)}), 500
 
 # Library Management
@@ -1307,12 +1949,64 @@ def get_books():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        books_ref = db.collection('library_books')
-        books = [doc.to_dict() for doc in books_ref.stream()]
-        return jsonify({'books': books})
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(max(1, int(request.args.get('per_page', library_search.DEFAULT_PER_PAGE))),
+                       library_search.MAX_PER_PAGE)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+
+    try:
+        if reference_data.library_books.ready():
+            books = reference_data.library_books.all()
+        else:
+            books = [(doc.id, doc.to_dict()) for doc in db.collection('library_books').stream()]
+        books.sort(key=lambda book: (str(book[1].get('title') or '').casefold(), book[0]))
+        # Availability lives in shards, so only the page shown reads them
+        offset = (page - 1) * per_page
+        shown = library.availability(db, dict(books[offset:offset + per_page]))
+        return jsonify({
+            'books': [dict(book, id=book_id) for book_id, book in shown.items()],
+            'total': len(books),
+            'page': page,
+            'per_page': per_page
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/library/search', methods=['GET'])
+def search_books():
+    if not check_session():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(max(1, int(request.args.get('per_page', library_search.DEFAULT_PER_PAGE))),
+                       library_search.MAX_PER_PAGE)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+
+    try:
+        offset = (page - 1) * per_page
+        if not reference_data.library_books.ready():
+            # Indexing a one-off copy would read the whole catalog per request
+            response = jsonify({'error': 'Library search is not available yet, try again shortly'})
+            response.headers['Retry-After'] = str(replica.CHECK_INTERVAL_SECONDS)
+            return response, 503
+        total, hits = reference_data.library_books.search(query, offset, per_page)
+        books = library.availability(db, dict(hits))
+        return jsonify({
+            'books': [dict(books[book_id], id=book_id) for book_id, _ in hits],
+            'total': total,
+            'page': page,
+            'per_page': per_page
+        })
+    except Exception as e:
+        logger.exception("Error searching library books")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/library/books', methods=['POST'])
 def add_book():
     if not check_session() or session.get('role') != 'admin':
@@ -1327,22 +2021,135 @@ def add_book():
         for field in required_fields:
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        books_ref = db.collection('library_books')
-        books_ref.add({
+        try:
+            copies = int(data['copies'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'copies must be an integer'}), 400
+        if copies < 0:
+            return jsonify({'error': 'copies must not be negative'}), 400
+
+        book = {
             'title': data['title'],
             'author': data['author'],
             'isbn': data['isbn'],
             'category': data['category'],
-            'copies': data['copies'],
-            'available': data['copies'],
+            'copies': copies,
+            'available': copies,
+            # Live availability is kept in counter shards; see library.py
+            'shards': library.shard_count(copies),
             'status': 'available',
             'created_at': datetime.now()
-        })
-        return jsonify({'message': 'Book added successfully'})
+        }
+        book_ref = db.collection('library_books').document()
+        batch = db.batch()
+        batch.set(book_ref, book)
+        library.write_shards(batch, book_ref, copies, book['shards'])
+        batch.commit()
+        if reference_data.library_books.ready():
+            # Searchable here straight away; other workers index it from the listener
+            reference_data.library_books.put(book_ref.id, book)
+        return jsonify({'message': 'Book added successfully', 'id': book_ref.id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def loan_response(loan_id, loan):
+    loan = dict(loan, id=loan_id)
+    for field in ('created_at', 'updated_at', 'issued_at', 'due_at', 'returned_at', 'expires_at',
+                  'expired_at', 'cancelled_at'):
+        if isinstance(loan.get(field), datetime):
+            loan[field] = epoch_ms(loan[field])
+    return loan
+
+@app.route('/api/library/books/<book_id>/issue', methods=['POST'])
+def issue_book(book_id):
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('reservation_id'):
+            loan_id = data['reservation_id']
+            loan = library.issue_reservation(db, loan_id, book_id)
+        else:
+            if not data.get('student_id'):
+                return jsonify({'error': 'Missing required field: student_id'}), 400
+            loan_id, loan = library.issue(db, book_id, data['student_id'])
+        return jsonify({'message': 'Book issued successfully', 'loan': loan_response(loan_id, loan)})
+    except library.CirculationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception("Error issuing book")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/library/books/<book_id>/reserve', methods=['POST'])
+def reserve_book(book_id):
+    if not check_session() or session.get('role') not in ('admin', 'student'):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    student_id = data.get('student_id') if session.get('role') == 'admin' else session['user_id']
+    if not student_id:
+        return jsonify({'error': 'Missing required field: student_id'}), 400
+    try:
+        loan_id, loan = library.reserve(db, book_id, student_id)
+        job_scheduler.queue('expire_reservation', loan_id, loan['expires_at'])
+        return jsonify({'message': 'Book reserved successfully', 'loan': loan_response(loan_id, loan)})
+    except library.CirculationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception("Error reserving book")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/library/loans/<loan_id>/return', methods=['POST'])
+def return_book(loan_id):
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        loan = library.return_copy(db, loan_id)
+        return jsonify({'message': 'Book returned successfully', 'loan': loan_response(loan_id, loan)})
+    except library.CirculationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception("Error returning book")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/library/loans/<loan_id>/cancel', methods=['POST'])
+def cancel_book_reservation(loan_id):
+    if not check_session() or session.get('role') not in ('admin', 'student'):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        if session.get('role') == 'student':
+            loan = db.collection(library.LOANS).document(loan_id).get()
+            if not loan.exists or loan.to_dict().get('student_id') != session['user_id']:
+                return jsonify({'error': 'Reservation not found'}), 404
+        loan = library.cancel_reservation(db, loan_id)
+        return jsonify({'message': 'Reservation cancelled', 'loan': loan_response(loan_id, loan)})
+    except library.CirculationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception("Error cancelling reservation")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/library/loans', methods=['GET'])
+def get_loans():
+    """The caller's reservations and loans; admins pass ?student_id=. ?status=all includes history."""
+    if not check_session() or session.get('role') not in ('admin', 'student'):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    student_id = request.args.get('student_id') if session.get('role') == 'admin' else session['user_id']
+    if not student_id:
+        return jsonify({'error': 'student_id is required'}), 400
+    statuses = None if request.args.get('status') == 'all' else library.ACTIVE_STATUSES
+    try:
+        loans = [loan_response(doc.id, doc.to_dict())
+                 for doc in library.loans_query(db, student_id, statuses).stream()]
+        return jsonify({'loans': loans})
+    except Exception as e:
+        logger.exception("Error fetching loans")
+        return jsonify({'error': str(e)}), 500
+
 # Fees Management
 @app.route('/api/fees', methods=['GET'])
 def get_fees():
@@ -1371,20 +2178,26 @@ def generate_challan():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        fees_ref = db.collection('fees')
-        
+        try:
+            amount = fees.parse_amount(data['amount'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'amount must be a non-negative number'}), 400
+
         challan_id = str(uuid.uuid4())
-        fees_ref.add({
+        batch = db.batch()
+        # The challan and its rollup increment commit together
+        fees.add_challan(batch, db, challan_id, {
             'challan_id': challan_id,
             'student_email': data['student_email'],
             'department': data['department'],
             'year': data['year'],
             'semester': data['semester'],
-            'amount': data['amount'],
+            'amount': amount,
             'due_date': data['due_date'],
             'status': 'pending',
             'created_at': datetime.now()
         })
+        batch.commit()
         
         return jsonify({
             'message': 'Challan generated successfully',
@@ -1393,19 +2206,209 @@ def generate_challan():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/fees/challans/bulk', methods=['POST'])
+def generate_class_challans():
+    """Issue a semester challan to every student of a class, as a background job."""
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    for field in ['department', 'year', 'semester', 'amount', 'due_date']:
+        if not data.get(field) and data.get(field) != 0:
+            return jsonify({'error': f'Missing required field: {field}'}), 400
+    try:
+        amount = fees.parse_amount(data['amount'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'amount must be a non-negative number'}), 400
+
+    template = {
+        'amount': amount,
+        'due_date': data['due_date'],
+        'description': data.get('description', ''),
+        'printable': bool(data.get('printable')),
+    }
+    department, year, semester = data['department'], data['year'], data['semester']
+    try:
+        job_id = challan_jobs.start(db, department, year, semester, template,
+                                    functools.partial(class_roster, department, year, semester),
+                                    created_by=session.get('user_id'))
+        return jsonify({'job_id': job_id, 'status_url': f'/api/fees/challans/bulk/{job_id}'}), 202
+    except fees.FeeError as e:
+        return jsonify({'error': str(e), 'job_id': challan_jobs.job_id(department, year, semester)}), e.status
+    except Exception as e:
+        logger.exception("Error starting bulk challan job")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fees/challans/bulk/<job_id>', methods=['GET'])
+def get_class_challans_job(job_id):
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        doc = db.collection(challan_jobs.JOBS).document(job_id).get()
+        if not doc.exists:
+            return jsonify({'error': 'Job not found'}), 404
+        job = doc.to_dict()
+        for field in ('created_at', 'finished_at', 'updated_at'):
+            if isinstance(job.get(field), datetime):
+                job[field] = epoch_ms(job[field])
+        job.pop('heartbeat', None)
+        return jsonify(dict(job, id=job_id))
+    except Exception as e:
+        logger.exception("Error fetching bulk challan job")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fees/challans/<challan_id>/printable', methods=['GET'])
+def get_printable_challan(challan_id):
+    """The rendered PDF of a challan, for admins and the student it was issued to."""
+    if not check_session() or session.get('role') not in ('admin', 'student'):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        doc = db.collection(fees.FEES).document(challan_id).get()
+        if not doc.exists:
+            return jsonify({'error': 'Challan not found'}), 404
+        challan = doc.to_dict()
+        # Single challans from generate_challan only record the student's email
+        if session.get('role') == 'student' and not (
+                challan.get('student_id') == session['user_id']
+                or (challan.get('student_email') and challan.get('student_email') == session.get('email'))):
+            return jsonify({'error': 'Challan not found'}), 404
+        if not os.path.exists(challan_jobs.printable_path(challan_id)):
+            challan_jobs.render_challan(challan)
+        return send_from_directory(os.path.abspath(challan_jobs.CHALLAN_DIR), f'{challan_id}.pdf',
+                                   mimetype='application/pdf')
+    except Exception as e:
+        logger.exception("Error rendering printable challan")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fees/<challan_id>/status', methods=['POST'])
+def update_fee_status(challan_id):
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    if 'status' not in data:
+        return jsonify({'error': 'Missing required field: status'}), 400
+    try:
+        challan = fees.set_status(db, challan_id, data['status'])
+        return jsonify({'message': 'Challan status updated', 'challan_id': challan_id,
+                        'status': challan['status']})
+    except fees.FeeError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        logger.exception("Error updating challan status")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fees/summary', methods=['GET'])
+def get_fees_summary():
+    """Challan counts and amounts per status, from the fee_rollups documents."""
+    if not check_session() or session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        return jsonify(fees.summary(db, department=request.args.get('department'),
+                                    year=request.args.get('year'), semester=request.args.get('semester')))
+    except Exception as e:
+        logger.exception("Error fetching fees summary")
+        return jsonify({'error': str(e)}), 500
+
 # Notifications Management
+def current_student_class():
+    """(department, year) of the logged-in student"""
+    uid = session.get('user_id')
+    if reference_data.students.ready():
+        data = reference_data.students.get(uid) or {}
+    elif 'student_class' in session:
+        return tuple(session['student_class'])
+    else:
+        doc = db.collection('students').document(uid).get()
+        data = doc.to_dict() if doc.exists else {}
+        # Cached so polling without the replica costs no extra read
+        session['student_class'] = [data.get('department', ''), data.get('year', '')]
+    return data.get('department', ''), data.get('year', '')
+
+def notification_audience():
+    """Feed filter for the caller: admins see every notification"""
+    if session.get('role') == 'admin':
+        return {}
+    department, year = current_student_class()
+    return {'department': department, 'year': year}
+
+def parse_since(value):
+    """The `since` cursor (epoch ms) as a datetime, or None; ValueError if malformed"""
+    return notifications.since_datetime(value) if value not in (None, '') else None
+
+def epoch_ms(value):
+    return round(value.timestamp() * 1000, 3) if isinstance(value, datetime) else None
+
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
+    """Active notifications for the caller, newest first.
+
+    Pass the returned `cursor` back as `since` to get only newer items, oldest
+    first. `more` means the page was full: poll again straight away.
+    """
     if not check_session():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        notifications_ref = db.collection('notifications')
-        notifications = [doc.to_dict() for doc in notifications_ref.stream()]
-        return jsonify({'notifications': notifications})
+        since = parse_since(request.args.get('since'))
+        limit = min(int(request.args.get('limit', notifications.DEFAULT_LIMIT)), notifications.MAX_LIMIT)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'since must be epoch milliseconds and limit a number'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    try:
+        query = notifications.feed_query(db, since=since, **notification_audience()).limit(limit)
+        items = []
+        for doc in query.stream():
+            item = doc.to_dict()
+            item['id'] = doc.id
+            items.append(item)
+        if items:
+            # The newest item returned: first on the first page, last on polls
+            cursor = epoch_ms(items[-1 if since is not None else 0].get('published_at'))
+        else:
+            cursor = float(request.args['since']) if since is not None else None
+        return jsonify({'notifications': items, 'cursor': cursor,
+                        'more': since is not None and len(items) == limit})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/notifications/unread-count', methods=['GET'])
+def get_unread_notification_count():
+    """Notifications published after `since` (default: when the caller last marked them read)"""
+    if not check_session():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        since = parse_since(request.args.get('since', session.get('notifications_read_at')))
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'since must be epoch milliseconds'}), 400
+    
+    try:
+        return jsonify({'unread': notifications.unread_count(db, since=since, **notification_audience())})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/notifications/read', methods=['POST'])
+def mark_notifications_read():
+    """Remember in the session that everything up to `cursor` (default: now) has been seen"""
+    if not check_session():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        cursor = float(data.get('cursor') or datetime.now().timestamp() * 1000)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'cursor must be epoch milliseconds'}), 400
+    session['notifications_read_at'] = cursor
+    return jsonify({'success': True, 'cursor': cursor})
+
 @app.route('/api/notifications', methods=['POST'])
 def create_notification():
     if not check_session() or session.get('role') != 'admin':
@@ -1421,17 +2424,32 @@ def create_notification():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        scheduled_for = None
+        if data.get('scheduled_for'):
+            try:
+                scheduled_for = datetime.fromisoformat(data['scheduled_for'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'scheduled_for must be an ISO date or date-time'}), 400
+            if scheduled_for.tzinfo:
+                # Job times are naive UTC; convert rather than drop the offset
+                scheduled_for = scheduled_for.astimezone(timezone.utc).replace(tzinfo=None)
+
         notifications_ref = db.collection('notifications')
-        notifications_ref.add({
+        _, notification_ref = notifications_ref.add({
             'title': data['title'],
             'content': data['content'],
             'type': data['type'],
             'target_departments': data['target_departments'],
             'target_years': data['target_years'],
+            'audiences': notifications.audience_tokens(data['target_departments'], data['target_years']),
             'scheduled_for': data.get('scheduled_for'),
             'status': 'active' if not data.get('scheduled_for') else 'scheduled',
+            # Set when the notification goes live; feeds are ordered by it
+            'published_at': None if data.get('scheduled_for') else firestore.SERVER_TIMESTAMP,
             'created_at': datetime.now()
         })
+        if scheduled_for:
+            job_scheduler.schedule('activate_notification', notification_ref.id, scheduled_for)
         return jsonify({'message': 'Notification created successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1443,7 +2461,7 @@ def logout():
         session.clear()
         return redirect('/login')
     except Exception as e:
-        print(f"Error during logout: {str(e)}")
+        logger.exception("Error during logout")
         return redirect('/login')
 
 if __name__ == '__main__':
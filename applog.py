@@ -0,0 +1,159 @@
+"""Structured, non-blocking logging for the AttendMax API.
+
+Records are handed to a bounded in-memory queue and formatted/written by a
+single listener thread, so request threads never wait on stdout. Each
+request produces one JSON line with its timings and backend call counts.
+High-volume events can be sampled with the `sample_rate` extra.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from datetime import datetime, timezone
+
+from flask import g, request, session
+from prometheus_client import Counter
+
+import metrics
+
+LOGGER_NAME = 'attendmax'
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Fraction of successful request lines to keep; errors and slow requests are always logged
+LOG_REQUEST_SAMPLE_RATE = float(os.environ.get('LOG_REQUEST_SAMPLE_RATE', 1.0))
+LOG_SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))
+
+DROPPED_RECORDS = Counter(
+    'attendmax_log_records_dropped_total',
+    'Log records dropped because the log queue was full')
+
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line.
+
+    Anything passed through `extra=` (other than `sample_rate`) is emitted as
+    a top-level field.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key != 'sample_rate':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a record with probability `record.sample_rate` (default 1)."""
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and defers all formatting to the listener."""
+
+    def prepare(self, record):
+        # The listener runs in this process, so the record can be passed as is.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
+def configure_logging(level=None):
+    """Route the `attendmax` logger through a queue to a JSON stdout handler.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+    logger.addHandler(handler)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    metrics.register_queue('log_records', log_queue.qsize)
+    return logger
+
+
+def init_app(app):
+    """Emit one structured log line per request with timings and backend counts."""
+    logger = logging.getLogger(LOGGER_NAME + '.request')
+
+    @app.before_request
+    def _start_request_log():
+        g.log_start = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        start = g.pop('log_start', None)
+        if start is None or request.path == '/metrics':
+            return response
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        status = response.status_code
+        if status >= 500:
+            level, sample_rate = logging.ERROR, 1.0
+        elif status >= 400 or duration_ms >= LOG_SLOW_REQUEST_MS:
+            level, sample_rate = logging.WARNING, 1.0
+        else:
+            level, sample_rate = logging.INFO, LOG_REQUEST_SAMPLE_RATE
+        if not logger.isEnabledFor(level):
+            return response
+
+        fields = {
+            'method': request.method,
+            'endpoint': request.url_rule.rule if request.url_rule is not None else request.path,
+            'status': status,
+            'duration_ms': round(duration_ms, 2),
+            'role': session.get('role'),
+            'sample_rate': sample_rate,
+        }
+        stats = metrics.current_request_stats()
+        if stats is not None:
+            fields.update({
+                'firestore_reads': stats['firestore_reads'],
+                'firestore_writes': stats['firestore_writes'],
+                'auth_calls': stats['auth_calls'],
+                'backend_ms': round(stats['backend_seconds'] * 1000, 2),
+            })
+        fields.update(g.pop('log_fields', {}))
+        logger.log(level, 'request', extra=fields)
+        return response
+
+
+def annotate_request(**fields):
+    """Attach extra fields to the current request's log line."""
+    g.setdefault('log_fields', {}).update(fields)
@@ -0,0 +1,355 @@
+"""Local SQLite read cache of the `attendance` collection.
+
+A background thread pulls only documents whose `updated_at` is newer than a
+persisted watermark, so the Firestore read cost of keeping the cache current
+is proportional to new data, not to the size of the collection. The
+watermark advances to the read time of the query that returned the changes:
+`updated_at` is a server timestamp, and a query sees every commit up to its
+read time, so nothing is skipped and nothing is read twice. Deletes are
+propagated through tombstone documents in `attendance_tombstones`, written
+in the same batch as the delete. Each cache reports how far it has read the
+tombstones in `attendance_cache_syncers`, and tombstones every cache seen in
+the last TOMBSTONE_RETENTION_SECONDS has read are deleted. A cache that has
+not synced for that long reloads in full instead.
+
+Every attendance write must therefore go through AttendanceCache.add() /
+AttendanceCache.delete() (or set `updated_at` / write a tombstone itself).
+Writes are also applied to the local cache straight away, so the worker that
+made an edit sees it immediately; other workers see it after the next sync.
+
+Workers sharing one cache file elect a single syncer with a lease row, and
+readers fall back to Firestore (ready() is False) until a first full load
+has completed or when the last sync is older than MAX_STALENESS_SECONDS.
+Nothing touches the cache file until start(), so a disabled cache needs no
+writable filesystem.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from prometheus_client import Counter, Gauge
+
+import metrics
+
+TOMBSTONES = 'attendance_tombstones'
+SYNCERS = 'attendance_cache_syncers'
+# Caches not seen for this long are no longer waited for before tombstones
+# are deleted; one that comes back reloads in full
+TOMBSTONE_RETENTION_SECONDS = 7 * 24 * 3600
+PRUNE_INTERVAL_SECONDS = 3600
+# A full load has no server read time to start from, so its watermark is this
+# far before the local clock, in case the clock is ahead of the server's
+CLOCK_SKEW_SECONDS = 5
+# Firestore batches hold at most 500 writes
+BATCH_LIMIT = 500
+
+SYNCED_DOCUMENTS = Counter(
+    'attendmax_attendance_cache_synced_total',
+    'Attendance changes applied to the local cache by the syncer',
+    ['kind'])
+CACHE_AGE = Gauge(
+    'attendmax_attendance_cache_age_seconds',
+    'Seconds since the attendance cache last completed a sync',
+    multiprocess_mode='livemax')
+
+logger = logging.getLogger('attendmax.attendance_cache')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    id TEXT PRIMARY KEY,
+    student_id TEXT,
+    student_email TEXT,
+    student_name TEXT,
+    department TEXT,
+    year TEXT,
+    semester TEXT,
+    subject TEXT,
+    day TEXT,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS attendance_subject_day ON attendance (subject, day);
+CREATE INDEX IF NOT EXISTS attendance_department ON attendance (department, timestamp);
+CREATE INDEX IF NOT EXISTS attendance_timestamp ON attendance (timestamp);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ('id', 'student_id', 'student_email', 'student_name', 'department',
+            'year', 'semester', 'subject', 'day', 'timestamp')
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        # Naive datetimes are written as-is and read back labelled UTC
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, (int, float)):
+        return value / 1000
+    return None
+
+
+def _read_time(doc):
+    """When the query that returned `doc` read the database, if the client reports it."""
+    return _epoch(getattr(doc, 'read_time', None))
+
+
+def _row(doc_id, data):
+    timestamp = data.get('timestamp')
+    day = data.get('date')
+    if not day and isinstance(timestamp, datetime):
+        day = timestamp.strftime('%Y-%m-%d')
+    return (doc_id, data.get('student_id', ''), data.get('student_email', ''),
+            data.get('student_name', ''), data.get('department', ''), data.get('year', ''),
+            data.get('semester', ''), data.get('subject', ''), day, _epoch(timestamp))
+
+
+class AttendanceCache:
+    """Watermark-synced SQLite copy of `attendance` for list views."""
+
+    MAX_STALENESS_SECONDS = 60
+
+    def __init__(self, db, path, interval=5.0):
+        self.db = db
+        self.path = path
+        self.interval = interval
+        self.enabled = False
+        self._owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._local = threading.local()
+        metrics.set_function(CACHE_AGE, self._age)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # Sync state
+
+    def _get_state(self, name):
+        row = self._connect().execute('SELECT value FROM sync_state WHERE name = ?', (name,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_state(self, conn, **values):
+        conn.executemany('INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)',
+                         [(name, None if value is None else str(value)) for name, value in values.items()])
+
+    def _age(self):
+        if not self.enabled:
+            return float('inf')
+        last_sync = self._get_state('last_sync')
+        return time.time() - float(last_sync) if last_sync else float('inf')
+
+    def ready(self):
+        """True when the cache is enabled, fully loaded and recently synced."""
+        return self.enabled and self._age() <= self.MAX_STALENESS_SECONDS
+
+    def _acquire_lease(self):
+        """Become (or stay) the one worker that syncs this cache file."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            owner = self._get_state('lease_owner')
+            until = float(self._get_state('lease_until') or 0)
+            if owner not in (None, self._owner) and until > now:
+                return False
+            self._set_state(conn, lease_owner=self._owner, lease_until=now + self.interval * 3)
+        return True
+
+    # Sync
+
+    def sync_once(self):
+        """Pull changes since the watermark; a full load if there is none."""
+        watermark = self._get_state('watermark')
+        # Tombstones this cache had not read may have been pruned meanwhile
+        if watermark is None or self._age() > TOMBSTONE_RETENTION_SECONDS:
+            self._full_load()
+            return
+
+        since = datetime.fromtimestamp(float(watermark), timezone.utc)
+        newest = float(watermark)
+        rows = []
+        updated = {}
+        query = self.db.collection('attendance').where('updated_at', '>', since).order_by('updated_at')
+        for doc in query.stream():
+            data = doc.to_dict()
+            rows.append(_row(doc.id, data))
+            updated[doc.id] = _epoch(data.get('updated_at')) or newest
+            newest = max(newest, updated[doc.id], _read_time(doc) or 0)
+
+        tombstone_mark = float(self._get_state('tombstone_watermark') or watermark)
+        since = datetime.fromtimestamp(tombstone_mark, timezone.utc)
+        deleted = []
+        query = self.db.collection(TOMBSTONES).where('deleted_at', '>', since).order_by('deleted_at')
+        for doc in query.stream():
+            data = doc.to_dict()
+            attendance_id = data.get('attendance_id', doc.id)
+            deleted_at = _epoch(data.get('deleted_at')) or tombstone_mark
+            # A document recreated under the same id after its delete wins
+            if updated.get(attendance_id, 0) <= deleted_at:
+                deleted.append((attendance_id,))
+            tombstone_mark = max(tombstone_mark, deleted_at, _read_time(doc) or 0)
+
+        conn = self._connect()
+        with conn:
+            self._upsert_rows(conn, rows)
+            conn.executemany('DELETE FROM attendance WHERE id = ?', deleted)
+            self._set_state(conn, watermark=newest, tombstone_watermark=tombstone_mark, last_sync=time.time())
+        SYNCED_DOCUMENTS.labels(kind='upsert').inc(len(rows))
+        SYNCED_DOCUMENTS.labels(kind='delete').inc(len(deleted))
+
+    def _full_load(self):
+        started = time.time()
+        newest = None
+        rows = []
+        for doc in self.db.collection('attendance').stream():
+            data = doc.to_dict()
+            rows.append(_row(doc.id, data))
+            updated_at = _epoch(data.get('updated_at'))
+            if updated_at is not None:
+                newest = updated_at if newest is None else max(newest, updated_at)
+
+        # Older documents have no updated_at; anything written from now on does
+        floor = started - CLOCK_SKEW_SECONDS
+        watermark = newest if newest is not None else floor
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM attendance')
+            self._upsert_rows(conn, rows)
+            self._set_state(conn, watermark=watermark, tombstone_watermark=floor, last_sync=time.time())
+        SYNCED_DOCUMENTS.labels(kind='full_load').inc(len(rows))
+        logger.info("Attendance cache loaded", extra={'documents': len(rows),
+                                                      'seconds': round(time.time() - started, 2)})
+
+    def _prune_tombstones(self):
+        """Report how far this cache has read the tombstones; delete those every cache has read."""
+        now = time.time()
+        mark = float(self._get_state('tombstone_watermark'))
+        cache_id = self._get_state('cache_id')
+        if cache_id is None:
+            cache_id = uuid.uuid4().hex
+            conn = self._connect()
+            with conn:
+                self._set_state(conn, cache_id=cache_id)
+        syncers = self.db.collection(SYNCERS)
+        syncers.document(cache_id).set({'tombstone_watermark': mark, 'seen_at': now})
+
+        horizon = mark
+        for doc in syncers.stream():
+            data = doc.to_dict()
+            if now - data.get('seen_at', 0) > TOMBSTONE_RETENTION_SECONDS:
+                doc.reference.delete()
+            else:
+                horizon = min(horizon, data.get('tombstone_watermark', 0))
+
+        since = datetime.fromtimestamp(horizon, timezone.utc)
+        query = self.db.collection(TOMBSTONES).where('deleted_at', '<', since).limit(BATCH_LIMIT)
+        pruned = 0
+        while True:
+            refs = [doc.reference for doc in query.stream()]
+            if refs:
+                batch = self.db.batch()
+                for ref in refs:
+                    batch.delete(ref)
+                batch.commit()
+                pruned += len(refs)
+            if len(refs) < BATCH_LIMIT:
+                break
+        conn = self._connect()
+        with conn:
+            self._set_state(conn, pruned_at=now)
+        SYNCED_DOCUMENTS.labels(kind='tombstone_pruned').inc(pruned)
+
+    @staticmethod
+    def _upsert_rows(conn, rows):
+        conn.executemany(f"INSERT OR REPLACE INTO attendance ({', '.join(_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_lease():
+                    self.sync_once()
+                    if time.time() - float(self._get_state('pruned_at') or 0) > PRUNE_INTERVAL_SECONDS:
+                        self._prune_tombstones()
+            except Exception:
+                logger.exception("Error syncing attendance cache")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Create the cache file, start the background syncer and let readers use the cache."""
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.enabled = True
+        threading.Thread(target=self._run, name='attendance-cache-sync', daemon=True).start()
+
+    # Write-through
+
+    def add(self, data):
+        """Add an attendance document; returns what CollectionReference.add() does."""
+        result = self.db.collection('attendance').add(dict(data, updated_at=firestore.SERVER_TIMESTAMP))
+        if self.enabled:
+            conn = self._connect()
+            with conn:
+                self._upsert_rows(conn, [_row(result[1].id, data)])
+        return result
+
+    def add_many(self, records):
+        """Write (doc_id, data) attendance documents in batched commits.
+
+        set() rather than create(), so re-sending the same ids is harmless.
+        """
+        records = list(records)
+        collection = self.db.collection('attendance')
+        for start in range(0, len(records), BATCH_LIMIT):
+            batch = self.db.batch()
+            for doc_id, data in records[start:start + BATCH_LIMIT]:
+                batch.set(collection.document(doc_id), dict(data, updated_at=firestore.SERVER_TIMESTAMP))
+            batch.commit()
+        if self.enabled:
+            conn = self._connect()
+            with conn:
+                self._upsert_rows(conn, [_row(doc_id, data) for doc_id, data in records])
+        return len(records)
+
+    def delete(self, refs):
+        """Delete attendance documents, leaving tombstones for other caches."""
+        refs = list(refs)
+        for start in range(0, len(refs), BATCH_LIMIT // 2):
+            batch = self.db.batch()
+            for ref in refs[start:start + BATCH_LIMIT // 2]:
+                batch.delete(ref)
+                batch.set(self.db.collection(TOMBSTONES).document(ref.id),
+                          {'attendance_id': ref.id, 'deleted_at': firestore.SERVER_TIMESTAMP})
+            batch.commit()
+        if self.enabled:
+            conn = self._connect()
+            with conn:
+                conn.executemany('DELETE FROM attendance WHERE id = ?', [(ref.id,) for ref in refs])
+        return len(refs)
+
+    # Reads
+
+    def records(self, department=None, year=None, semester=None, subject=None, date=None):
+        """Matching attendance rows, newest first, with millisecond timestamps."""
+        clauses, params = [], []
+        for column, value in (('department', department), ('year', year), ('semester', semester),
+                              ('subject', subject), ('day', date)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        cursor = self._connect().execute(
+            f'SELECT * FROM attendance {where} ORDER BY timestamp DESC', params)
+        return [dict(row, timestamp=row['timestamp'] * 1000 if row['timestamp'] is not None else None)
+                for row in cursor]
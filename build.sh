@@ -7,4 +7,6 @@ export PYTHON_VERSION=3.9.12
 
 # Install dependencies
 pip install --upgrade pip
-pip install -r requirements.txt 
\ No newline at end of file
+pip install -r requirements.txt 
+# Minify, fingerprint and pre-compress static assets
+python build_assets.py
@@ -0,0 +1,254 @@
+"""Build fingerprinted, minified and pre-compressed copies of static assets.
+
+Every file under static/ (except generated QR codes) is copied to
+static/build/ with a content hash in its name, e.g.
+js/admin-dashboard.js -> build/js/admin-dashboard.3fa2c91b0d.js. CSS and JS
+are minified first, and text assets get .gz (and .br when the Brotli package
+is installed) siblings. build/manifest.json maps logical names to built
+ones; app.py uses it for asset_url() and serves build/ with immutable
+caching.
+
+Usage: python build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+BUILD_DIR = STATIC_DIR / 'build'
+MANIFEST_NAME = 'manifest.json'
+SKIP_DIRS = {'build', 'qr_codes'}
+COMPRESSIBLE = {'.css', '.js', '.html', '.svg', '.json', '.txt'}
+# Compressed copies that are not meaningfully smaller are not worth serving
+MIN_COMPRESSION_GAIN = 0.95
+
+# Characters after which a '/' starts a regular expression rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'instanceof', 'new', 'delete', 'void', 'throw'}
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace in a stylesheet."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    # Only trailing space after ':' is safe to drop ('a :hover' differs from 'a:hover')
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def _skip_string(source, i):
+    """Return the index just past the quoted string starting at source[i]."""
+    quote = source[i]
+    j = i + 1
+    while j < len(source) and source[j] != quote:
+        j += 2 if source[j] == '\\' else 1
+    return j + 1
+
+
+def _skip_template(source, i):
+    """Return the index just past the template literal starting at source[i].
+
+    Handles ${...} substitutions, including templates nested inside them.
+    """
+    n = len(source)
+    j = i + 1
+    while j < n:
+        c = source[j]
+        if c == '\\':
+            j += 2
+        elif c == '`':
+            return j + 1
+        elif c == '$' and source[j + 1:j + 2] == '{':
+            depth = 1
+            j += 2
+            while j < n and depth:
+                c = source[j]
+                if c in '\'"':
+                    j = _skip_string(source, j)
+                    continue
+                if c == '`':
+                    j = _skip_template(source, j)
+                    continue
+                if c == '{':
+                    depth += 1
+                elif c == '}':
+                    depth -= 1
+                j += 1
+        else:
+            j += 1
+    return j
+
+
+def minify_js(source):
+    """Conservatively minify JavaScript.
+
+    Removes comments, indentation and blank lines while leaving string,
+    template and regex literals untouched. Line breaks are kept so automatic
+    semicolon insertion behaves exactly as in the original.
+    """
+    out = []
+    i = 0
+    n = len(source)
+    last_significant = ''
+    last_word = ''
+    at_line_start = True
+
+    while i < n:
+        ch = source[i]
+
+        if ch == '\n':
+            if out and out[-1] == ' ':
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n')
+            at_line_start = True
+            i += 1
+            continue
+        if ch in ' \t\r':
+            j = i
+            while j < n and source[j] in ' \t\r':
+                j += 1
+            if not at_line_start and j < n and source[j] != '\n':
+                out.append(' ')
+            i = j
+            continue
+
+        at_line_start = False
+        nxt = source[i + 1] if i + 1 < n else ''
+
+        if ch == '/' and nxt == '/':
+            while i < n and source[i] != '\n':
+                i += 1
+            continue
+        if ch == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+
+        if ch in '\'"`':
+            j = _skip_template(source, i) if ch == '`' else _skip_string(source, i)
+            out.append(source[i:j])
+            i = j
+            last_significant, last_word = ch, ''
+            continue
+
+        if ch == '/' and (last_significant in _REGEX_PRECEDERS or last_significant == '' or
+                          last_word in _REGEX_KEYWORDS):
+            j = i + 1
+            in_class = False
+            while j < n and source[j] != '\n':
+                c = source[j]
+                if c == '\\':
+                    j += 2
+                    continue
+                if c == '[':
+                    in_class = True
+                elif c == ']':
+                    in_class = False
+                elif c == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (source[j].isalpha()):
+                j += 1
+            out.append(source[i:j])
+            i = j
+            last_significant, last_word = '/', ''
+            continue
+
+        if ch.isalnum() or ch in '_$':
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in '_$'):
+                j += 1
+            last_word = source[i:j]
+            out.append(last_word)
+            last_significant = last_word[-1]
+            i = j
+            continue
+
+        out.append(ch)
+        last_significant, last_word = ch, ''
+        i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_compressed(path, data):
+    """Write .gz/.br siblings of `path` when they are worth serving."""
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data) * MIN_COMPRESSION_GAIN:
+        path.with_name(path.name + '.gz').write_bytes(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data) * MIN_COMPRESSION_GAIN:
+            path.with_name(path.name + '.br').write_bytes(br)
+
+
+def iter_sources(static_dir=STATIC_DIR):
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not (Path(root) == static_dir and d in SKIP_DIRS))
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield Path(root) / name
+
+
+def build(static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    """Rebuild build_dir from static_dir and return the manifest."""
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True)
+
+    manifest = {}
+    total_in = total_out = 0
+    for source in iter_sources(static_dir):
+        logical = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        minify = MINIFIERS.get(source.suffix)
+        if minify is not None:
+            data = minify(data.decode('utf-8')).encode('utf-8')
+
+        built_name = f'{source.stem}.{fingerprint(data)}{source.suffix}'
+        target = build_dir / source.parent.relative_to(static_dir) / built_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if source.suffix in COMPRESSIBLE:
+            write_compressed(target, data)
+
+        manifest[logical] = target.relative_to(static_dir).as_posix()
+        total_in += source.stat().st_size
+        total_out += len(data)
+
+    (build_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    print(f"Built {len(manifest)} assets: {total_in} -> {total_out} bytes before compression"
+          f"{'' if brotli else ' (Brotli not installed, gzip only)'}")
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Return the logical -> built name mapping, or {} if assets were not built."""
+    try:
+        with open(static_dir / 'build' / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+if __name__ == '__main__':
+    build()
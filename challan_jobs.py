@@ -0,0 +1,222 @@
+"""Background jobs that issue a semester's fee challans to a whole class.
+
+A job resolves the class roster, then works through it CHUNK_SIZE students
+at a time. For each chunk it reads which challans already exist (one
+get_all), then writes the missing challans, plus one rollup increment, in a
+single batch. Each student's challan has a deterministic id (see
+fees.class_challan_id), so rerunning a job, or resuming one that died
+with its worker, never issues anyone a second challan for the same
+semester.
+
+Progress (processed / created / skipped / rendered) is saved on the job
+document in `fee_jobs` after every chunk, so any worker can report it.
+There is one job document per class and semester, and only one run of it
+can be active at a time. Each run stamps its `run_id` on the document when
+it claims it, and only writes progress while the stamp is still its own, so
+a run presumed dead and taken over stops instead of overwriting the new
+run's progress.
+
+With `printable`, every challan in the class is also rendered to a one-page
+PDF under CHALLAN_DIR. The pages of a chunk are rendered in parallel.
+"""
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+import fees
+
+JOBS = 'fee_jobs'
+# Challans plus one rollup write stay well within a 500-write batch
+CHUNK_SIZE = 250
+# A running job that has not saved progress for this long is presumed dead
+STALE_SECONDS = 300
+# Times a chunk is re-read and retried when another run created some of its challans first
+CHUNK_ATTEMPTS = 3
+ACTIVE_STATUSES = ('queued', 'running')
+
+CHALLAN_DIR = os.environ.get('CHALLAN_DIR', 'challans')
+RENDER_WORKERS = int(os.environ.get('CHALLAN_RENDER_WORKERS', 4))
+
+logger = logging.getLogger('attendmax.challan_jobs')
+
+_jobs = ThreadPoolExecutor(max_workers=2, thread_name_prefix='challan-job')
+_renderers = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='challan-render')
+
+
+class _TakenOver(Exception):
+    """Another run has claimed the job document."""
+
+
+def job_id(department, year, semester):
+    return fees.document_id(department, year, semester)
+
+
+def printable_path(challan_id):
+    return os.path.join(CHALLAN_DIR, f'{challan_id}.pdf')
+
+
+def render_challan(challan):
+    """Write a printable one-page PDF of a challan; returns its path."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('L', (800, 560), 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((20, 20, 779, 539), outline=0, width=2)
+    draw.text((40, 40), 'FEE CHALLAN', fill=0)
+    rows = [
+        ('Challan No.', challan['challan_id']),
+        ('Student', challan.get('student_name', '')),
+        ('Email', challan.get('student_email', '')),
+        ('Department', challan['department']),
+        ('Year', challan['year']),
+        ('Semester', challan['semester']),
+        ('Description', challan.get('description', '')),
+        ('Amount', f"{fees.challan_amount(challan):,}"),
+        ('Due date', challan['due_date']),
+        ('Status', challan.get('status', 'pending')),
+    ]
+    for i, (label, value) in enumerate(rows):
+        draw.text((40, 90 + i * 36), label, fill=0)
+        draw.text((220, 90 + i * 36), str(value), fill=0)
+
+    path = printable_path(challan['challan_id'])
+    os.makedirs(CHALLAN_DIR, exist_ok=True)
+    # Write then rename, so a download never sees a half-written file
+    image.save(path + '.tmp', 'PDF', resolution=100)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def start(db, department, year, semester, template, roster_loader, created_by=None):
+    """Claim the class's job document and run the job in the background; returns the job id.
+
+    `template` holds amount, due_date and optionally description and
+    printable; `roster_loader()` returns [(student_id, student_data)].
+    Raises fees.FeeError(409) if a run for the class is still active.
+    """
+    ref = db.collection(JOBS).document(job_id(department, year, semester))
+    now = time.time()
+    run_id = uuid.uuid4().hex
+
+    @firestore.transactional
+    def claim(transaction):
+        snapshot = ref.get(transaction=transaction)
+        job = snapshot.to_dict() if snapshot.exists else {}
+        if job.get('status') in ACTIVE_STATUSES and now - job.get('heartbeat', 0) < STALE_SECONDS:
+            raise fees.FeeError('Challans for this class are already being generated', 409)
+        transaction.set(ref, {
+            'department': department,
+            'year': year,
+            'semester': semester,
+            'template': template,
+            'status': 'queued',
+            'run_id': run_id,
+            'total': None,
+            'processed': 0,
+            'created': 0,
+            'skipped': 0,
+            'rendered': 0,
+            'error': None,
+            'created_by': created_by,
+            'created_at': datetime.now(),
+            'heartbeat': now,
+        })
+
+    claim(db.transaction())
+    _jobs.submit(_run, db, ref, run_id, department, year, semester, template, roster_loader)
+    return ref.id
+
+
+def _progress(db, ref, run_id, **fields):
+    """Save progress on the job document; raises _TakenOver if another run has claimed it."""
+
+    @firestore.transactional
+    def save(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists or snapshot.to_dict().get('run_id') != run_id:
+            raise _TakenOver(ref.id)
+        transaction.update(ref, dict(fields, heartbeat=time.time(), updated_at=firestore.SERVER_TIMESTAMP))
+
+    save(db.transaction())
+
+
+def _write_missing(db, challans):
+    """Create the challans that do not exist yet; returns ({id: existing challan}, [(id, new challan)]).
+
+    A run taken over while presumed dead may still be writing the same
+    challans. Its creates and ours cannot both commit, so a chunk that hits
+    one of its challans is re-read rather than counted twice.
+    """
+    refs = [db.collection(fees.FEES).document(challan_id) for challan_id in challans]
+    for attempt in range(CHUNK_ATTEMPTS):
+        existing = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+        new = [(challan_id, challan) for challan_id, challan in challans.items() if challan_id not in existing]
+        if not new:
+            return existing, new
+        batch = db.batch()
+        fees.add_challans(batch, db, new)
+        try:
+            batch.commit()
+            return existing, new
+        except AlreadyExists:
+            if attempt == CHUNK_ATTEMPTS - 1:
+                raise
+
+
+def _run(db, ref, run_id, department, year, semester, template, roster_loader):
+    counts = {'processed': 0, 'created': 0, 'skipped': 0, 'rendered': 0}
+    try:
+        roster = roster_loader()
+        _progress(db, ref, run_id, status='running', total=len(roster))
+        now = datetime.now()
+        for start in range(0, len(roster), CHUNK_SIZE):
+            chunk = roster[start:start + CHUNK_SIZE]
+            challans = {}
+            for student_id, student in chunk:
+                challan_id = fees.class_challan_id(department, year, semester, student_id)
+                challans[challan_id] = {
+                    'challan_id': challan_id,
+                    'student_id': student_id,
+                    'student_email': student.get('email', ''),
+                    'student_name': student.get('name', ''),
+                    'department': department,
+                    'year': year,
+                    'semester': semester,
+                    'amount': template['amount'],
+                    'due_date': template['due_date'],
+                    'description': template.get('description', ''),
+                    'status': 'pending',
+                    'bulk_job': ref.id,
+                    'created_at': now,
+                }
+
+            existing, new = _write_missing(db, challans)
+
+            counts['processed'] += len(chunk)
+            counts['created'] += len(new)
+            counts['skipped'] += len(existing)
+            if template.get('printable'):
+                # Existing challans are rendered as stored, e.g. with their current status
+                pages = [existing.get(challan_id, challan) for challan_id, challan in challans.items()]
+                counts['rendered'] += len(list(_renderers.map(render_challan, pages)))
+            _progress(db, ref, run_id, **counts)
+
+        _progress(db, ref, run_id, status='done', finished_at=datetime.now(), **counts)
+        logger.info("Bulk challan job finished", extra={'job': ref.id, 'challans': counts})
+    except _TakenOver:
+        logger.warning("Bulk challan job %s was taken over by another run; stopping", ref.id,
+                       extra={'challans': counts})
+    except Exception as e:
+        logger.exception("Bulk challan job %s failed", ref.id)
+        try:
+            _progress(db, ref, run_id, status='failed', error=str(e), **counts)
+        except _TakenOver:
+            pass
+        except Exception:
+            logger.exception("Could not record failure of bulk challan job %s", ref.id)
@@ -0,0 +1,73 @@
+"""Run a request's independent backend calls concurrently.
+
+    records, roster = fanout.gather(load_records, load_roster)
+
+Calls run on one bounded thread pool shared by the whole worker process, so
+a burst of requests queues rather than spawning threads without limit. Each
+call runs in a copy of the caller's context, so the Flask request, session
+and the per-request metrics in metrics.py work the same as on the request
+thread. All fan-outs within a request share one deadline, set when the
+request first fans out; if it passes, the calls still queued are cancelled
+and DeadlineExceeded is raised.
+
+Do not call gather() from inside a call that is already on the pool: with
+the pool saturated, the inner calls would wait on the outer ones.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import g, has_request_context
+
+import metrics
+
+MAX_WORKERS = int(os.environ.get('FANOUT_WORKERS', 32))
+TIMEOUT_SECONDS = float(os.environ.get('FANOUT_TIMEOUT_SECONDS', 10))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """The request's fan-out deadline passed before all calls completed."""
+
+
+def _pool():
+    # Created on first use so each forked gunicorn worker gets its own threads
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='fanout')
+                metrics.register_queue('fanout', lambda: _executor._work_queue.qsize())
+    return _executor
+
+
+def deadline():
+    """time.monotonic() deadline for the current request's fan-out calls."""
+    if not has_request_context():
+        return time.monotonic() + TIMEOUT_SECONDS
+    if 'fanout_deadline' not in g:
+        g.fanout_deadline = time.monotonic() + TIMEOUT_SECONDS
+    return g.fanout_deadline
+
+
+def gather(*calls):
+    """Run zero-argument callables concurrently and return their results in order.
+
+    The first exception raised by a call is re-raised here.
+    """
+    if len(calls) < 2:
+        # Nothing to overlap; skip the hand-off to another thread
+        return [call() for call in calls]
+
+    pool = _pool()
+    futures = [pool.submit(contextvars.copy_context().run, call) for call in calls]
+    done, pending = wait(futures, timeout=max(0.0, deadline() - time.monotonic()))
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise DeadlineExceeded(f'{len(pending)} of {len(calls)} calls did not finish in time')
+    return [future.result() for future in futures]
@@ -0,0 +1,224 @@
+"""Fee challans and their collection rollups.
+
+Every (department, year, semester, status) combination has a rollup
+document in `fee_rollups` holding the number of challans and the sum of
+their amounts. The rollups are kept current by the same writes that change
+the challans: a new challan increments its group's `pending` rollup in the
+batch that creates it, and a status change moves the challan's count and
+amount from one rollup to the other in the transaction that updates it.
+Summaries are then a query over a handful of rollup documents instead of a
+scan of `fees`.
+
+Challans written before the rollups existed (or edited outside the app) are
+folded in by rebuilding them once:
+
+    python fees.py rebuild
+"""
+import argparse
+from datetime import datetime
+
+from firebase_admin import firestore
+
+FEES = 'fees'
+ROLLUPS = 'fee_rollups'
+STATUSES = ('pending', 'partial', 'paid', 'cancelled')
+
+
+class FeeError(Exception):
+    """A fee change that cannot be made; `status` is the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_amount(value):
+    """A challan amount as a number; int when it is a whole number."""
+    amount = float(value)
+    if amount < 0:
+        raise ValueError('amount must not be negative')
+    return int(amount) if amount.is_integer() else amount
+
+
+def challan_amount(challan):
+    """The amount a challan adds to its rollup; 0 if older data holds no usable number."""
+    try:
+        return parse_amount(challan.get('amount', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def document_id(*parts):
+    # Document ids may not contain '/'
+    return '_'.join(str(part).replace('/', '-') for part in parts)
+
+
+def rollup_id(department, year, semester, status):
+    return document_id(department, year, semester, status)
+
+
+def class_challan_id(department, year, semester, student_id):
+    """The challan_id of a student's bulk-generated semester challan, one per student and semester."""
+    return document_id(department, year, semester, student_id)
+
+
+def _rollup_ref(db, challan, status):
+    return db.collection(ROLLUPS).document(
+        rollup_id(challan['department'], challan['year'], challan['semester'], status))
+
+
+def _rollup_change(challan, status, sign, count=1, amount=None):
+    """merge-set fields adding (sign=1) or removing (sign=-1) challans from a rollup."""
+    return {
+        'department': challan['department'],
+        'year': challan['year'],
+        'semester': challan['semester'],
+        'status': status,
+        'count': firestore.Increment(sign * count),
+        'amount': firestore.Increment(sign * (challan_amount(challan) if amount is None else amount)),
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    }
+
+
+def add_challan(batch, db, challan_id, challan):
+    """Queue a new challan and its rollup increment on `batch`."""
+    add_challans(batch, db, [(challan_id, challan)])
+
+
+def add_challans(batch, db, challans):
+    """Queue new (challan_id, challan) documents on `batch`, with one increment per rollup.
+
+    The challans are created, not set, so if any already exists the commit
+    fails (AlreadyExists) rather than counting it in its rollup twice.
+    """
+    groups = {}
+    for challan_id, challan in challans:
+        batch.create(db.collection(FEES).document(challan_id), challan)
+        ref = _rollup_ref(db, challan, challan['status'])
+        first, count, amount = groups.get(ref.id, (challan, 0, 0))
+        groups[ref.id] = (first, count + 1, amount + challan_amount(challan))
+    for first, count, amount in groups.values():
+        batch.set(_rollup_ref(db, first, first['status']),
+                  _rollup_change(first, first['status'], 1, count, amount), merge=True)
+
+
+def challan_ref(db, challan_id):
+    """Reference to a challan by its challan_id.
+
+    Newer challans are stored under their challan_id; older ones have an
+    auto-generated document id and are looked up by field.
+    """
+    ref = db.collection(FEES).document(challan_id)
+    if ref.get().exists:
+        return ref
+    matches = list(db.collection(FEES).where('challan_id', '==', challan_id).limit(1).stream())
+    if not matches:
+        raise FeeError('Challan not found', 404)
+    return matches[0].reference
+
+
+def set_status(db, challan_id, status):
+    """Change a challan's status, moving it between rollups; returns the challan."""
+    if status not in STATUSES:
+        raise FeeError(f"status must be one of: {', '.join(STATUSES)}")
+    ref = challan_ref(db, challan_id)
+    now = datetime.now()
+
+    @firestore.transactional
+    def run(transaction):
+        challan = ref.get(transaction=transaction).to_dict()
+        old_status = challan.get('status', 'pending')
+        if old_status == status:
+            return challan
+        changes = {'status': status, 'status_changed_at': now}
+        if status == 'paid':
+            changes['paid_at'] = now
+        transaction.update(ref, changes)
+        transaction.set(_rollup_ref(db, challan, old_status), _rollup_change(challan, old_status, -1), merge=True)
+        transaction.set(_rollup_ref(db, challan, status), _rollup_change(challan, status, 1), merge=True)
+        return dict(challan, **changes)
+
+    return run(db.transaction())
+
+
+def summary(db, department=None, year=None, semester=None):
+    """Totals per status and per rollup group matching the filters."""
+    query = db.collection(ROLLUPS)
+    for field, value in (('department', department), ('year', year), ('semester', semester)):
+        if value:
+            query = query.where(field, '==', value)
+
+    totals = {status: {'count': 0, 'amount': 0} for status in STATUSES}
+    groups = []
+    for doc in query.stream():
+        rollup = doc.to_dict()
+        if not rollup.get('count'):
+            continue
+        status_totals = totals.setdefault(rollup['status'], {'count': 0, 'amount': 0})
+        status_totals['count'] += rollup['count']
+        status_totals['amount'] += rollup.get('amount', 0)
+        groups.append({field: rollup.get(field) for field in
+                       ('department', 'year', 'semester', 'status', 'count', 'amount')})
+    groups.sort(key=lambda group: tuple(str(group[field]) for field in ('department', 'year', 'semester', 'status')))
+    return {'totals': totals, 'groups': groups}
+
+
+def rebuild_rollups(db, progress=print):
+    """Recompute every rollup from a full scan of `fees`.
+
+    Changes made to challans while this runs can be lost; run it when the
+    accounts office is not generating challans or recording payments.
+    """
+    rollups = {}
+    scanned = 0
+    for doc in db.collection(FEES).stream():
+        challan = doc.to_dict()
+        scanned += 1
+        if not all(field in challan for field in ('department', 'year', 'semester')):
+            continue
+        amount = challan_amount(challan)
+        if not amount and challan.get('amount'):
+            progress(f"  {doc.id}: counting unparseable amount {challan.get('amount')!r} as 0")
+        status = challan.get('status', 'pending')
+        key = rollup_id(challan['department'], challan['year'], challan['semester'], status)
+        rollup = rollups.setdefault(key, {'department': challan['department'], 'year': challan['year'],
+                                          'semester': challan['semester'], 'status': status,
+                                          'count': 0, 'amount': 0})
+        rollup['count'] += 1
+        rollup['amount'] += amount
+
+    stale = [doc.reference for doc in db.collection(ROLLUPS).stream() if doc.id not in rollups]
+    writes = [('set', db.collection(ROLLUPS).document(key), dict(rollup, updated_at=firestore.SERVER_TIMESTAMP))
+              for key, rollup in rollups.items()] + [('delete', ref, None) for ref in stale]
+    # Firestore batches hold at most 500 writes
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        for op, ref, data in writes[start:start + 500]:
+            if op == 'set':
+                batch.set(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+    progress(f"{scanned} challans scanned, {len(rollups)} rollups written, {len(stale)} removed")
+    return rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain fee collection rollups.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('rebuild', help='recompute fee_rollups from every challan')
+    commands.add_parser('show', help='print the current totals per status')
+    args = parser.parse_args()
+
+    from firebase_setup import initialize_firebase
+    db = initialize_firebase()
+
+    if args.command == 'rebuild':
+        rebuild_rollups(db)
+    else:
+        for status, totals in summary(db)['totals'].items():
+            print(f"{status:10} {totals['count']:8} challans  {totals['amount']:14,.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 import json
+import os
 from datetime import datetime
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
-    cred = credentials.Certificate("attendmax-a79f3-firebase-adminsdk-fbsvc-5b7357bc6d.json")
+    """Initialize Firebase Admin SDK with the same credentials lookup as app.py"""
+    firebase_creds = os.environ.get('FIREBASE_CREDENTIALS')
+    if firebase_creds:
+        cred = credentials.Certificate(json.loads(firebase_creds))
+    else:
+        cred = credentials.Certificate(os.environ.get(
+            'FIREBASE_CREDENTIALS_PATH', "attendmax-a79f3-firebase-adminsdk-fbsvc-5b7357bc6d.json"))
     try:
         firebase_admin.initialize_app(cred)
     except ValueError:
@@ -56,6 +62,36 @@ def create_indexes(db):
     print("   - department (Ascending)")
     print("   - exam_name (Ascending)")
     print("   - status (Ascending)")
+    
+    print("\n4. Collection: notifications")
+    print("   Fields:")
+    print("   - audiences (Array contains)")
+    print("   - status (Ascending)")
+    print("   - published_at (Descending)")
+    
+    print("\n5. Collection: notifications")
+    print("   Fields:")
+    print("   - status (Ascending)")
+    print("   - published_at (Descending)")
+    
+    print("\n   Both notifications indexes are also needed with published_at (Ascending),")
+    print("   for polls with a since cursor")
+
+    print("\n6. Collection: library_loans")
+    print("   Fields:")
+    print("   - student_id (Ascending)")
+    print("   - status (Ascending)")
+    print("   - created_at (Descending)")
+
+    print("\n7. Collection: library_loans")
+    print("   Fields:")
+    print("   - student_id (Ascending)")
+    print("   - created_at (Descending)")
+
+    print("\n8. Collection: scheduled_jobs")
+    print("   Fields:")
+    print("   - status (Ascending)")
+    print("   - run_at (Ascending)")
 
 def setup_security_rules():
     """Print recommended security rules"""
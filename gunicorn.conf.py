@@ -0,0 +1,24 @@
+"""gunicorn settings, loaded automatically by `gunicorn wsgi:app`.
+
+Workers share their Prometheus metrics through PROMETHEUS_MULTIPROC_DIR (see
+metrics.py). It has to be set before any worker imports prometheus_client,
+emptied at startup so a previous run's values do not leak in, and told when a
+worker exits so its live gauges stop counting.
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                      os.path.join(tempfile.gettempdir(), 'attendmax-metrics'))
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,186 @@
+"""Local verification of Firebase ID tokens.
+
+Firebase signs ID tokens with rotating Google keys published as X.509
+certificates. The certificates are cached for as long as the response's
+Cache-Control max-age allows and re-fetched early when a token names a key
+id we have not seen (key rotation), so verifying a login costs no RPCs in
+the steady state.
+"""
+import re
+import threading
+import time
+
+import jwt
+import requests
+from cryptography.x509 import load_pem_x509_certificate
+
+FIREBASE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+DEFAULT_MAX_AGE_SECONDS = 3600
+# Minimum gap between fetches triggered by unknown key ids, so forged tokens
+# with random kids cannot make us hammer Google's endpoint.
+MIN_REFRESH_INTERVAL_SECONDS = 60
+CLOCK_SKEW_SECONDS = 60
+
+
+class InvalidIdTokenError(Exception):
+    """The ID token is malformed, expired, or not signed by Firebase."""
+
+
+def fetch_google_certs(url=FIREBASE_CERTS_URL):
+    """Return ({kid: pem}, max_age_seconds) from Google's certificate endpoint."""
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE_SECONDS
+    return response.json(), max_age
+
+
+class SigningKeyCache:
+    """Thread-safe, rotation-aware cache of the public keys that sign ID tokens.
+
+    `fetch` returns ({kid: pem_certificate}, max_age_seconds); pass a local
+    function to verify tokens signed with locally generated keys.
+    """
+
+    def __init__(self, fetch=fetch_google_certs, clock=time.time):
+        self._fetch = fetch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch = None
+
+    def get(self, kid):
+        now = self._clock()
+        keys = self._keys
+        if now < self._expires_at and kid in keys:
+            return keys[kid]
+
+        with self._lock:
+            now = self._clock()
+            stale = now >= self._expires_at
+            unknown_kid = kid not in self._keys
+            recently_fetched = (self._last_fetch is not None and
+                                now - self._last_fetch < MIN_REFRESH_INTERVAL_SECONDS)
+            if stale or (unknown_kid and not recently_fetched):
+                try:
+                    self._refresh(now)
+                except Exception:
+                    if not self._keys:
+                        raise
+                    # Keep serving the keys we have and retry shortly.
+                    self._expires_at = now + MIN_REFRESH_INTERVAL_SECONDS
+                    self._last_fetch = now
+            return self._keys.get(kid)
+
+    def _refresh(self, now):
+        certs, max_age = self._fetch()
+        self._keys = {kid: load_pem_x509_certificate(pem.encode()).public_key()
+                      for kid, pem in certs.items()}
+        self._expires_at = now + max_age
+        self._last_fetch = now
+
+
+class IdTokenVerifier:
+    """Verify Firebase ID tokens for one project without calling Firebase."""
+
+    def __init__(self, project_id, key_cache=None, clock=time.time):
+        self.project_id = project_id
+        self.issuer = f'https://securetoken.google.com/{project_id}'
+        self.key_cache = key_cache or SigningKeyCache(clock=clock)
+        self._clock = clock
+
+    def verify(self, id_token):
+        """Return the token's claims, including custom claims such as role.
+
+        Raises InvalidIdTokenError if the token cannot be trusted.
+        """
+        if not self.project_id:
+            raise InvalidIdTokenError('Firebase project id is not configured')
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise InvalidIdTokenError(f'Malformed ID token: {e}')
+
+        if header.get('alg') != 'RS256':
+            raise InvalidIdTokenError('ID token must be signed with RS256')
+        key = self.key_cache.get(header.get('kid'))
+        if key is None:
+            raise InvalidIdTokenError('ID token signed with an unknown key')
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key=key,
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=CLOCK_SKEW_SECONDS,
+                options={'require': ['exp', 'iat', 'sub'], 'verify_iat': False},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidIdTokenError(f'Invalid ID token: {e}')
+
+        now = self._clock()
+        if not claims['sub'] or len(claims['sub']) > 128:
+            raise InvalidIdTokenError('ID token has an invalid subject')
+        if claims['iat'] > now + CLOCK_SKEW_SECONDS:
+            raise InvalidIdTokenError('ID token issued in the future')
+        if claims.get('auth_time', 0) > now + CLOCK_SKEW_SECONDS:
+            raise InvalidIdTokenError('ID token has an invalid auth_time')
+
+        claims['uid'] = claims['sub']
+        return claims
+
+
+def _self_check():
+    """Sign and verify tokens with a locally generated key pair."""
+    from datetime import datetime, timedelta
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'local-test')])
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(datetime.utcnow() - timedelta(days=1))
+            .not_valid_after(datetime.utcnow() + timedelta(days=1))
+            .sign(private_key, hashes.SHA256()))
+    pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+    fetches = []
+
+    def fetch():
+        fetches.append(time.time())
+        return {'local-kid': pem}, 3600
+
+    verifier = IdTokenVerifier('demo-project', key_cache=SigningKeyCache(fetch=fetch))
+    now = int(time.time())
+    claims = {'iss': verifier.issuer, 'aud': 'demo-project', 'sub': 'uid-1', 'iat': now,
+              'exp': now + 3600, 'auth_time': now, 'email': 'student@example.com',
+              'role': 'student', 'department': 'CSE', 'year': 'FY'}
+    token = jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': 'local-kid'})
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        verified = verifier.verify(token)
+    per_call_us = (time.perf_counter() - start) * 1000
+    assert verified['uid'] == 'uid-1' and verified['role'] == 'student'
+    assert len(fetches) == 1
+
+    for bad in (dict(claims, aud='other-project'), dict(claims, exp=now - 3600)):
+        try:
+            verifier.verify(jwt.encode(bad, private_key, algorithm='RS256', headers={'kid': 'local-kid'}))
+        except InvalidIdTokenError:
+            pass
+        else:
+            raise AssertionError('accepted an invalid token')
+    print(f'ID token verification OK: {per_call_us:.1f} us/token, {len(fetches)} key fetch')
+
+
+if __name__ == '__main__':
+    _self_check()
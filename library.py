@@ -0,0 +1,233 @@
+"""Library circulation: issuing, returning and reserving copies.
+
+A title's available copies are split over counter shards,
+`library_books/{id}/availability/{n}`, instead of living in one field of
+the book document. Issuing or reserving a copy is a transaction that reads
+the shards in random order and takes a copy from the first one that has
+any, writing that shard and the new loan together. Concurrent issues of a
+popular title therefore mostly touch different documents, and each stays
+under Firestore's sustained write rate of about one per second per
+document. Titles with few copies get a single shard. A return gives the
+copy back to the shard it came from with an Increment, so it needs no read.
+
+Loans live in `library_loans`, one document per issue or reservation,
+with the student's uid, so a student's loans are one indexed query:
+    library_loans: student_id ASC, status ASC, created_at DESC
+
+Reservations hold a copy for RESERVATION_HOURS. If nobody issues it by then,
+a scheduled job releases it (see scheduler.register). The job document is
+written in the reservation's transaction, so no held copy is left without one.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from firebase_admin import firestore
+
+import scheduler
+
+BOOKS = 'library_books'
+SHARDS = 'availability'
+LOANS = 'library_loans'
+COPIES_PER_SHARD = 5
+MAX_SHARDS = 10
+ACTIVE_STATUSES = ['reserved', 'issued']
+
+LOAN_DAYS = int(os.environ.get('LIBRARY_LOAN_DAYS', 14))
+RESERVATION_HOURS = int(os.environ.get('LIBRARY_RESERVATION_HOURS', 48))
+
+
+class CirculationError(Exception):
+    """A request the circulation state does not allow; `status` is the HTTP status."""
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def shard_count(copies):
+    return max(1, min(MAX_SHARDS, int(copies) // COPIES_PER_SHARD))
+
+
+def split_copies(copies, shards):
+    """Copies per shard, as even as possible."""
+    copies = int(copies)
+    return [copies // shards + (1 if i < copies % shards else 0) for i in range(shards)]
+
+
+def _shard_ref(book_ref, index):
+    return book_ref.collection(SHARDS).document(str(index))
+
+
+def write_shards(batch, book_ref, available, shards):
+    for index, count in enumerate(split_copies(available, shards)):
+        batch.set(_shard_ref(book_ref, index), {'available': count})
+
+
+def availability(db, books):
+    """Set `available` from the shards on {book_id: data} of sharded books, in one read."""
+    refs = [_shard_ref(db.collection(BOOKS).document(book_id), index)
+            for book_id, data in books.items() for index in range(int(data.get('shards') or 0))]
+    totals = {}
+    for doc in db.get_all(refs) if refs else ():
+        if doc.exists:
+            book_id = doc.reference.parent.parent.id
+            totals[book_id] = totals.get(book_id, 0) + doc.to_dict().get('available', 0)
+    for book_id, total in totals.items():
+        books[book_id]['available'] = total
+    return books
+
+
+def _take_copy(transaction, book_ref):
+    """Take one copy from a random shard with stock; returns (book data, shard index)."""
+    book = book_ref.get(transaction=transaction)
+    if not book.exists:
+        raise CirculationError('Book not found', 404)
+    data = book.to_dict()
+    shards = int(data.get('shards') or 0)
+
+    if not shards:
+        # Book added before availability was sharded: shard it now
+        available = int(data.get('available') or 0)
+        if available < 1:
+            raise CirculationError('No copies available')
+        shards = shard_count(data.get('copies', available))
+        counts = split_copies(available, shards)
+        index = max(range(shards), key=counts.__getitem__)
+        counts[index] -= 1
+        for i, count in enumerate(counts):
+            transaction.set(_shard_ref(book_ref, i), {'available': count})
+        transaction.update(book_ref, {'shards': shards})
+        return data, index
+
+    for index in random.sample(range(shards), shards):
+        shard = _shard_ref(book_ref, index).get(transaction=transaction)
+        available = shard.to_dict().get('available', 0) if shard.exists else 0
+        if available > 0:
+            transaction.update(shard.reference, {'available': available - 1})
+            return data, index
+    raise CirculationError('No copies available')
+
+
+def _loan(book_id, book, student_id, shard, status, now):
+    loan = {
+        'book_id': book_id,
+        'book_title': book.get('title', ''),
+        'student_id': student_id,
+        'shard': shard,
+        'status': status,
+        'created_at': now,
+        'updated_at': now,
+    }
+    if status == 'issued':
+        loan.update(issued_at=now, due_at=now + timedelta(days=LOAN_DAYS))
+    else:
+        loan.update(expires_at=now + timedelta(hours=RESERVATION_HOURS))
+    return loan
+
+
+def _checkout(db, book_id, student_id, status):
+    book_ref = db.collection(BOOKS).document(book_id)
+    loan_ref = db.collection(LOANS).document()
+    now = datetime.now()
+
+    @firestore.transactional
+    def run(transaction):
+        book, shard = _take_copy(transaction, book_ref)
+        loan = _loan(book_id, book, student_id, shard, status, now)
+        transaction.set(loan_ref, loan)
+        if status == 'reserved':
+            job, document = scheduler.job_document('expire_reservation', loan_ref.id, loan['expires_at'])
+            transaction.set(db.collection(scheduler.JOBS).document(job), document)
+        return loan
+
+    return loan_ref.id, run(db.transaction())
+
+
+def issue(db, book_id, student_id):
+    """Issue a copy to a student; returns (loan_id, loan)."""
+    return _checkout(db, book_id, student_id, 'issued')
+
+
+def reserve(db, book_id, student_id):
+    """Hold a copy for a student until it is issued or the reservation expires.
+
+    Also writes the expire_reservation job; the caller only queues it.
+    """
+    return _checkout(db, book_id, student_id, 'reserved')
+
+
+def issue_reservation(db, loan_id, book_id):
+    """Turn a student's reservation of `book_id` into a loan of the copy it holds."""
+    loan_ref = db.collection(LOANS).document(loan_id)
+    now = datetime.now()
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = loan_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise CirculationError('Reservation not found', 404)
+        loan = snapshot.to_dict()
+        if loan.get('book_id') != book_id:
+            raise CirculationError('Reservation is for another book', 400)
+        # Naive local time, read back labelled UTC
+        expires_at = loan.get('expires_at')
+        expired = isinstance(expires_at, datetime) and expires_at.replace(tzinfo=None) <= now
+        if loan.get('status') != 'reserved' or expired:
+            raise CirculationError(f"Reservation is {'expired' if expired else loan.get('status')}")
+        changes = {'status': 'issued', 'issued_at': now, 'due_at': now + timedelta(days=LOAN_DAYS),
+                   'updated_at': now}
+        transaction.update(loan_ref, changes)
+        return dict(loan, **changes)
+
+    return run(db.transaction())
+
+
+def _release(db, loan_id, from_status, to_status, timestamp_field):
+    """Move a loan out of `from_status` and give its copy back; returns the loan."""
+    loan_ref = db.collection(LOANS).document(loan_id)
+    now = datetime.now()
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = loan_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise CirculationError('Loan not found', 404)
+        loan = snapshot.to_dict()
+        if loan.get('status') != from_status:
+            raise CirculationError(f"Loan is {loan.get('status')}")
+        book_ref = db.collection(BOOKS).document(loan['book_id'])
+        transaction.update(_shard_ref(book_ref, loan.get('shard', 0)), {'available': firestore.Increment(1)})
+        changes = {'status': to_status, timestamp_field: now, 'updated_at': now}
+        transaction.update(loan_ref, changes)
+        return dict(loan, **changes)
+
+    return run(db.transaction())
+
+
+def return_copy(db, loan_id):
+    return _release(db, loan_id, 'issued', 'returned', 'returned_at')
+
+
+def cancel_reservation(db, loan_id):
+    return _release(db, loan_id, 'reserved', 'cancelled', 'cancelled_at')
+
+
+def expire_reservation(db, loan_id):
+    """Scheduled job: release a reservation nobody collected."""
+    try:
+        _release(db, loan_id, 'reserved', 'expired', 'expired_at')
+    except CirculationError:
+        return False
+    return True
+
+
+def loans_query(db, student_id, statuses=ACTIVE_STATUSES):
+    """A student's loans, newest first; `statuses` None for the whole history."""
+    query = db.collection(LOANS).where('student_id', '==', student_id)
+    if statuses:
+        query = query.where('status', 'in', list(statuses))
+    return query.order_by('created_at', direction='DESCENDING')
+
+
+scheduler.register('expire_reservation', LOANS, expire_reservation)
@@ -0,0 +1,270 @@
+"""In-memory full-text and prefix search over the library catalog.
+
+Every title, author and category word is an entry in an inverted index
+(word -> {book id: weight}), and the distinct words are also kept in a
+sorted list, so the words starting with a prefix are one bisect plus a
+contiguous slice. A query matches books that contain, for each query word,
+that word or a word it is a prefix of ("harr pot" finds "Harry Potter").
+Books are ranked by the summed weights of the fields they matched in,
+whole-word matches counting EXACT_BOOST times more than prefix matches,
+then by title. ISBNs are indexed without hyphens and can be searched by any
+leading part.
+
+The index is maintained incrementally (add / remove one book at a time) by
+the `library_books` replica; see replica.CatalogReplica.
+
+Rankings of queries matching many books are cached; a change to a book only
+drops the cached queries it matches. On the 50k-title benchmark the median
+lookup takes tens of microseconds and the p99 of cached ones about 1 ms.
+Uncached queries on the most common words match a third of the catalog and
+are dominated by ranking those matches: their p99 is about 10 ms.
+
+Usage: python library_search.py   (runs the 50k-title benchmark)
+"""
+import heapq
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+FIELD_WEIGHTS = {'title': 3, 'author': 2, 'category': 1}
+ISBN_WEIGHT = 10
+EXACT_BOOST = 2
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+# Rankings of queries matching more books than this are kept, so the common
+# (and most expensive) queries and their later pages are a slice of a list
+CACHE_MIN_MATCHES = 500
+CACHE_SIZE = 128
+# A prefix stands for at most this many of the words it starts, the most
+# common ones, so a one or two letter prefix does not scan the whole index
+MAX_PREFIX_WORDS = 64
+
+_WORD = re.compile(r'\w+')
+_ISBN_QUERY = re.compile(r'^[\d\s-]*\d[\d\s-]*[xX]?$')
+
+
+def tokenize(text):
+    return _WORD.findall(str(text or '').casefold())
+
+
+def normalize_isbn(value):
+    return re.sub(r'[^0-9x]', '', str(value or '').casefold())
+
+
+class CatalogIndex:
+    """Inverted and prefix index of book ids; not thread-safe, callers lock."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._postings = {}   # word -> {book id: weight}
+        self._words = []      # sorted distinct words, for prefix ranges
+        self._books = {}      # book id -> words it is indexed under
+        self._titles = {}     # book id -> sort key, title then id
+        self._order = None    # book id -> position by title; rebuilt after changes
+        self._ranked = OrderedDict()  # query terms -> ranked book ids
+
+    def __len__(self):
+        return len(self._books)
+
+    def add(self, book_id, data):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in set(tokenize(data.get(field))):
+                weights[word] = weights.get(word, 0) + weight
+        isbn = normalize_isbn(data.get('isbn'))
+        if isbn:
+            weights[isbn] = weights.get(isbn, 0) + ISBN_WEIGHT
+        title = f"{str(data.get('title') or '').casefold()}\0{book_id}"
+        if (self._titles.get(book_id) == title and self._books[book_id] == tuple(weights)
+                and all(self._postings[word][book_id] == weight for word, weight in weights.items())):
+            # Only fields that are not searched changed; keep the cache
+            return
+        self.remove(book_id)
+
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._words, word)
+            postings[book_id] = weight
+        self._books[book_id] = tuple(weights)
+        self._titles[book_id] = title
+        self._order = None
+        self._invalidate(weights)
+
+    def remove(self, book_id):
+        words = self._books.pop(book_id, None)
+        if words is None:
+            return
+        del self._titles[book_id]
+        self._order = None
+        self._invalidate(words)
+        for word in words:
+            postings = self._postings[word]
+            del postings[book_id]
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def _invalidate(self, words):
+        """Drop the cached rankings of queries that match a book indexed under `words`."""
+        stale = [key for key in self._ranked
+                 if all(any(word.startswith(term) for word in words) for term in key)]
+        for key in stale:
+            del self._ranked[key]
+
+    def _prefixed(self, prefix):
+        """Words that start with `prefix`: all of them, or the MAX_PREFIX_WORDS most common."""
+        start = bisect_left(self._words, prefix)
+        end = bisect_left(self._words, prefix + '\U0010ffff', start)
+        words = self._words[start:end]
+        if len(words) <= MAX_PREFIX_WORDS:
+            return words
+        common = heapq.nlargest(MAX_PREFIX_WORDS, words, key=lambda word: len(self._postings[word]))
+        if prefix in self._postings and prefix not in common:
+            common[-1] = prefix
+        return common
+
+    def _matches(self, term, words):
+        """{book id: score} of the books containing `term` or a word it prefixes."""
+        # The longest posting list is copied by a dict comprehension; only
+        # the rest are merged book by book
+        if not words:
+            return {}
+        words = sorted(words, key=lambda word: len(self._postings[word]), reverse=True)
+        boost = EXACT_BOOST if words[0] == term else 1
+        scores = {book_id: weight * boost for book_id, weight in self._postings[words[0]].items()}
+        for word in words[1:]:
+            boost = EXACT_BOOST if word == term else 1
+            for book_id, weight in self._postings[word].items():
+                score = weight * boost
+                if score > scores.get(book_id, 0):
+                    scores[book_id] = score
+        return scores
+
+    def _filter(self, scores, term, words):
+        """Narrow candidate `scores` to books matching `term`, adding its score."""
+        best = {}
+        for word in words:
+            boost = EXACT_BOOST if word == term else 1
+            postings = self._postings[word]
+            # Walk whichever side is shorter
+            if len(postings) < len(scores):
+                pairs = [(book_id, weight) for book_id, weight in postings.items() if book_id in scores]
+            else:
+                pairs = [(book_id, postings[book_id]) for book_id in scores if book_id in postings]
+            for book_id, weight in pairs:
+                weight *= boost
+                if weight > best.get(book_id, 0):
+                    best[book_id] = weight
+        return {book_id: scores[book_id] + weight for book_id, weight in best.items()}
+
+    def _title_order(self):
+        """book id -> position in title order, so ties sort on integers.
+
+        Rebuilt after the catalog changes, which costs a sort of every title;
+        only rankings large enough to be cached use it.
+        """
+        if self._order is None:
+            self._order = {book_id: i for i, book_id in enumerate(sorted(self._titles, key=self._titles.__getitem__))}
+        return self._order
+
+    def search(self, query, offset=0, limit=DEFAULT_PER_PAGE):
+        """(total matches, [book ids]) for one page of ranked results."""
+        query = str(query or '')
+        terms = [normalize_isbn(query)] if _ISBN_QUERY.match(query.strip()) else tokenize(query)
+        terms = {term: self._prefixed(term) for term in terms if term}
+        if not terms:
+            return 0, []
+
+        key = tuple(sorted(terms))
+        ranked = self._ranked.get(key)
+        if ranked is not None:
+            self._ranked.move_to_end(key)
+            return len(ranked), ranked[offset:offset + limit]
+
+        # Only the most selective term is looked up in the index; the other
+        # terms are checked against the words of the books it matched
+        sizes = {term: sum(len(self._postings[word]) for word in words) for term, words in terms.items()}
+        first = min(sizes, key=sizes.get)
+        scores = self._matches(first, terms[first])
+        for term in sorted(terms, key=sizes.get):
+            if term != first and scores:
+                scores = self._filter(scores, term, terms[term])
+
+        # Best score first, ties by title; two stable sorts on C-level keys are
+        # much cheaper than one on a Python key function
+        titles = self._title_order() if len(scores) > CACHE_MIN_MATCHES else self._titles
+        ranked = sorted(scores, key=titles.__getitem__)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        if len(ranked) > CACHE_MIN_MATCHES:
+            self._ranked[key] = ranked
+            if len(self._ranked) > CACHE_SIZE:
+                self._ranked.popitem(last=False)
+        return len(ranked), ranked[offset:offset + limit]
+
+
+def _benchmark(n_books=50000, n_queries=1000, seed=11):
+    """Time building a synthetic catalog's index and typical lookups."""
+    import random
+    rng = random.Random(seed)
+    letters = 'eeeeaaaiiioooouunnnrrrsssttllcdmhpgbfywkvz'
+    vocabulary = sorted({''.join(rng.choices(letters, k=rng.randint(3, 11))) for _ in range(40000)})
+    rng.shuffle(vocabulary)
+    # Word frequencies roughly follow Zipf's law, as in real titles
+    frequency = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    categories = ['Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Electronics',
+                  'Mechanical', 'Civil', 'Literature', 'History', 'Economics']
+    books = [{
+        'title': ' '.join(rng.choices(vocabulary, frequency, k=rng.randint(2, 7))).title(),
+        'author': ' '.join(rng.choices(vocabulary, k=2)).title(),
+        'category': rng.choice(categories),
+        'isbn': f'978-{rng.randint(0, 9)}-{rng.randint(10000, 99999)}-{rng.randint(100, 999)}-{i % 10}',
+    } for i in range(n_books)]
+
+    index = CatalogIndex()
+    start = time.perf_counter()
+    for i, book in enumerate(books):
+        index.add(f'book-{i:06d}', book)
+    built = time.perf_counter() - start
+
+    def sample(kind):
+        book = rng.choice(books)
+        words = tokenize(book['title'])
+        if kind == 'word':
+            return rng.choice(words)
+        if kind == 'two words':
+            return ' '.join(rng.sample(words, 2)) if len(words) > 1 else words[0]
+        if kind == 'prefix':
+            word = rng.choice(words)
+            return word[:max(3, len(word) // 2)]
+        if kind == 'word + prefix':
+            return f"{tokenize(book['author'])[0]} {words[0][:3]}"
+        return book['isbn'][:9]
+
+    print(f'{n_books} books, {len(index._words)} distinct words: index built in {built:.2f} s')
+    for kind in ('word', 'two words', 'prefix', 'word + prefix', 'isbn prefix'):
+        queries = [sample(kind) for _ in range(n_queries)]
+        results = {}
+        for cold in (True, False):
+            timings = []
+            index._ranked.clear()
+            for query in queries:
+                if cold:
+                    index._ranked.clear()
+                start = time.perf_counter()
+                total, page = index.search(query)
+                timings.append(time.perf_counter() - start)
+                assert total > 0 and page
+            timings.sort()
+            results[cold] = timings
+        print(f'  {kind:14} ' + ', '.join(
+            f"{'cold' if cold else 'warm'} median {timings[len(timings) // 2] * 1e6:5.0f} us "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:6.0f} us" for cold, timings in results.items()))
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -1,18 +1,40 @@
-import firebase_admin
-from firebase_admin import credentials, auth, firestore
+"""Manage admin and student accounts.
+
+Run without arguments for the interactive menu, or use a subcommand:
+
+    python manage_users.py import students.csv [--errors failed.csv]
+    python manage_users.py list [--format jsonl|csv] [--out users.jsonl]
+
+The CSV needs an `email` column and, for students, `department`, `year` and
+`semester`; `name`, `password`, `role` (default student) and `uid` are
+optional. Rows without a password get no password and sign in after a
+password reset.
+"""
+import argparse
+import csv
+import hashlib
 import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Initialize Firebase Admin SDK
-cred = credentials.Certificate("attendmax-a79f3-firebase-adminsdk-fbsvc-5b7357bc6d.json")
-try:
-    firebase_admin.initialize_app(cred)
-except ValueError:
-    # App already initialized
-    pass
+from firebase_admin import auth
 
-# Initialize Firestore
-db = firestore.client()
+from firebase_setup import initialize_firebase
+
+# Initialize Firebase Admin SDK and Firestore
+db = initialize_firebase()
+
+# auth.import_users accepts at most 1000 users per call
+IMPORT_BATCH_SIZE = 1000
+# Firestore batches hold at most 500 writes
+WRITE_BATCH_SIZE = 500
+# Firebase accepts up to 120000 PBKDF2 rounds; passwords are rehashed with
+# scrypt on first sign-in
+DEFAULT_HASH_ROUNDS = 100000
 
 # Department options
 DEPARTMENTS = {
@@ -113,43 +135,63 @@ def update_student(email, department=None, year=None, semester=None):
         print(f"Error updating student: {str(e)}")
         return False
 
-def list_all_users():
+LIST_FIELDS = ['uid', 'email', 'display_name', 'role', 'department', 'year', 'semester']
+# auth.list_users returns at most 1000 users per page
+LIST_PAGE_SIZE = 1000
+
+def iter_users(page_size=LIST_PAGE_SIZE):
     """
-    List all users in Firebase Authentication with additional information for students
+    Yield every user as a dict, one auth page at a time, with student details
+    joined from a single multi-document read per page
     """
-    try:
-        # Get all users
-        users = []
-        page = auth.list_users()
+    page = auth.list_users(max_results=page_size)
+    while page:
+        students = {}
+        refs = [db.collection('students').document(user.uid) for user in page.users
+                if (user.custom_claims or {}).get('role') == 'student']
+        if refs:
+            students = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+
         for user in page.users:
             custom_claims = user.custom_claims or {}
-            role = custom_claims.get('role', 'unknown')
-            
             user_data = {
                 'uid': user.uid,
                 'email': user.email,
                 'display_name': user.display_name,
-                'role': role
+                'role': custom_claims.get('role', 'unknown')
             }
-            
-            # Get additional student data if available
-            if role == 'student':
-                student_doc = db.collection('students').document(user.uid).get()
-                if student_doc.exists:
-                    student_data = student_doc.to_dict()
-                    user_data.update({
-                        'department': student_data.get('department', ''),
-                        'year': student_data.get('year', ''),
-                        'semester': student_data.get('semester', '')
-                    })
-            
-            users.append(user_data)
-        
-        print("\nAll Users:")
-        print(json.dumps(users, indent=2))
-        return users
+            student_data = students.get(user.uid)
+            if student_data:
+                user_data.update({
+                    'department': student_data.get('department', ''),
+                    'year': student_data.get('year', ''),
+                    'semester': student_data.get('semester', '')
+                })
+            yield user_data
+        page = page.get_next_page()
+
+def list_all_users(out=None, fmt='jsonl'):
+    """
+    Stream all users in Firebase Authentication, with additional information
+    for students, to `out` (default stdout) as JSON lines or CSV
+    """
+    out = out or sys.stdout
+    count = 0
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(out, fieldnames=LIST_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda user_data: out.write(json.dumps(user_data) + '\n')
+
+        for user_data in iter_users():
+            write(user_data)
+            count += 1
+        out.flush()
+        return count
     except Exception as e:
-        print(f"Error listing users: {str(e)}")
+        print(f"Error listing users after {count} users: {str(e)}", file=sys.stderr)
         return None
 
 def delete_user(email):
@@ -168,6 +210,144 @@ def delete_user(email):
     except Exception as e:
         print(f"Error deleting user: {str(e)}")
 
+def _validate_row(row, seen):
+    """Return the cleaned row, or raise ValueError with the reason it is rejected."""
+    row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+    email = row.get('email', '').lower()
+    role = row.get('role') or 'student'
+    if not email or '@' not in email:
+        raise ValueError('missing or invalid email')
+    if email in seen:
+        raise ValueError('duplicate email in file')
+    if role not in ('student', 'admin'):
+        raise ValueError(f"unknown role {role!r}")
+    if row.get('password') and len(row['password']) < 6:
+        raise ValueError('password shorter than 6 characters')
+    if role == 'student':
+        if row.get('department') not in DEPARTMENTS.values():
+            raise ValueError(f"unknown department {row.get('department')!r}")
+        if row.get('year') not in SEMESTERS:
+            raise ValueError(f"unknown year {row.get('year')!r}")
+        if row.get('semester') not in SEMESTERS[row['year']]:
+            raise ValueError(f"semester {row.get('semester')!r} is not in year {row['year']}")
+    seen.add(email)
+    return dict(row, email=email, role=role, uid=row.get('uid') or uuid.uuid4().hex)
+
+
+def _user_record(row, rounds):
+    claims = {'role': row['role']}
+    if row['role'] == 'student':
+        claims.update(department=row['department'], year=row['year'])
+    password = {}
+    if row.get('password'):
+        salt = os.urandom(16)
+        password = {
+            'password_hash': hashlib.pbkdf2_hmac('sha256', row['password'].encode(), salt, rounds),
+            'password_salt': salt,
+        }
+    return auth.ImportUserRecord(
+        uid=row['uid'],
+        email=row['email'],
+        display_name=row.get('name') or None,
+        email_verified=False,
+        custom_claims=claims,
+        **password
+    )
+
+
+def _write_students(rows):
+    """Create the students documents for imported rows, WRITE_BATCH_SIZE per commit."""
+    now = datetime.now()
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = db.batch()
+        for row in rows[start:start + WRITE_BATCH_SIZE]:
+            batch.set(db.collection('students').document(row['uid']), {
+                'name': row.get('name', ''),
+                'email': row['email'],
+                'department': row['department'],
+                'year': row['year'],
+                'semester': row['semester'],
+                'created_at': now
+            })
+        batch.commit()
+
+
+def _import_chunk(chunk, hash_alg, rounds, pool, report):
+    """Import one chunk of (line, row) pairs; returns the number of users created."""
+    # hashlib releases the GIL, so hashing spreads over the pool's threads
+    records = list(pool.map(lambda item: _user_record(item[1], rounds), chunk))
+    try:
+        result = auth.import_users(records, hash_alg=hash_alg)
+    except Exception as e:
+        for line, row in chunk:
+            report(line, row['email'], f'import failed: {e}')
+        return 0
+
+    failed = set()
+    for error in result.errors:
+        line, row = chunk[error.index]
+        failed.add(error.index)
+        report(line, row['email'], error.reason)
+
+    students = [row for i, (line, row) in enumerate(chunk) if i not in failed and row['role'] == 'student']
+    try:
+        _write_students(students)
+    except Exception as e:
+        # The accounts exist; rerunning reports them as duplicates, so say so here
+        for row in students:
+            report(None, row['email'], f'account created but students document not written: {e}')
+    return result.success_count
+
+
+def import_users_from_csv(path, errors_path=None, rounds=DEFAULT_HASH_ROUNDS):
+    """
+    Create users from a CSV file through the batch user-import API
+    """
+    started = time.perf_counter()
+    hash_alg = auth.UserImportHash.pbkdf2_sha256(rounds=rounds)
+    error_file = open(errors_path, 'w', newline='') if errors_path else None
+    error_writer = csv.writer(error_file) if error_file else None
+    if error_writer:
+        error_writer.writerow(['line', 'email', 'error'])
+    totals = {'rows': 0, 'created': 0, 'failed': 0}
+
+    def report(line, email, reason):
+        totals['failed'] += 1
+        print(f"line {line or '-'}: {email or '(no email)'}: {reason}", file=sys.stderr)
+        if error_writer:
+            error_writer.writerow([line or '', email, reason])
+
+    def flush(chunk):
+        totals['created'] += _import_chunk(chunk, hash_alg, rounds, pool, report)
+        elapsed = time.perf_counter() - started
+        print(f"{totals['created']} users created, {totals['failed']} failed "
+              f"({totals['rows'] / elapsed:.0f} rows/s)")
+
+    seen = set()
+    chunk = []
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as f, ThreadPoolExecutor() as pool:
+            reader = csv.DictReader(f)
+            for row in reader:
+                totals['rows'] += 1
+                try:
+                    chunk.append((reader.line_num, _validate_row(row, seen)))
+                except ValueError as e:
+                    report(reader.line_num, (row.get('email') or '').strip(), str(e))
+                if len(chunk) == IMPORT_BATCH_SIZE:
+                    flush(chunk)
+                    chunk = []
+            if chunk:
+                flush(chunk)
+    finally:
+        if error_file:
+            error_file.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nImported {totals['created']} of {totals['rows']} rows in {elapsed:.1f}s "
+          f"({totals['created'] / elapsed if elapsed else 0:.0f} users/s); {totals['failed']} failed")
+    return totals
+
 def get_department_choice():
     """Get department choice from user"""
     print("\nAvailable Departments:")
@@ -213,7 +393,8 @@ def get_semester_choice(year):
             pass
         print("Invalid choice. Please try again.")
 
-if __name__ == "__main__":
+def interactive():
+    """Menu-driven prompts for one user at a time"""
     while True:
         print("\n1. Create Admin User")
         print("2. Create Student User")
@@ -270,6 +451,7 @@ if __name__ == "__main__":
                 print(f"User {email} not found")
         
         elif choice == "4":
+            print("\nAll Users:")
             list_all_users()
         
         elif choice == "5":
@@ -281,4 +463,36 @@ if __name__ == "__main__":
             break
         
         else:
-            print("Invalid choice. Please try again.") 
\ No newline at end of file
+            print("Invalid choice. Please try again.")
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage AttendMax users. Run without arguments for the interactive menu.')
+    commands = parser.add_subparsers(dest='command')
+    bulk = commands.add_parser('import', help='create users in bulk from a CSV file')
+    bulk.add_argument('csv', help='CSV with email, name, password, role, department, year, semester columns')
+    bulk.add_argument('--errors', help='also write rejected rows to this CSV file')
+    bulk.add_argument('--hash-rounds', type=int, default=DEFAULT_HASH_ROUNDS,
+                      help='PBKDF2 rounds for imported passwords (default: %(default)s)')
+    listing = commands.add_parser('list', help='export all users as JSON lines or CSV')
+    listing.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    listing.add_argument('--out', help='write to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        totals = import_users_from_csv(args.csv, args.errors, args.hash_rounds)
+        if totals['failed']:
+            raise SystemExit(1)
+    elif args.command == 'list':
+        if args.out:
+            with open(args.out, 'w', newline='', encoding='utf-8') as out:
+                count = list_all_users(out, args.format)
+        else:
+            count = list_all_users(fmt=args.format)
+        if count is None:
+            raise SystemExit(1)
+        print(f"{count} users listed", file=sys.stderr)
+    else:
+        interactive()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Prometheus metrics for the AttendMax API.
+
+Records per-route latency and status counts, and counts every Firestore
+read/write and Firebase Auth RPC made while serving a request so the
+`/api/*` endpoints that eat quota and tail latency show up in `/metrics`.
+
+Under gunicorn every worker has its own counters. gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR, where each worker's values live in files, and
+/metrics then serves the sum over all live workers rather than whichever
+worker answered. Gauges computed on demand (set_function()) cannot be read
+across processes there, so each worker samples them every
+GAUGE_SAMPLE_SECONDS instead.
+
+/metrics requires METRICS_TOKEN as a bearer token; without one it is only
+served if METRICS_PUBLIC=true.
+"""
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+GAUGE_SAMPLE_SECONDS = 5
+
+logger = logging.getLogger('attendmax.metrics')
+
+REQUEST_LATENCY = Histogram(
+    'attendmax_http_request_duration_seconds',
+    'Request latency by route',
+    ['method', 'endpoint'])
+REQUEST_COUNT = Counter(
+    'attendmax_http_requests_total',
+    'Requests by route and status code',
+    ['method', 'endpoint', 'status'])
+
+BACKEND_CALLS = Counter(
+    'attendmax_backend_calls_total',
+    'Firestore and Firebase Auth calls by operation',
+    ['backend', 'operation', 'endpoint'])
+BACKEND_LATENCY = Histogram(
+    'attendmax_backend_call_duration_seconds',
+    'Firestore and Firebase Auth call latency by operation',
+    ['backend', 'operation'])
+FIRESTORE_DOCUMENTS = Counter(
+    'attendmax_firestore_documents_total',
+    'Firestore documents read or written, by route',
+    ['endpoint', 'kind'])
+REQUEST_BACKEND_OPS = Histogram(
+    'attendmax_request_backend_operations',
+    'Firestore reads/writes and Auth RPCs issued by a single request',
+    ['endpoint', 'kind'],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 25000))
+
+ACTIVE_QR_SESSIONS = Gauge(
+    'attendmax_active_qr_sessions',
+    'QR attendance sessions currently held in memory',
+    multiprocess_mode='livesum')
+QUEUE_DEPTH = Gauge(
+    'attendmax_queue_depth',
+    'Items waiting in in-process queues',
+    ['queue'],
+    multiprocess_mode='livesum')
+
+# Per-request tallies; a ContextVar so work copied onto helper threads with
+# contextvars.copy_context() is still attributed to the request.
+_request_stats = contextvars.ContextVar('attendmax_request_stats', default=None)
+# Guards against counting calls the Firestore client makes internally
+# (e.g. DocumentReference.set -> WriteBatch.commit) twice.
+_in_backend_call = contextvars.ContextVar('attendmax_in_backend_call', default=False)
+
+BACKGROUND_ENDPOINT = 'background'
+
+# (gauge, fn) sampled by this worker in multiprocess mode
+_sampled_gauges = []
+_sampler_lock = threading.Lock()
+_sampler = None
+
+
+def set_function(gauge, fn):
+    """gauge.set_function(fn) that also works in multiprocess mode."""
+    global _sampler
+    if not MULTIPROCESS:
+        gauge.set_function(fn)
+        return
+    with _sampler_lock:
+        _sampled_gauges.append((gauge, fn))
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_gauges_forever, name='metrics-gauges', daemon=True)
+            _sampler.start()
+
+
+def _sample_gauges():
+    with _sampler_lock:
+        gauges = list(_sampled_gauges)
+    for gauge, fn in gauges:
+        try:
+            gauge.set(fn())
+        except Exception:
+            logger.debug("Error sampling gauge", exc_info=True)
+
+
+def _sample_gauges_forever():
+    while True:
+        _sample_gauges()
+        time.sleep(GAUGE_SAMPLE_SECONDS)
+
+
+def register_queue(name, depth_fn):
+    """Export the current size of an in-process queue as attendmax_queue_depth."""
+    set_function(QUEUE_DEPTH.labels(queue=name), depth_fn)
+
+
+def _current_endpoint():
+    stats = _request_stats.get()
+    return stats['endpoint'] if stats else BACKGROUND_ENDPOINT
+
+
+def record_backend_call(backend, operation, seconds, reads=0, writes=0):
+    """Account one backend call against the current request (if any)."""
+    endpoint = _current_endpoint()
+    BACKEND_CALLS.labels(backend=backend, operation=operation, endpoint=endpoint).inc()
+    BACKEND_LATENCY.labels(backend=backend, operation=operation).observe(seconds)
+    if reads:
+        FIRESTORE_DOCUMENTS.labels(endpoint=endpoint, kind='read').inc(reads)
+    if writes:
+        FIRESTORE_DOCUMENTS.labels(endpoint=endpoint, kind='write').inc(writes)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats['firestore_reads'] += reads
+        stats['firestore_writes'] += writes
+        if backend == 'auth':
+            stats['auth_calls'] += 1
+        stats['backend_seconds'] += seconds
+
+
+def current_request_stats():
+    """Return the backend tallies for the request being served, or None."""
+    return _request_stats.get()
+
+
+def _timed(backend, operation, count_reads=None, count_writes=None):
+    """Wrap a blocking backend call so it is timed and counted."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _in_backend_call.get():
+                return fn(*args, **kwargs)
+            # Count pending writes up front; a commit clears them.
+            writes = count_writes(args) if count_writes else 0
+            token = _in_backend_call.set(True)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _in_backend_call.reset(token)
+                reads = count_reads(args) if count_reads else 0
+                record_backend_call(backend, operation, time.perf_counter() - start,
+                                    reads=reads, writes=writes)
+        return wrapper
+    return decorator
+
+
+def _timed_stream(operation):
+    """Wrap a Firestore generator so documents are counted as they are consumed."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _in_backend_call.get():
+                return fn(*args, **kwargs)
+            return _count_stream(fn(*args, **kwargs), operation)
+        return wrapper
+    return decorator
+
+
+def _count_stream(iterator, operation):
+    # Only the time spent pulling results counts; the guard is dropped while
+    # the caller's loop body runs so calls it makes are counted separately.
+    elapsed = 0.0
+    reads = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            token = _in_backend_call.set(True)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                _in_backend_call.reset(token)
+                elapsed += time.perf_counter() - start
+            reads += 1
+            yield item
+    finally:
+        # Firestore bills one read for a query that matches nothing.
+        record_backend_call('firestore', operation, elapsed, reads=max(reads, 1))
+
+
+def instrument_firebase():
+    """Patch the Firestore client and firebase_admin.auth to report metrics.
+
+    Safe to call more than once; only the first call patches.
+    """
+    from firebase_admin import auth
+    from google.cloud.firestore_v1 import (Client, DocumentReference, Query,
+                                           Transaction, WriteBatch)
+
+    if getattr(Query.stream, '_attendmax_instrumented', False):
+        return
+
+    one = lambda args: 1
+    pending_writes = lambda args: len(getattr(args[0], '_write_pbs', None) or [])
+
+    patches = [
+        (Query, 'stream', _timed_stream('query')),
+        (Client, 'get_all', _timed_stream('get_all')),
+        (DocumentReference, 'get', _timed('firestore', 'get', count_reads=one)),
+        (DocumentReference, 'delete', _timed('firestore', 'delete', count_writes=one)),
+        (WriteBatch, 'commit', _timed('firestore', 'commit', count_writes=pending_writes)),
+        (Transaction, '_commit', _timed('firestore', 'transaction_commit', count_writes=pending_writes)),
+    ]
+    for owner, name, wrap in patches:
+        wrapped = wrap(getattr(owner, name))
+        wrapped._attendmax_instrumented = True
+        setattr(owner, name, wrapped)
+
+    for name in ('get_user', 'get_user_by_email', 'get_users', 'list_users',
+                 'create_user', 'update_user', 'delete_user', 'set_custom_user_claims',
+                 'import_users', 'verify_id_token', 'create_custom_token'):
+        if hasattr(auth, name):
+            setattr(auth, name, _timed('auth', name)(getattr(auth, name)))
+
+
+def _endpoint_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def init_app(app):
+    """Register request hooks and the /metrics endpoint on a Flask app."""
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_token = _request_stats.set({
+            'endpoint': _endpoint_label(),
+            'firestore_reads': 0,
+            'firestore_writes': 0,
+            'auth_calls': 0,
+            'backend_seconds': 0.0,
+        })
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = _endpoint_label()
+        if endpoint == '/metrics':
+            return response
+        REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start)
+        REQUEST_COUNT.labels(method=request.method, endpoint=endpoint, status=response.status_code).inc()
+
+        stats = _request_stats.get()
+        if stats is not None:
+            for kind in ('firestore_reads', 'firestore_writes', 'auth_calls'):
+                REQUEST_BACKEND_OPS.labels(endpoint=endpoint, kind=kind).observe(stats[kind])
+        return response
+
+    @app.teardown_request
+    def _clear_request_metrics(exc=None):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            _request_stats.reset(token)
+
+    metrics_token = os.environ.get('METRICS_TOKEN')
+    metrics_public = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
+
+    def metrics_view():
+        if metrics_token:
+            if request.headers.get('Authorization') != f'Bearer {metrics_token}':
+                return Response('Unauthorized', status=401)
+        elif not metrics_public:
+            return Response('Set METRICS_TOKEN (or METRICS_PUBLIC=true) to serve metrics', status=403)
+        registry = REGISTRY
+        if MULTIPROCESS:
+            # This worker's gauges are fresh; the others' are at most GAUGE_SAMPLE_SECONDS old
+            _sample_gauges()
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,271 @@
+"""Parallel, resumable data migrations and backfills for Firestore collections.
+
+A migration is an idempotent per-document change to one collection. The
+runner splits the collection's document-ID space into key ranges, processes
+the ranges on a pool of worker threads and applies each page of changes as
+one batched write. After every page the partition's position is saved to
+`migrations/{name}/partitions/{n}`, so an interrupted run picks up where it
+stopped. Writes are throttled by a token bucket shared by all workers, and
+--dry-run reads and reports without writing anything.
+
+Usage:
+    python migrations.py list
+    python migrations.py status attendance-date
+    python migrations.py run attendance-date [--dry-run] [--workers 8]
+        [--partitions 16] [--page-size 500] [--rate 200] [--restart]
+"""
+import argparse
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from firebase_admin import firestore
+
+import notifications
+from ratelimit import MemoryBackend
+
+CHECKPOINTS = 'migrations'
+# Firestore batches hold at most 500 writes
+MAX_PAGE_SIZE = 500
+# Characters of auto-generated document IDs, in the order Firestore sorts them
+ID_ALPHABET = ''.join(sorted(string.digits + string.ascii_letters))
+DOCUMENT_ID = '__name__'
+
+
+class Migration:
+    """A named, idempotent change applied to every document of a collection."""
+
+    name = None
+    collection = None
+    description = ''
+
+    def transform(self, doc_id, data):
+        """Return the fields to update, or None to leave the document as is."""
+        raise NotImplementedError
+
+
+def attendance_date(timestamp):
+    """The 'YYYY-MM-DD' `date` field stored on attendance documents.
+
+    The app writes naive local datetimes, which Firestore hands back
+    labelled UTC with the same wall-clock time, so no conversion is needed.
+    """
+    return timestamp.strftime('%Y-%m-%d')
+
+
+class AttendanceDateBackfill(Migration):
+    name = 'attendance-date'
+    collection = 'attendance'
+    description = "Add the 'date' field (YYYY-MM-DD) that admin_stats queries to old attendance records"
+
+    def transform(self, doc_id, data):
+        timestamp = data.get('timestamp')
+        if data.get('date') or not isinstance(timestamp, datetime):
+            return None
+        # updated_at lets the attendance read caches pick up the change
+        return {'date': attendance_date(timestamp), 'updated_at': firestore.SERVER_TIMESTAMP}
+
+
+class NotificationAudienceBackfill(Migration):
+    name = 'notification-audiences'
+    collection = 'notifications'
+    description = "Add the 'audiences' and 'published_at' fields the targeted notification feeds query"
+
+    def transform(self, doc_id, data):
+        if 'audiences' in data or 'title' not in data:
+            return None
+        return {
+            'audiences': notifications.audience_tokens(data.get('target_departments'), data.get('target_years')),
+            'published_at': data.get('created_at') if data.get('status') == 'active' else None,
+        }
+
+
+MIGRATIONS = {migration.name: migration for migration in [AttendanceDateBackfill(),
+                                                         NotificationAudienceBackfill()]}
+
+
+def key_ranges(partitions):
+    """Split the document-ID space into `partitions` contiguous [start, end) ranges.
+
+    The first range has no lower bound and the last no upper bound, so IDs
+    outside the auto-ID alphabet are still covered.
+    """
+    partitions = max(1, min(partitions, len(ID_ALPHABET)))
+    bounds = [ID_ALPHABET[round(i * len(ID_ALPHABET) / partitions)] for i in range(1, partitions)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+class Throttle:
+    """Token bucket limiting writes per second across all worker threads."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._bucket = MemoryBackend()
+
+    def wait(self, cost):
+        if not self.rate:
+            return
+        cost = min(cost, self.burst)
+        while True:
+            wait = self._bucket.take('migration', self.rate, self.burst, cost)
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class MigrationRunner:
+    def __init__(self, db, migration, workers=8, partitions=16, page_size=MAX_PAGE_SIZE,
+                 rate=200, dry_run=False):
+        self.db = db
+        self.migration = migration
+        self.workers = workers
+        self.ranges = key_ranges(partitions)
+        self.page_size = min(page_size, MAX_PAGE_SIZE)
+        self.throttle = Throttle(rate, burst=max(rate, self.page_size))
+        self.dry_run = dry_run
+        self._lock = threading.Lock()
+        self.totals = {'scanned': 0, 'updated': 0}
+
+    @property
+    def _checkpoints(self):
+        return self.db.collection(CHECKPOINTS).document(self.migration.name).collection('partitions')
+
+    def checkpoint(self, index):
+        doc = self._checkpoints.document(str(index)).get()
+        return doc.to_dict() if doc.exists else {}
+
+    def reset(self):
+        for index in range(len(self.ranges)):
+            self._checkpoints.document(str(index)).delete()
+
+    def _page(self, collection, start, end, after):
+        query = collection
+        if after is not None:
+            query = query.where(DOCUMENT_ID, '>', collection.document(after))
+        elif start is not None:
+            query = query.where(DOCUMENT_ID, '>=', collection.document(start))
+        if end is not None:
+            query = query.where(DOCUMENT_ID, '<', collection.document(end))
+        return list(query.order_by(DOCUMENT_ID).limit(self.page_size).stream())
+
+    def run_partition(self, index):
+        start, end = self.ranges[index]
+        state = {'scanned': 0, 'updated': 0, 'last_id': None, 'done': False}
+        if not self.dry_run:
+            state.update(self.checkpoint(index))
+        if state['done']:
+            return state
+
+        collection = self.db.collection(self.migration.collection)
+        while True:
+            docs = self._page(collection, start, end, state['last_id'])
+            if not docs:
+                break
+
+            updates = []
+            for doc in docs:
+                fields = self.migration.transform(doc.id, doc.to_dict())
+                if fields:
+                    updates.append((doc.reference, fields))
+
+            if updates and not self.dry_run:
+                self.throttle.wait(len(updates))
+                batch = self.db.batch()
+                for ref, fields in updates:
+                    batch.update(ref, fields)
+                batch.commit()
+
+            state['scanned'] += len(docs)
+            state['updated'] += len(updates)
+            state['last_id'] = docs[-1].id
+            with self._lock:
+                self.totals['scanned'] += len(docs)
+                self.totals['updated'] += len(updates)
+            if not self.dry_run:
+                self._checkpoints.document(str(index)).set(dict(state, updated_at=firestore.SERVER_TIMESTAMP))
+            if len(docs) < self.page_size:
+                break
+
+        state['done'] = True
+        if not self.dry_run:
+            self._checkpoints.document(str(index)).set(dict(state, updated_at=firestore.SERVER_TIMESTAMP))
+        return state
+
+    def run(self, progress=print):
+        started = time.perf_counter()
+        mode = 'dry run' if self.dry_run else 'run'
+        progress(f"{self.migration.name}: {mode} over {len(self.ranges)} key ranges with {self.workers} workers")
+
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.run_partition, index): index for index in range(len(self.ranges))}
+            for future, index in futures.items():
+                try:
+                    state = future.result()
+                except Exception as e:
+                    # The checkpoint holds the last committed page; rerun to resume
+                    failures.append(index)
+                    progress(f"  range {index}: failed ({e}); rerun to resume")
+                    continue
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    scanned = self.totals['scanned']
+                progress(f"  range {index}: {state['scanned']} scanned, {state['updated']} "
+                         f"{'to update' if self.dry_run else 'updated'} "
+                         f"({scanned / elapsed if elapsed else 0:.0f} docs/s overall)")
+
+        elapsed = time.perf_counter() - started
+        progress(f"{self.migration.name}: {self.totals['scanned']} scanned, {self.totals['updated']} "
+                 f"{'would be updated' if self.dry_run else 'updated'} in {elapsed:.1f}s"
+                 f"{f', {len(failures)} ranges failed' if failures else ''}")
+        return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Firestore data migrations.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list available migrations')
+    status = commands.add_parser('status', help='show checkpointed progress of a migration')
+    status.add_argument('name', choices=sorted(MIGRATIONS))
+    status.add_argument('--partitions', type=int, default=16)
+    run = commands.add_parser('run', help='run (or resume) a migration')
+    run.add_argument('name', choices=sorted(MIGRATIONS))
+    run.add_argument('--dry-run', action='store_true', help='read and report, write nothing')
+    run.add_argument('--workers', type=int, default=8)
+    run.add_argument('--partitions', type=int, default=16,
+                     help='key ranges to split the collection into; keep it fixed across resumes')
+    run.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE)
+    run.add_argument('--rate', type=float, default=200, help='max document writes per second (0 = unlimited)')
+    run.add_argument('--restart', action='store_true', help='discard checkpoints and start from the beginning')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for name, migration in sorted(MIGRATIONS.items()):
+            print(f"{name:20} {migration.collection:12} {migration.description}")
+        return
+
+    from firebase_setup import initialize_firebase
+    db = initialize_firebase()
+
+    if args.command == 'status':
+        runner = MigrationRunner(db, MIGRATIONS[args.name], partitions=args.partitions)
+        for index in range(len(runner.ranges)):
+            state = runner.checkpoint(index)
+            print(f"range {index:3}: {'done' if state.get('done') else 'pending':8} "
+                  f"scanned={state.get('scanned', 0)} updated={state.get('updated', 0)} "
+                  f"last_id={state.get('last_id')}")
+        return
+
+    runner = MigrationRunner(db, MIGRATIONS[args.name], workers=args.workers, partitions=args.partitions,
+                             page_size=args.page_size, rate=args.rate, dry_run=args.dry_run)
+    if args.restart and not args.dry_run:
+        runner.reset()
+    if not runner.run():
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Audience-targeted notification feeds.
+
+Each notification stores an `audiences` array of "DEPARTMENT:YEAR" tokens,
+with "*" standing for every department or every year, and the time it went
+live in `published_at`. A reader's feed is one indexed query:
+
+    audiences array-contains-any [D:Y, D:*, *:Y, *:*]
+    status == 'active', published_at > since
+
+so a poll reads only the notifications aimed at the caller, and only the
+new ones when the client passes back the `since` cursor it was given. The
+first page is newest first; polls with `since` go oldest first, so that when
+more than a page arrived between polls the cursor (the last item) stops at
+the page boundary and the next poll picks up the rest.
+Unread counts are a count() aggregation over the same query, billed as one
+read per 1000 matches.
+
+The feed needs the composite indexes
+    notifications: audiences (array-contains), status ASC, published_at DESC
+    notifications: audiences (array-contains), status ASC, published_at ASC
+and the admin view (everything active)
+    notifications: status ASC, published_at DESC
+    notifications: status ASC, published_at ASC
+"""
+from datetime import datetime, timezone
+
+COLLECTION = 'notifications'
+ANY = '*'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _targets(values):
+    """Normalise a target_departments / target_years value to a list of tokens."""
+    if isinstance(values, str):
+        values = [v.strip() for v in values.split(',')]
+    values = [str(v) for v in values or [] if v]
+    if not values or any(v.lower() == 'all' for v in values):
+        return [ANY]
+    return values
+
+
+def audience_tokens(target_departments, target_years):
+    """The `audiences` array stored on a notification."""
+    return sorted({f'{department}:{year}'
+                   for department in _targets(target_departments)
+                   for year in _targets(target_years)})
+
+
+def reader_tokens(department, year):
+    """Tokens that match any notification a reader in department/year should see."""
+    return [f'{department}:{year}', f'{department}:{ANY}', f'{ANY}:{year}', f'{ANY}:{ANY}']
+
+
+def since_datetime(since_ms):
+    """The `since` cursor (epoch milliseconds) as a UTC datetime."""
+    return datetime.fromtimestamp(float(since_ms) / 1000, timezone.utc)
+
+
+def feed_query(db, department=None, year=None, since=None):
+    """Active notifications for a reader; everything when no audience is given.
+
+    Newest first, or oldest first after `since`, so a page of a poll ends at
+    the right cursor.
+    """
+    query = db.collection(COLLECTION)
+    if department is not None or year is not None:
+        query = query.where('audiences', 'array_contains_any', reader_tokens(department, year))
+    query = query.where('status', '==', 'active')
+    if since is not None:
+        query = query.where('published_at', '>', since)
+        return query.order_by('published_at', direction='ASCENDING')
+    return query.order_by('published_at', direction='DESCENDING')
+
+
+def unread_count(db, department=None, year=None, since=None):
+    """Number of feed items published after `since`, from one count() aggregation."""
+    result = feed_query(db, department, year, since).count(alias='unread').get()
+    return int(result[0][0].value)
@@ -0,0 +1,126 @@
+"""Registry of the QR attendance sessions live in this worker.
+
+Sessions are keyed by their QR payload. Two secondary indexes map a class,
+(department, year, semester, subject), and the admin who created the
+session to that class's / admin's live sessions, oldest first, so
+/get-qr-code is a dictionary lookup instead of a scan over every live
+session. When the newest one ends, an older one still live takes over.
+
+The maps are lock striped: each key hashes to one of `stripes` shards with
+its own lock, so request threads and the cleanup thread only contend when
+they touch the same shard. Index entries only hold session codes; lookups
+confirm the session still exists and drop the codes of ones that do not,
+so no operation needs more than one lock at a time.
+"""
+import threading
+from datetime import datetime
+
+
+class _StripedDict:
+    def __init__(self, stripes):
+        self._shards = [(threading.Lock(), {}) for _ in range(stripes)]
+
+    def shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def __iter__(self):
+        return iter(self._shards)
+
+    def __len__(self):
+        return sum(len(data) for _, data in self._shards)
+
+
+class QrSessionRegistry:
+    """Thread-safe store of active QR sessions with per-class and per-creator indexes."""
+
+    def __init__(self, stripes=16):
+        self._sessions = _StripedDict(stripes)
+        self._by_class = _StripedDict(stripes)
+        self._by_creator = _StripedDict(stripes)
+
+    @staticmethod
+    def class_key(department, year, semester, subject):
+        return (department, year, semester, subject)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, code, info):
+        """Register a session; it becomes the current one for its class and creator."""
+        lock, sessions = self._sessions.shard(code)
+        with lock:
+            sessions[code] = dict(info)
+        self._point(self._by_class, self.class_key(info['department'], info['year'],
+                                                   info['semester'], info['subject']), code)
+        if info.get('created_by'):
+            self._point(self._by_creator, info['created_by'], code)
+
+    def get(self, code):
+        """The session's info (a copy), or None if it is not registered."""
+        lock, sessions = self._sessions.shard(code)
+        with lock:
+            info = sessions.get(code)
+            return dict(info) if info is not None else None
+
+    def current_for_class(self, department, year, semester, subject):
+        """(code, info) of the class's newest live session, or None."""
+        return self._follow(self._by_class, self.class_key(department, year, semester, subject))
+
+    def current_for_creator(self, uid):
+        """(code, info) of the newest live session created by `uid`, or None."""
+        return self._follow(self._by_creator, uid)
+
+    def remove(self, code):
+        lock, sessions = self._sessions.shard(code)
+        with lock:
+            info = sessions.pop(code, None)
+        if info is not None:
+            self._unpoint(self._by_class, self.class_key(info['department'], info['year'],
+                                                         info['semester'], info['subject']), code)
+            if info.get('created_by'):
+                self._unpoint(self._by_creator, info['created_by'], code)
+        return info
+
+    def expire(self, now=None):
+        """Remove sessions past their expires_at; returns the removed codes."""
+        now = now or datetime.now()
+        expired = []
+        for lock, sessions in self._sessions:
+            with lock:
+                expired += [code for code, info in sessions.items() if info['expires_at'] <= now]
+        for code in expired:
+            self.remove(code)
+        return expired
+
+    # Index helpers
+
+    @staticmethod
+    def _point(index, key, code):
+        lock, entries = index.shard(key)
+        with lock:
+            codes = entries.setdefault(key, [])
+            if code in codes:
+                codes.remove(code)
+            codes.append(code)
+
+    @staticmethod
+    def _unpoint(index, key, code):
+        lock, entries = index.shard(key)
+        with lock:
+            codes = entries.get(key)
+            if codes and code in codes:
+                codes.remove(code)
+                if not codes:
+                    del entries[key]
+
+    def _follow(self, index, key):
+        lock, entries = index.shard(key)
+        with lock:
+            codes = list(entries.get(key, ()))
+        for code in reversed(codes):
+            info = self.get(code)
+            if info is not None:
+                return code, info
+            # Removed between being indexed and looked up
+            self._unpoint(index, key, code)
+        return None
@@ -0,0 +1,191 @@
+"""Admission control: token-bucket rate limits and a concurrency cap.
+
+Buckets live either in process memory (MemoryBackend) or in Redis
+(RedisBackend) so that every gunicorn worker draws from the same budget.
+Rejected requests get a fast 429 with a Retry-After header before any
+Firestore work is done.
+"""
+import functools
+import math
+import threading
+import time
+
+from flask import jsonify, request
+from prometheus_client import Counter, Gauge
+
+DECISIONS = Counter(
+    'attendmax_rate_limit_decisions_total',
+    'Admission control decisions by limiter',
+    ['limiter', 'outcome'])
+IN_FLIGHT = Gauge(
+    'attendmax_concurrency_in_flight',
+    'Requests currently admitted by a concurrency limit',
+    ['limiter'],
+    multiprocess_mode='livesum')
+
+
+class MemoryBackend:
+    """Token buckets held in this process."""
+
+    # Buckets idle for this long are full again and can be forgotten
+    PRUNE_AFTER_SECONDS = 600
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._last_prune = clock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Take `cost` tokens; return seconds to wait, or 0 if allowed."""
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (cost - tokens) / rate
+            if now - self._last_prune > self.PRUNE_AFTER_SECONDS:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        cutoff = now - self.PRUNE_AFTER_SECONDS
+        self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= cutoff}
+        self._last_prune = now
+
+
+class RedisBackend:
+    """Token buckets shared by all workers through Redis.
+
+    The refill-and-take runs as one Lua script, so concurrent workers cannot
+    both spend the last token.
+    """
+
+    _SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', key, 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', key, 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, url, prefix='attendmax:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATE_LIMIT_REDIS_URL is set but the redis package is not installed')
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._script = self._client.register_script(self._SCRIPT)
+        self._prefix = prefix
+
+    def take(self, key, rate, burst, cost=1):
+        return float(self._script(keys=[self._prefix + key], args=[rate, burst, cost]))
+
+
+class RateLimit:
+    """A named token bucket policy: `rate` tokens per second, up to `burst`."""
+
+    def __init__(self, name, rate, burst, backend):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.backend = backend
+
+    def hit(self, key):
+        """Return seconds the caller must wait, or 0 if the request may proceed."""
+        try:
+            wait = self.backend.take(f'{self.name}:{key}', self.rate, self.burst)
+        except Exception:
+            # A shared backend outage must not take attendance down with it.
+            DECISIONS.labels(limiter=self.name, outcome='backend_error').inc()
+            return 0.0
+        DECISIONS.labels(limiter=self.name, outcome='rejected' if wait else 'allowed').inc()
+        return wait
+
+
+class ConcurrencyLimit:
+    """Cap on requests in flight in this worker; excess is shed, never queued."""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._in_flight = IN_FLIGHT.labels(limiter=name)
+
+    def try_acquire(self):
+        if not self._semaphore.acquire(blocking=False):
+            DECISIONS.labels(limiter=self.name, outcome='rejected').inc()
+            return False
+        DECISIONS.labels(limiter=self.name, outcome='allowed').inc()
+        self._in_flight.inc()
+        return True
+
+    def release(self):
+        self._in_flight.dec()
+        self._semaphore.release()
+
+
+def backend_from_url(url):
+    """Return a RedisBackend for `url`, or a MemoryBackend if it is empty."""
+    return RedisBackend(url) if url else MemoryBackend()
+
+
+def client_ip():
+    """The client address.
+
+    X-Forwarded-For is not read here: its leading hops are whatever the
+    client sent. Behind proxies, the app's ProxyFix (TRUSTED_PROXIES) sets
+    remote_addr from the hop the trusted proxy appended.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def too_many_requests(retry_after, message='Too many requests. Please try again shortly.'):
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_control(concurrency=None, limits=(), reject=too_many_requests):
+    """Decorate a view with a concurrency cap and keyed rate limits.
+
+    `limits` is a sequence of (RateLimit, key_fn) pairs; key_fn returns the
+    bucket key for the current request, or None to skip that limit.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if concurrency is not None and not concurrency.try_acquire():
+                return reject(1)
+            try:
+                for limit, key_fn in limits:
+                    key = key_fn()
+                    if key is None:
+                        continue
+                    wait = limit.hit(key)
+                    if wait:
+                        return reject(wait)
+                return view(*args, **kwargs)
+            finally:
+                if concurrency is not None:
+                    concurrency.release()
+        return wrapper
+    return decorator
@@ -0,0 +1,273 @@
+"""In-memory replicas of small, read-mostly reference collections.
+
+Each worker holds a copy of `students`, `courses`, `faculty`, `timetable`,
+`exams` and `library_books`, kept current by Firestore realtime snapshot listeners, with
+hash indexes on the fields handlers filter by. Reads are dictionary lookups
+instead of network round trips.
+
+Staleness is bounded: a supervisor thread resubscribes any listener whose
+stream has stopped (a fresh subscription delivers the whole collection, so
+the replica is rebuilt rather than patched). Live listeners already deliver
+every change, so there is no periodic resync by default; a fresh
+subscription re-reads the whole collection, which for the library catalog
+is tens of thousands of reads per worker. REPLICA_RESYNC_SECONDS turns one
+on. A replica that has not received its
+first snapshot, or has been disconnected for longer than
+MAX_STALENESS_SECONDS, reports ready() == False and callers fall back to
+querying Firestore.
+"""
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import Gauge
+
+import metrics
+from library_search import DEFAULT_PER_PAGE, CatalogIndex
+from scheduling import IntervalIndex, exam_booking, timetable_booking
+
+MAX_STALENESS_SECONDS = 30
+# Resubscribe live listeners this often as well; 0 (the default) never does
+RESYNC_SECONDS = int(os.environ.get('REPLICA_RESYNC_SECONDS', 0))
+CHECK_INTERVAL_SECONDS = 5
+
+REPLICA_DOCUMENTS = Gauge(
+    'attendmax_replica_documents',
+    'Documents held in the in-memory replica of a collection',
+    ['collection'],
+    multiprocess_mode='livemin')
+REPLICA_CONNECTED = Gauge(
+    'attendmax_replica_connected',
+    '1 while the snapshot listener behind a replica is streaming',
+    ['collection'],
+    multiprocess_mode='livemin')
+
+logger = logging.getLogger('attendmax.replica')
+
+
+class CollectionReplica:
+    """A collection mirrored in memory with equality indexes.
+
+    `indexes` is a sequence of field-name tuples; where() uses the index that
+    covers the most of the requested fields and filters the rest.
+    """
+
+    def __init__(self, db, name, indexes=()):
+        self.db = db
+        self.name = name
+        self.indexes = [tuple(fields) for fields in indexes]
+        self._lock = threading.Lock()
+        self._docs = {}
+        self._index_data = {fields: {} for fields in self.indexes}
+        self._watch = None
+        self._needs_rebuild = True
+        self._loaded = False
+        self._subscribed_at = 0.0
+        self._disconnected_since = None
+        metrics.set_function(REPLICA_DOCUMENTS.labels(collection=name), lambda: len(self._docs))
+        metrics.set_function(REPLICA_CONNECTED.labels(collection=name), lambda: int(self.connected))
+
+    # Listener
+
+    def subscribe(self):
+        """(Re)start the snapshot listener; the next snapshot rebuilds the replica."""
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                logger.warning("Error closing %s listener", self.name, exc_info=True)
+        with self._lock:
+            self._needs_rebuild = True
+        self._subscribed_at = time.time()
+        self._watch = self.db.collection(self.name).on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        with self._lock:
+            if self._needs_rebuild:
+                self._reset()
+                for doc in docs:
+                    self._put(doc.id, doc.to_dict())
+                self._needs_rebuild = False
+            else:
+                for change in changes:
+                    if change.type.name == 'REMOVED':
+                        self._remove(change.document.id)
+                    else:
+                        self._put(change.document.id, change.document.to_dict())
+            self._loaded = True
+            self._disconnected_since = None
+
+    def _reset(self):
+        self._docs = {}
+        self._index_data = {fields: {} for fields in self.indexes}
+
+    def _key(self, fields, data):
+        return tuple(data.get(field) for field in fields)
+
+    def _put(self, doc_id, data):
+        self._remove(doc_id)
+        self._docs[doc_id] = data
+        for fields in self.indexes:
+            self._index_data[fields].setdefault(self._key(fields, data), set()).add(doc_id)
+
+    def _remove(self, doc_id):
+        old = self._docs.pop(doc_id, None)
+        if old is None:
+            return
+        for fields in self.indexes:
+            bucket = self._index_data[fields].get(self._key(fields, old))
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._index_data[fields][self._key(fields, old)]
+
+    @property
+    def connected(self):
+        return self._watch is not None and self._watch.is_active
+
+    def check(self, now=None):
+        """Resubscribe if the listener has stopped or, if enabled, is due a periodic resync."""
+        now = now or time.time()
+        if not self.connected:
+            if self._disconnected_since is None:
+                self._disconnected_since = now
+                logger.warning("Replica listener for %s disconnected, resubscribing", self.name)
+            self.subscribe()
+        elif RESYNC_SECONDS and now - self._subscribed_at > RESYNC_SECONDS:
+            self.subscribe()
+
+    def ready(self):
+        """True when reads can be served from memory within the staleness bound."""
+        if not self._loaded:
+            return False
+        since = self._disconnected_since
+        return since is None or time.time() - since <= MAX_STALENESS_SECONDS
+
+    # Reads; results are copies, so callers may modify them
+
+    def get(self, doc_id):
+        """The document's data, or None if it does not exist."""
+        with self._lock:
+            data = self._docs.get(doc_id)
+            return dict(data) if data is not None else None
+
+    def where(self, **equals):
+        """[(doc_id, data)] for documents whose fields equal the given values.
+
+        None values are ignored, so optional query-string filters can be
+        passed straight through.
+        """
+        equals = {field: value for field, value in equals.items() if value is not None}
+        with self._lock:
+            usable = [fields for fields in self.indexes if set(fields) <= set(equals)]
+            if usable:
+                fields = max(usable, key=len)
+                ids = self._index_data[fields].get(tuple(equals[field] for field in fields), ())
+                candidates = ((doc_id, self._docs[doc_id]) for doc_id in ids)
+            else:
+                candidates = self._docs.items()
+            return [(doc_id, dict(data)) for doc_id, data in candidates
+                    if all(data.get(field) == value for field, value in equals.items())]
+
+    def all(self):
+        return self.where()
+
+
+class CatalogReplica(CollectionReplica):
+    """The `library_books` replica, with a full-text and prefix search index."""
+
+    def __init__(self, db):
+        self.index = CatalogIndex()
+        super().__init__(db, 'library_books', indexes=[('isbn',)])
+
+    def _reset(self):
+        super()._reset()
+        self.index.clear()
+
+    def _put(self, doc_id, data):
+        super()._put(doc_id, data)
+        self.index.add(doc_id, data)
+
+    def _remove(self, doc_id):
+        super()._remove(doc_id)
+        self.index.remove(doc_id)
+
+    def put(self, doc_id, data):
+        """Apply a local write now rather than when its snapshot arrives."""
+        with self._lock:
+            self._put(doc_id, data)
+
+    def search(self, query, offset=0, limit=DEFAULT_PER_PAGE):
+        """(total matches, [(doc_id, data)]) for one page of ranked results."""
+        with self._lock:
+            total, ids = self.index.search(query, offset, limit)
+            return total, [(doc_id, dict(self._docs[doc_id])) for doc_id in ids]
+
+
+class ScheduleReplica(CollectionReplica):
+    """A replica of `timetable` or `exams`, with interval indexes for clash checks.
+
+    `booking(data, doc_id)` returns a document's scheduling.Booking; documents
+    it raises ValueError for (e.g. unparseable times) are not indexed.
+    """
+
+    def __init__(self, db, name, booking, indexes=()):
+        self.booking = booking
+        self.bookings = IntervalIndex()
+        super().__init__(db, name, indexes)
+
+    def _reset(self):
+        super()._reset()
+        self.bookings = IntervalIndex()
+
+    def _put(self, doc_id, data):
+        super()._put(doc_id, data)
+        try:
+            self.bookings.add(self.booking(data, doc_id))
+        except ValueError:
+            pass
+
+    def _remove(self, doc_id):
+        super()._remove(doc_id)
+        self.bookings.remove(doc_id)
+
+    def clashes(self, bookings, exclude=None, weekly=True):
+        """Clash reports of new bookings, among themselves and against the replica."""
+        with self._lock:
+            return self.bookings.clashes(bookings, exclude, weekly)
+
+
+class ReferenceData:
+    """The replicated reference collections and the supervisor that keeps them live."""
+
+    def __init__(self, db):
+        self.students = CollectionReplica(db, 'students', indexes=[
+            ('uid',), ('department',), ('department', 'year', 'semester')])
+        self.courses = CollectionReplica(db, 'courses', indexes=[
+            ('code',), ('department',), ('department', 'semester')])
+        self.faculty = CollectionReplica(db, 'faculty', indexes=[('email',), ('department',)])
+        self.timetable = ScheduleReplica(db, 'timetable', timetable_booking, indexes=[
+            ('department',), ('department', 'year', 'semester')])
+        self.exams = ScheduleReplica(db, 'exams', exam_booking, indexes=[('department',)])
+        self.library_books = CatalogReplica(db)
+        self.replicas = [self.students, self.courses, self.faculty, self.timetable, self.exams,
+                         self.library_books]
+
+    def _supervise(self):
+        while True:
+            time.sleep(CHECK_INTERVAL_SECONDS)
+            for replica in self.replicas:
+                try:
+                    replica.check()
+                except Exception:
+                    logger.exception("Error resubscribing replica of %s", replica.name)
+
+    def start(self):
+        for replica in self.replicas:
+            try:
+                replica.subscribe()
+            except Exception:
+                # The supervisor retries; until then reads go to Firestore
+                logger.exception("Error subscribing replica of %s", replica.name)
+        threading.Thread(target=self._supervise, name='replica-supervisor', daemon=True).start()
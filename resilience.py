@@ -0,0 +1,287 @@
+"""Deadlines, retries and circuit breakers around Firestore and Firebase Auth.
+
+install() patches the Firestore client and firebase_admin.auth, the same way
+metrics.instrument_firebase() does, so every call made by app.py gets:
+
+- a per-attempt deadline (FIRESTORE_TIMEOUT_SECONDS; Auth uses the
+  `httpTimeout` app option, see AUTH_TIMEOUT_SECONDS). A query's deadline
+  covers the whole stream, not one page, so Query.stream() only gets one
+  when FIRESTORE_STREAM_TIMEOUT_SECONDS is set and otherwise keeps the
+  client's default,
+- for Firestore reads, bounded retries with jittered exponential backoff
+  (google.api_core's Retry) on transient errors; writes are not retried
+  because add() and Increment are not idempotent. Auth reads are already
+  retried on 500/503 by firebase_admin's HTTP client,
+- a circuit breaker per backend. When too many recent calls have failed
+  with availability errors, calls fail fast with CircuitOpenError for
+  OPEN_SECONDS; then a single probe call decides whether to close again.
+
+Handlers catch broad exceptions and answer 500, so init_app() rewrites any
+5xx response from a request that hit an open breaker into a 503 with
+Retry-After. Breaker state and retry counts are exported to /metrics.
+"""
+import collections
+import functools
+import os
+import threading
+import time
+
+import requests
+from firebase_admin import exceptions as firebase_exceptions
+from flask import g, has_request_context, jsonify
+from google.api_core import exceptions as api_exceptions
+from google.api_core.gapic_v1.method import DEFAULT
+from google.api_core.retry import Retry, if_exception_type
+from prometheus_client import Counter, Gauge
+
+import metrics
+
+FIRESTORE_TIMEOUT_SECONDS = float(os.environ.get('FIRESTORE_TIMEOUT_SECONDS', 5))
+# Deadline of a whole query stream; 0 leaves the client's default
+FIRESTORE_STREAM_TIMEOUT_SECONDS = float(os.environ.get('FIRESTORE_STREAM_TIMEOUT_SECONDS', 0))
+# Total time a Firestore read may spend retrying
+FIRESTORE_RETRY_DEADLINE_SECONDS = float(os.environ.get('FIRESTORE_RETRY_DEADLINE_SECONDS', 3))
+AUTH_TIMEOUT_SECONDS = float(os.environ.get('AUTH_TIMEOUT_SECONDS', 5))
+
+# A breaker opens when, within WINDOW_SECONDS, at least MIN_CALLS calls were
+# made and FAILURE_RATIO of them failed with availability errors
+WINDOW_SECONDS = 30
+MIN_CALLS = 10
+FAILURE_RATIO = 0.5
+OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', 15))
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+_STATE_NAMES = {CLOSED: 'closed', HALF_OPEN: 'half_open', OPEN: 'open'}
+
+CIRCUIT_STATE = Gauge(
+    'attendmax_circuit_state',
+    'Circuit breaker state per backend: 0 closed, 1 half-open, 2 open',
+    ['backend'],
+    multiprocess_mode='livemax')
+CIRCUIT_REJECTIONS = Counter(
+    'attendmax_circuit_rejections_total',
+    'Backend calls failed fast because the circuit was open',
+    ['backend'])
+CIRCUIT_TRANSITIONS = Counter(
+    'attendmax_circuit_transitions_total',
+    'Circuit breaker state changes',
+    ['backend', 'state'])
+BACKEND_RETRIES = Counter(
+    'attendmax_backend_retries_total',
+    'Backend calls retried after a transient error',
+    ['backend', 'operation'])
+
+
+class CircuitOpenError(Exception):
+    """A backend call was refused because its circuit breaker is open."""
+
+    def __init__(self, backend, retry_after):
+        super().__init__(f'{backend} is unavailable; retry in {retry_after:.0f}s')
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+# Errors that say the backend is unhealthy, as opposed to a bad request
+_TRANSIENT_FIRESTORE_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.DeadlineExceeded,
+)
+
+
+def _is_availability_error(exc):
+    return isinstance(exc, _TRANSIENT_FIRESTORE_ERRORS + (
+        api_exceptions.RetryError,
+        firebase_exceptions.UnavailableError,
+        firebase_exceptions.DeadlineExceededError,
+        firebase_exceptions.InternalError,
+        firebase_exceptions.ResourceExhaustedError,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    ))
+
+
+class CircuitBreaker:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._calls = collections.deque()  # (time, failed)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        metrics.set_function(CIRCUIT_STATE.labels(backend=backend), lambda: self._state)
+
+    @property
+    def state(self):
+        return _STATE_NAMES[self._state]
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            CIRCUIT_TRANSITIONS.labels(backend=self.backend, state=_STATE_NAMES[state]).inc()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + OPEN_SECONDS - time.monotonic()
+                if remaining > 0:
+                    self._reject(remaining)
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                # One probe at a time; everyone else keeps failing fast
+                if self._probing:
+                    self._reject(1)
+                self._probing = True
+
+    def _reject(self, retry_after):
+        CIRCUIT_REJECTIONS.labels(backend=self.backend).inc()
+        if has_request_context():
+            g.circuit_open = max(retry_after, g.get('circuit_open', 0))
+        raise CircuitOpenError(self.backend, retry_after)
+
+    def record(self, failed):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                self._calls.clear()
+                if failed:
+                    self._opened_at = now
+                    self._set_state(OPEN)
+                else:
+                    self._set_state(CLOSED)
+                return
+
+            self._calls.append((now, failed))
+            while self._calls and self._calls[0][0] < now - WINDOW_SECONDS:
+                self._calls.popleft()
+            failures = sum(1 for _, f in self._calls if f)
+            if (self._state == CLOSED and len(self._calls) >= MIN_CALLS
+                    and failures >= FAILURE_RATIO * len(self._calls)):
+                self._opened_at = now
+                self._set_state(OPEN)
+
+
+breakers = {'firestore': CircuitBreaker('firestore'), 'auth': CircuitBreaker('auth')}
+
+
+def breaker_states():
+    """{backend: 'closed' | 'half_open' | 'open'}"""
+    return {backend: breaker.state for backend, breaker in breakers.items()}
+
+
+def _retry_policy(operation):
+    def on_error(exc):
+        BACKEND_RETRIES.labels(backend='firestore', operation=operation).inc()
+    return Retry(predicate=if_exception_type(*_TRANSIENT_FIRESTORE_ERRORS),
+                 initial=0.2, maximum=1.0, multiplier=2.0,
+                 timeout=FIRESTORE_RETRY_DEADLINE_SECONDS, on_error=on_error)
+
+
+def _with_deadline(kwargs, retry, timeout=FIRESTORE_TIMEOUT_SECONDS):
+    if kwargs.get('timeout') is None and timeout:
+        kwargs['timeout'] = timeout
+    if kwargs.get('retry', DEFAULT) is DEFAULT:
+        kwargs['retry'] = retry
+    return kwargs
+
+
+def _guarded(backend, retry=None):
+    """Wrap a blocking call with the backend's breaker (and Firestore deadlines)."""
+    breaker = breakers[backend]
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if backend == 'firestore':
+                kwargs = _with_deadline(kwargs, retry)
+            breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                breaker.record(_is_availability_error(e))
+                raise
+            breaker.record(False)
+            return result
+        return wrapper
+    return decorator
+
+
+def _guarded_stream(retry, timeout=FIRESTORE_TIMEOUT_SECONDS):
+    """Wrap a Firestore generator; the outcome is recorded when it finishes."""
+    breaker = breakers['firestore']
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            kwargs = _with_deadline(kwargs, retry, timeout)
+            return _recorded(lambda: fn(*args, **kwargs), breaker)
+        return wrapper
+    return decorator
+
+
+def _recorded(start, breaker):
+    # The breaker is consulted on the first next(), not when stream() is
+    # called: a result that is never iterated never reaches the finally
+    # below, and would otherwise leave a half-open probe in flight forever
+    breaker.before_call()
+    failed = False
+    try:
+        yield from start()
+    except Exception as e:
+        failed = _is_availability_error(e)
+        raise
+    finally:
+        # Also runs when the caller stops early, which is a successful call
+        breaker.record(failed)
+
+
+def install():
+    """Patch the Firestore client and firebase_admin.auth. Safe to call twice."""
+    from firebase_admin import auth
+    from google.cloud.firestore_v1 import Client, DocumentReference, Query, WriteBatch
+
+    if getattr(Query.stream, '_attendmax_resilient', False):
+        return
+
+    patches = [
+        (Query, 'stream', _guarded_stream(_retry_policy('query'), FIRESTORE_STREAM_TIMEOUT_SECONDS)),
+        (Client, 'get_all', _guarded_stream(_retry_policy('get_all'))),
+        (DocumentReference, 'get', _guarded('firestore', _retry_policy('get'))),
+        # Writes get a deadline but no retries
+        (DocumentReference, 'delete', _guarded('firestore', retry=None)),
+        (WriteBatch, 'commit', _guarded('firestore', retry=None)),
+    ]
+    for owner, name, wrap in patches:
+        wrapped = wrap(getattr(owner, name))
+        wrapped._attendmax_resilient = True
+        setattr(owner, name, wrapped)
+
+    for name in ('get_user', 'get_user_by_email', 'get_users', 'list_users',
+                 'create_user', 'update_user', 'delete_user', 'set_custom_user_claims',
+                 'import_users', 'create_custom_token'):
+        if hasattr(auth, name):
+            setattr(auth, name, _guarded('auth')(getattr(auth, name)))
+
+
+def init_app(app):
+    """Answer 503 with Retry-After when a request failed on an open breaker."""
+
+    def unavailable(retry_after):
+        response = jsonify({'error': 'Service temporarily unavailable, please try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response
+
+    @app.errorhandler(CircuitOpenError)
+    def _circuit_open(e):
+        return unavailable(e.retry_after)
+
+    @app.after_request
+    def _circuit_open_response(response):
+        retry_after = g.pop('circuit_open', None)
+        if retry_after is not None and response.status_code >= 500:
+            return unavailable(retry_after)
+        return response
@@ -0,0 +1,296 @@
+"""Persistent scheduler for time-based status transitions.
+
+Jobs live in the `scheduled_jobs` collection, one document per
+(kind, target document), so they survive restarts and scheduling the same
+transition twice only moves its due time:
+
+    activate_notification   notifications  scheduled -> active
+    start_exam              exams          upcoming -> ongoing
+    complete_exam           exams          upcoming/ongoing -> completed
+
+Every worker can schedule jobs, but only the holder of a lease document
+runs them. The leader keeps pending jobs in a heap ordered by due time,
+sleeps until the next one is due (re-reading the jobs due within
+HORIZON_SECONDS every POLL_SECONDS, to pick up jobs scheduled by other
+workers) and applies all due jobs in batched writes. A poll reads only the
+jobs about to run, not the whole backlog; it needs the composite index
+    scheduled_jobs: status ASC, run_at ASC
+
+A job only changes its target if the target is still in the expected
+state, so cancelled or hand-edited documents are left alone.
+
+Transitions that need more than a field update (e.g. giving a reserved
+library copy back) are registered with register(); their handler runs on
+its own, typically as a transaction, and returns whether it applied.
+"""
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from firebase_admin import firestore
+from prometheus_client import Counter
+
+import metrics
+
+JOBS = 'scheduled_jobs'
+LEASE_COLLECTION = 'locks'
+LEASE_DOCUMENT = 'scheduler'
+LEASE_SECONDS = 30
+POLL_SECONDS = 10
+# Each poll queues the pending jobs due within this window, at most RELOAD_LIMIT of them
+HORIZON_SECONDS = 60
+RELOAD_LIMIT = 1000
+# Two writes per job (target and job document) within Firestore's 500
+BATCH_JOBS = 200
+
+# kind -> (collection, states the target may be in, fields to set)
+TRANSITIONS = {
+    'activate_notification': ('notifications', ('scheduled',),
+                              {'status': 'active', 'published_at': firestore.SERVER_TIMESTAMP}),
+    'start_exam': ('exams', ('upcoming',), {'status': 'ongoing'}),
+    'complete_exam': ('exams', ('upcoming', 'ongoing'), {'status': 'completed'}),
+}
+
+# kind -> (collection, handler(db, doc_id) -> bool), see register()
+HANDLERS = {}
+
+JOBS_RUN = Counter(
+    'attendmax_scheduled_jobs_total',
+    'Scheduled jobs run, by kind and whether the transition was applied',
+    ['kind', 'result'])
+
+logger = logging.getLogger('attendmax.scheduler')
+
+
+def job_id(kind, doc_id):
+    return f'{kind}_{doc_id}'
+
+
+def register(kind, collection, handler):
+    """Run `handler(db, doc_id)` for due `kind` jobs instead of a field update."""
+    HANDLERS[kind] = (collection, handler)
+
+
+def _collection(kind):
+    if kind in TRANSITIONS:
+        return TRANSITIONS[kind][0]
+    if kind in HANDLERS:
+        return HANDLERS[kind][0]
+    return None
+
+
+def job_document(kind, doc_id, run_at):
+    """(job id, document) of a pending job, for writing it in a caller's own transaction."""
+    collection = _collection(kind)
+    if collection is None:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    return job_id(kind, doc_id), {
+        'kind': kind,
+        'collection': collection,
+        'document_id': doc_id,
+        'run_at': run_at,
+        'status': 'pending',
+        'created_at': datetime.now()
+    }
+
+
+def parse_duration(value, default_minutes=None):
+    """timedelta from minutes (number or digits) or text like '2 hours' / '90 min' / '1h30m'.
+
+    Raises ValueError for anything else, or a duration that is not
+    positive, unless a `default_minutes` fallback is given.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        duration = timedelta(minutes=value)
+    else:
+        text = str(value or '').strip().lower()
+        hours = re.search(r'(\d+(?:\.\d+)?)\s*h', text)
+        minutes = re.search(r'(\d+)\s*m', text)
+        if text.isdigit():
+            duration = timedelta(minutes=int(text))
+        elif hours or minutes:
+            duration = timedelta(hours=float(hours.group(1)) if hours else 0,
+                                 minutes=int(minutes.group(1)) if minutes else 0)
+        else:
+            duration = None
+    if duration is None or duration <= timedelta(0):
+        if default_minutes is None:
+            raise ValueError(f'duration must be minutes or text like "2 hours", not {value!r}')
+        return timedelta(minutes=default_minutes)
+    return duration
+
+
+def _naive(value):
+    # Naive datetimes are written as-is and read back labelled UTC
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else value
+
+
+class Scheduler:
+    def __init__(self, db, poll_interval=POLL_SECONDS):
+        self.db = db
+        self.poll_interval = poll_interval
+        self._owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._heap = []
+        self._due = {}  # job id -> run_at of its live heap entry
+        self._wake = threading.Condition()
+        self._leader = False
+        metrics.register_queue('scheduler', lambda: len(self._due))
+
+    # Scheduling
+
+    def schedule(self, kind, doc_id, run_at):
+        """Persist a job and, if this worker is the leader, queue it locally.
+
+        Other workers' jobs reach the leader through its next reload.
+        """
+        job, document = job_document(kind, doc_id, run_at)
+        self.db.collection(JOBS).document(job).set(document)
+        self.queue(kind, doc_id, run_at)
+
+    def queue(self, kind, doc_id, run_at):
+        """Queue a job whose document was written elsewhere (see job_document()), if leader."""
+        if self._leader:
+            self._push(job_id(kind, doc_id), run_at)
+
+    def _push(self, job, run_at):
+        with self._wake:
+            if self._due.get(job) == run_at:
+                return
+            self._due[job] = run_at
+            heapq.heappush(self._heap, (run_at, job))
+            self._wake.notify()
+
+    def _pop_due(self, now):
+        due = []
+        with self._wake:
+            while self._heap and self._heap[0][0] <= now and len(due) < BATCH_JOBS:
+                run_at, job = heapq.heappop(self._heap)
+                # Skip entries superseded by a later reschedule
+                if self._due.get(job) == run_at:
+                    del self._due[job]
+                    due.append(job)
+        return due
+
+    def _next_due(self):
+        with self._wake:
+            return self._heap[0][0] if self._heap else None
+
+    # Running
+
+    def reload(self, now=None):
+        """Queue the pending jobs due within HORIZON_SECONDS; returns how many were read."""
+        horizon = (now or datetime.now()) + timedelta(seconds=HORIZON_SECONDS)
+        query = (self.db.collection(JOBS).where('status', '==', 'pending').where('run_at', '<=', horizon)
+                 .order_by('run_at').limit(RELOAD_LIMIT))
+        read = 0
+        for doc in query.stream():
+            read += 1
+            data = doc.to_dict()
+            if _collection(data.get('kind')) and isinstance(data.get('run_at'), datetime):
+                self._push(doc.id, _naive(data['run_at']))
+        return read
+
+    def _clear(self):
+        with self._wake:
+            self._heap = []
+            self._due = {}
+
+    def run_due(self, now=None):
+        """Apply every job due by `now` in batched writes; returns how many ran."""
+        now = now or datetime.now()
+        ran = 0
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                return ran
+            job_refs = [self.db.collection(JOBS).document(job) for job in due]
+            jobs = [(doc.reference, doc.to_dict()) for doc in self.db.get_all(job_refs)
+                    if doc.exists and doc.to_dict().get('status') == 'pending']
+            target_refs = {job_ref.id: self.db.collection(job['collection']).document(job['document_id'])
+                           for job_ref, job in jobs if job['kind'] in TRANSITIONS}
+            targets = {doc.reference.path: doc.to_dict() for doc in self.db.get_all(list(target_refs.values()))
+                       if doc.exists} if target_refs else {}
+
+            batch = self.db.batch()
+            results = []
+            for job_ref, job in jobs:
+                if job['kind'] in HANDLERS:
+                    try:
+                        applied = HANDLERS[job['kind']][1](self.db, job['document_id'])
+                    except Exception:
+                        # Left pending; the next reload queues it again
+                        logger.exception("Error running scheduled job %s", job_ref.id)
+                        continue
+                    result = 'applied' if applied else 'skipped'
+                else:
+                    _, from_states, changes = TRANSITIONS[job['kind']]
+                    target_ref = target_refs[job_ref.id]
+                    target = targets.get(target_ref.path)
+                    if target is not None and target.get('status') in from_states:
+                        batch.update(target_ref, dict(changes))
+                        result = 'applied'
+                    else:
+                        result = 'skipped'
+                batch.update(job_ref, {'status': 'done', 'result': result,
+                                       'done_at': firestore.SERVER_TIMESTAMP})
+                results.append((job['kind'], result))
+            if results:
+                batch.commit()
+            for kind, result in results:
+                JOBS_RUN.labels(kind=kind, result=result).inc()
+            ran += len(results)
+
+    def _acquire_lease(self):
+        """Become (or stay) the one worker that runs jobs."""
+        ref = self.db.collection(LEASE_COLLECTION).document(LEASE_DOCUMENT)
+        now = time.time()
+
+        @firestore.transactional
+        def take(transaction):
+            snapshot = ref.get(transaction=transaction)
+            lease = snapshot.to_dict() if snapshot.exists else {}
+            if lease.get('owner') not in (None, self._owner) and lease.get('until', 0) > now:
+                return False
+            transaction.set(ref, {'owner': self._owner, 'until': now + LEASE_SECONDS})
+            return True
+
+        return take(self.db.transaction())
+
+    def _run(self):
+        next_poll = 0.0
+        while True:
+            try:
+                leader = self._acquire_lease()
+                if leader and not self._leader:
+                    logger.info("Scheduler lease acquired", extra={'owner': self._owner})
+                    next_poll = 0.0
+                elif self._leader and not leader:
+                    # The new leader reloads the table; drop the local queue
+                    self._clear()
+                self._leader = leader
+                if leader:
+                    if time.monotonic() >= next_poll:
+                        # A full page means more jobs are due: read again right after running these
+                        full = self.reload() >= RELOAD_LIMIT
+                        next_poll = 0.0 if full else time.monotonic() + self.poll_interval
+                    ran = self.run_due()
+                    if ran:
+                        logger.info("Scheduled jobs applied", extra={'jobs': ran})
+            except Exception:
+                logger.exception("Error running scheduled jobs")
+
+            # Sleep until the next job is due, the next poll or lease renewal
+            timeout = min(self.poll_interval, LEASE_SECONDS / 3)
+            next_due = self._next_due() if self._leader else None
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, (next_due - datetime.now()).total_seconds()))
+            with self._wake:
+                self._wake.wait(timeout)
+
+    def start(self):
+        threading.Thread(target=self._run, name='scheduler', daemon=True).start()
@@ -0,0 +1,270 @@
+"""Clash detection for timetable slots and exams.
+
+Every slot or exam is a booking: a half-open time interval [start, end) on
+some resources, namely its room, its faculty member and its cohort. Two
+bookings clash when they share a resource and their intervals overlap.
+Timetable slots repeat weekly, so they are placed on a week of minutes
+(Monday 00:00 = 0). Exams are dated and placed on absolute minutes. The two
+kinds are indexed separately and never compared with each other.
+
+IntervalIndex keeps, per resource, the bookings sorted by start time.
+Checking a new booking is then a bisect to the bookings that start before
+it ends, scanning back only as far as the longest booking on that resource
+could reach. That is O(log n + k) for k clashes, however many bookings the
+institution has.
+
+find_clashes() checks a whole term at once with a sweep line per
+resource: sort by start, and keep a heap of the bookings still running.
+That is O(n log n + k) instead of comparing every pair of slots.
+
+Usage: python scheduling.py   (runs the 12k-slot benchmark)
+"""
+import heapq
+import os
+import re
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import datetime
+
+from scheduler import parse_duration
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MINUTES_PER_DAY = 24 * 60
+# Length of a timetable slot given only a start time
+SLOT_MINUTES = int(os.environ.get('TIMETABLE_SLOT_MINUTES', 60))
+
+_CLOCK = r'(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?'
+_TIME_RANGE = re.compile(rf'^\s*{_CLOCK}\s*(?:(?:-|–|to)\s*{_CLOCK})?\s*$', re.IGNORECASE)
+
+Booking = namedtuple('Booking', 'start end resources ref label department')
+
+
+class ScheduleError(Exception):
+    """Bookings that clash with each other or with the schedule; `clashes` describes each."""
+
+    def __init__(self, message, clashes=(), status=409):
+        super().__init__(message)
+        self.clashes = list(clashes)
+        self.status = status
+
+
+def _minutes(hours, minutes, meridiem):
+    hours, minutes = int(hours), int(minutes or 0)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            raise ValueError('hour must be 1-12 with am/pm')
+        hours = hours % 12 + (12 if meridiem.lower().startswith('p') else 0)
+    if hours > 24 or minutes > 59:
+        raise ValueError('invalid time of day')
+    return hours * 60 + minutes
+
+
+def slot_interval(day, time_range, duration=None):
+    """[start, end) week minutes of a weekly slot: day name and 'HH:MM-HH:MM' or a start time.
+
+    A slot with only a start time lasts `duration` (see
+    scheduler.parse_duration), or SLOT_MINUTES when it has none. A
+    duration that cannot be parsed raises ValueError.
+    """
+    day_name = str(day or '').strip().lower()
+    matches = [i for i, name in enumerate(DAYS) if len(day_name) >= 3 and name.startswith(day_name)]
+    if len(matches) != 1:
+        raise ValueError(f'unknown day: {day!r}')
+    match = _TIME_RANGE.match(str(time_range or ''))
+    if not match:
+        raise ValueError(f'time must be HH:MM or HH:MM-HH:MM, not {time_range!r}')
+    start = _minutes(*match.group(1, 2, 3))
+    if match.group(4):
+        # '10-11am': the start takes the end's am/pm
+        end = _minutes(*match.group(4, 5, 6))
+        if match.group(6) and not match.group(3):
+            start = _minutes(match.group(1), match.group(2), match.group(6))
+    else:
+        length = parse_duration(duration) if duration not in (None, '') else None
+        end = start + (int(length.total_seconds() // 60) if length else SLOT_MINUTES)
+    if end <= start:
+        raise ValueError(f'slot {time_range!r} ends before it starts')
+    offset = matches[0] * MINUTES_PER_DAY
+    return offset + start, offset + end
+
+
+def exam_interval(date, time_of_day, duration):
+    """[start, end) minutes since the epoch of an exam on `date` (YYYY-MM-DD) at HH:MM."""
+    starts_at = datetime.strptime(f'{date} {time_of_day}', '%Y-%m-%d %H:%M')
+    start = int((starts_at - datetime(1970, 1, 1)).total_seconds() // 60)
+    return start, start + max(1, int(parse_duration(duration).total_seconds() // 60))
+
+
+def cohort(department, year=None, semester=None):
+    return ('cohort', '/'.join(str(part) for part in (department, year, semester) if part not in (None, '')))
+
+
+def slot_booking(slot, department, year, semester, ref=None):
+    """Booking of a timetable slot: its room, faculty member and class."""
+    start, end = slot_interval(slot.get('day'), slot.get('time'), slot.get('duration'))
+    resources = [cohort(department, year, semester)]
+    for kind in ('room', 'faculty'):
+        if slot.get(kind):
+            resources.append((kind, str(slot[kind]).strip().casefold()))
+    label = f"{department} {year}/{semester} {slot.get('subject', '')} {slot.get('day')} {slot.get('time')}"
+    return Booking(start, end, tuple(resources), ref, label, department)
+
+
+def timetable_booking(slot, ref=None):
+    """Booking of a stored timetable document, which carries its class."""
+    return slot_booking(slot, slot.get('department'), slot.get('year'), slot.get('semester'), ref)
+
+
+def exam_booking(exam, ref=None):
+    """Booking of an exam: its department's students and any rooms it lists."""
+    start, end = exam_interval(exam.get('date'), exam.get('time'), exam.get('duration'))
+    # Exams are set per department, so they hold all of its classes
+    resources = [cohort(exam.get('department'))]
+    rooms = exam.get('rooms') or ([exam['room']] if exam.get('room') else [])
+    if isinstance(rooms, str) or not all(isinstance(room, str) for room in rooms):
+        raise ValueError('rooms must be a list of room names')
+    resources += [('room', room.strip().casefold()) for room in rooms]
+    label = f"{exam.get('name', '')} ({exam.get('department')}) {exam.get('date')} {exam.get('time')}"
+    return Booking(start, end, tuple(resources), ref, label, exam.get('department'))
+
+
+def _clock(minutes):
+    return f'{minutes // 60 % 24:02d}:{minutes % 60:02d}'
+
+
+def describe(resource, booking, other, weekly=True):
+    """JSON-ready report of `booking` clashing with `other` on `resource`."""
+    start, end = max(booking.start, other.start), min(booking.end, other.end)
+    when = f'{DAYS[start // MINUTES_PER_DAY].title()} ' if weekly else ''
+    return {
+        'resource': resource[0],
+        'value': resource[1],
+        'booking': booking.label,
+        'clashes_with': other.label,
+        'clashes_with_id': other.ref,
+        'departments': sorted({str(booking.department), str(other.department)}),
+        'overlap': f'{when}{_clock(start)}-{_clock(end)}',
+        'overlap_minutes': end - start,
+    }
+
+
+class IntervalIndex:
+    """Bookings per resource, sorted by start; not thread-safe, callers lock."""
+
+    def __init__(self, bookings=()):
+        self._starts = {}    # resource -> sorted (start, sequence)
+        self._bookings = {}  # resource -> {sequence: booking}
+        self._longest = {}   # resource -> longest booking length, bounds the backward scan
+        self._refs = {}      # ref -> [(resource, (start, sequence))]
+        self._sequence = 0
+        for booking in bookings:
+            self.add(booking)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def add(self, booking):
+        self._sequence += 1
+        key = (booking.start, self._sequence)
+        for resource in booking.resources:
+            insort(self._starts.setdefault(resource, []), key)
+            self._bookings.setdefault(resource, {})[self._sequence] = booking
+            self._longest[resource] = max(self._longest.get(resource, 0), booking.end - booking.start)
+            self._refs.setdefault(booking.ref, []).append((resource, key))
+
+    def remove(self, ref):
+        for resource, key in self._refs.pop(ref, ()):
+            starts = self._starts[resource]
+            del starts[bisect_left(starts, key)]
+            del self._bookings[resource][key[1]]
+
+    def overlapping(self, booking, exclude=None):
+        """[(resource, other booking)] of indexed bookings clashing with `booking`.
+
+        `exclude(other)` returning True skips bookings about to be replaced.
+        """
+        found = []
+        for resource in booking.resources:
+            starts = self._starts.get(resource)
+            if not starts:
+                continue
+            bookings = self._bookings[resource]
+            earliest = booking.start - self._longest[resource]
+            i = bisect_left(starts, (booking.end,))
+            while i > 0 and starts[i - 1][0] > earliest:
+                i -= 1
+                other = bookings[starts[i][1]]
+                if other.end > booking.start and not (exclude and exclude(other)):
+                    found.append((resource, other))
+        return found
+
+    def clashes(self, bookings, exclude=None, weekly=True):
+        """Clash reports of new `bookings`, among themselves and against the index."""
+        reports = [describe(resource, booking, other, weekly)
+                   for booking in bookings for resource, other in self.overlapping(booking, exclude)]
+        return find_clashes(bookings, weekly) + reports
+
+
+def find_clashes(bookings, weekly=True):
+    """Clash reports of every overlapping pair of bookings on a shared resource."""
+    by_resource = {}
+    for booking in bookings:
+        for resource in booking.resources:
+            by_resource.setdefault(resource, []).append(booking)
+
+    reports = []
+    for resource, group in by_resource.items():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda booking: booking.start)
+        running = []  # heap of (end, position) of bookings not yet ended
+        for position, booking in enumerate(group):
+            while running and running[0][0] <= booking.start:
+                heapq.heappop(running)
+            for _, other in running:
+                reports.append(describe(resource, group[other], booking, weekly))
+            heapq.heappush(running, (booking.end, position))
+    return reports
+
+
+def _benchmark(n_classes=400, slots_per_class=30, n_rooms=250, n_faculty=500, seed=3):
+    """Time a whole-term check and per-slot checks against a synthetic institution's timetable."""
+    import random
+    rng = random.Random(seed)
+    bookings = []
+    for c in range(n_classes):
+        for s in range(slots_per_class):
+            slot = {'day': DAYS[rng.randrange(6)], 'time': f'{rng.randrange(8, 17)}:00',
+                    'room': f'R{rng.randrange(n_rooms)}', 'faculty': f'F{rng.randrange(n_faculty)}',
+                    'subject': f'S{s}'}
+            bookings.append(slot_booking(slot, f'D{c % 20}', c // 20 % 4 + 1, c % 2 + 1, ref=f'{c}-{s}'))
+
+    start = time.perf_counter()
+    clashes = find_clashes(bookings)
+    swept = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = IntervalIndex(bookings)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    sample = rng.sample(bookings, 1000)
+    for booking in sample:
+        index.overlapping(booking._replace(ref=None))
+    per_check = (time.perf_counter() - start) / len(sample)
+
+    # Pairwise comparison, as a baseline, on a slice that keeps it quick
+    subset = bookings[:3000]
+    start = time.perf_counter()
+    naive = sum(1 for i, a in enumerate(subset) for b in subset[i + 1:]
+                for resource in set(a.resources) & set(b.resources) if a.start < b.end and b.start < a.end)
+    pairwise = time.perf_counter() - start
+    assert naive == len(find_clashes(subset))
+
+    print(f'{len(bookings)} slots: term check {swept * 1000:.0f} ms ({len(clashes)} clashes), '
+          f'index built in {built * 1000:.0f} ms, {per_check * 1e6:.0f} us per slot check; '
+          f'pairwise on {len(subset)} slots {pairwise * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    _benchmark()
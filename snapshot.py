@@ -0,0 +1,295 @@
+"""Columnar snapshots of attendance and its student/course dimensions.
+
+One run streams the `attendance`, `students` and `courses` collections once
+and writes them as NumPy .npy column files that can be memory-mapped, so
+reports and analytics can read them with no Firestore reads:
+
+    snapshots/
+      LATEST                          name of the newest complete snapshot
+      20241019T020000Z/
+        manifest.json                 row counts, partitions, columns
+        attendance/semester=SEM1/     one directory per semester
+          subject.npy                 int32 codes ...
+          subject.dict.npy            ... into this array of values
+          day.npy                     datetime64[D]
+          timestamp.npy               datetime64[ms]
+        students/
+        courses/
+
+Low-cardinality strings (department, subject, student id, ...) are
+dictionary encoded, which is where most of the size saving comes from;
+the files are left uncompressed so they can be mapped straight into memory.
+Snapshots are written to a temporary directory and renamed into place, so
+readers never see a partial one.
+
+Usage: python snapshot.py [--out DIR] [--keep N]
+Run it by hand or from cron, e.g. nightly.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', Path(__file__).resolve().parent / 'snapshots'))
+LATEST_FILE = 'LATEST'
+MANIFEST_NAME = 'manifest.json'
+UNKNOWN_PARTITION = 'unknown'
+
+# Columns per table: name -> kind. 'dict' columns are dictionary encoded,
+# 'str' columns are stored as plain fixed-width strings.
+ATTENDANCE_COLUMNS = {
+    'id': 'str',
+    'student_id': 'dict',
+    'student_email': 'dict',
+    'department': 'dict',
+    'year': 'dict',
+    'subject': 'dict',
+    'day': 'day',
+    'timestamp': 'timestamp',
+}
+STUDENT_COLUMNS = {
+    'id': 'str',
+    'email': 'str',
+    'name': 'str',
+    'department': 'dict',
+    'year': 'dict',
+    'semester': 'dict',
+}
+COURSE_COLUMNS = {
+    'id': 'str',
+    'code': 'str',
+    'name': 'str',
+    'department': 'dict',
+    'semester': 'dict',
+    'faculty': 'dict',
+    'credits': 'float',
+}
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        # Firestore returns aware UTC datetimes; store naive UTC
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value / 1000)
+    return None
+
+
+def partition_directory(semester):
+    """Directory name of a semester's partition; stored values are escaped, so '/' or '..' stay inside it."""
+    return f"semester={quote(semester, safe='')}"
+
+
+def _attendance_row(doc):
+    """The snapshot row of an attendance document; None if its date is malformed."""
+    data = doc.to_dict()
+    timestamp = _as_datetime(data.get('timestamp'))
+    day = data.get('date') or (timestamp.strftime('%Y-%m-%d') if timestamp else None)
+    if day:
+        try:
+            np.datetime64(day, 'D')
+        except (TypeError, ValueError):
+            return None
+    return {
+        'id': doc.id,
+        'student_id': data.get('student_id', ''),
+        'student_email': data.get('student_email', ''),
+        'department': data.get('department', ''),
+        'year': data.get('year', ''),
+        'semester': str(data.get('semester') or UNKNOWN_PARTITION),
+        'subject': data.get('subject', ''),
+        'day': day,
+        'timestamp': timestamp,
+    }
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def write_table(directory, columns, rows):
+    """Write `rows` (dicts) as one .npy file per column under `directory`."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, kind in columns.items():
+        values = [row.get(name) for row in rows]
+        if kind == 'dict':
+            dictionary, codes = np.unique(np.array([v or '' for v in values], dtype=str), return_inverse=True)
+            np.save(directory / f'{name}.npy', codes.astype(np.int32))
+            np.save(directory / f'{name}.dict.npy', dictionary)
+        elif kind == 'str':
+            np.save(directory / f'{name}.npy', np.array([v or '' for v in values], dtype=str))
+        elif kind == 'float':
+            np.save(directory / f'{name}.npy', np.array([_float(v) for v in values], dtype=np.float64))
+        elif kind == 'day':
+            np.save(directory / f'{name}.npy', np.array([v or 'NaT' for v in values], dtype='datetime64[D]'))
+        elif kind == 'timestamp':
+            np.save(directory / f'{name}.npy', np.array([v or 'NaT' for v in values], dtype='datetime64[ms]'))
+        else:
+            raise ValueError(f'Unknown column kind {kind!r}')
+
+
+class Table:
+    """Memory-mapped columns of one table or partition."""
+
+    def __init__(self, directory, columns):
+        self.directory = Path(directory)
+        self.columns = columns
+        self._cache = {}
+
+    def _load(self, filename):
+        if filename not in self._cache:
+            self._cache[filename] = np.load(self.directory / filename, mmap_mode='r')
+        return self._cache[filename]
+
+    def __len__(self):
+        first = next(iter(self.columns))
+        return len(self._load(f'{first}.npy'))
+
+    def codes(self, name):
+        """Dictionary codes of a 'dict' column."""
+        return self._load(f'{name}.npy')
+
+    def dictionary(self, name):
+        return self._load(f'{name}.dict.npy')
+
+    def code_of(self, name, value):
+        """Code of `value` in a 'dict' column, or -1 if it never occurs."""
+        dictionary = self.dictionary(name)
+        i = np.searchsorted(dictionary, value)
+        return int(i) if i < len(dictionary) and dictionary[i] == value else -1
+
+    def column(self, name, mask=None):
+        """Decoded values of a column, optionally only the rows in `mask`."""
+        values = self._load(f'{name}.npy')
+        if mask is not None:
+            values = values[mask]
+        if self.columns[name] == 'dict':
+            return self.dictionary(name)[values]
+        return np.asarray(values)
+
+
+class Snapshot:
+    """A complete snapshot directory written by create_snapshot()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+
+    @classmethod
+    def latest(cls, root=SNAPSHOT_DIR):
+        """The newest snapshot under `root`, or None if there is none yet."""
+        try:
+            name = (Path(root) / LATEST_FILE).read_text().strip()
+            return cls(Path(root) / name)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @property
+    def created_at(self):
+        return self.manifest['created_at']
+
+    @property
+    def semesters(self):
+        return list(self.manifest['attendance'])
+
+    def attendance(self, semester):
+        """Attendance rows for one semester, or None if there are none."""
+        if semester not in self.manifest['attendance']:
+            return None
+        return Table(self.path / 'attendance' / partition_directory(semester), ATTENDANCE_COLUMNS)
+
+    def students(self):
+        return Table(self.path / 'students', STUDENT_COLUMNS)
+
+    def courses(self):
+        return Table(self.path / 'courses', COURSE_COLUMNS)
+
+
+def create_snapshot(db, root=SNAPSHOT_DIR):
+    """Stream the collections out of Firestore and write a new snapshot."""
+    root = Path(root)
+    started = time.perf_counter()
+    created_at = datetime.now(timezone.utc)
+    name = created_at.strftime('%Y%m%dT%H%M%SZ')
+    staging = root / f'.{name}.tmp'
+    if staging.exists():
+        shutil.rmtree(staging)
+
+    partitions = {}
+    skipped = 0
+    for doc in db.collection('attendance').stream():
+        row = _attendance_row(doc)
+        if row is None:
+            skipped += 1
+            continue
+        partitions.setdefault(row['semester'], []).append(row)
+    for semester, rows in partitions.items():
+        write_table(staging / 'attendance' / partition_directory(semester), ATTENDANCE_COLUMNS, rows)
+
+    students = [dict(doc.to_dict(), id=doc.id) for doc in db.collection('students').stream()]
+    write_table(staging / 'students', STUDENT_COLUMNS, students)
+    courses = [dict(doc.to_dict(), id=doc.id) for doc in db.collection('courses').stream()]
+    write_table(staging / 'courses', COURSE_COLUMNS, courses)
+
+    manifest = {
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'attendance': {semester: len(rows) for semester, rows in sorted(partitions.items())},
+        'skipped_attendance': skipped,
+        'students': len(students),
+        'courses': len(courses),
+        'columns': {'attendance': ATTENDANCE_COLUMNS, 'students': STUDENT_COLUMNS, 'courses': COURSE_COLUMNS},
+    }
+    (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+    target = root / name
+    if target.exists():
+        # Two runs within the same second; never replace a snapshot in use
+        target = root / f'{name}-{time.time_ns()}'
+    staging.rename(target)
+    latest_tmp = root / f'.{LATEST_FILE}.tmp'
+    latest_tmp.write_text(target.name)
+    latest_tmp.replace(root / LATEST_FILE)
+
+    rows = sum(manifest['attendance'].values())
+    print(f"Snapshot {target.name}: {rows} attendance rows in {len(partitions)} semester partitions, "
+          f"{len(students)} students, {len(courses)} courses in {time.perf_counter() - started:.1f}s")
+    if skipped:
+        print(f"  {skipped} attendance documents skipped for a malformed date")
+    return Snapshot(target)
+
+
+def prune_snapshots(root=SNAPSHOT_DIR, keep=7):
+    """Delete all but the newest `keep` snapshots."""
+    root = Path(root)
+    snapshots = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for old in snapshots[:-keep] if keep > 0 else []:
+        shutil.rmtree(old)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a columnar snapshot of attendance, students and courses.')
+    parser.add_argument('--out', default=str(SNAPSHOT_DIR), help='snapshot root directory (default: %(default)s)')
+    parser.add_argument('--keep', type=int, default=7, help='number of snapshots to keep (default: %(default)s)')
+    args = parser.parse_args()
+
+    from firebase_setup import initialize_firebase
+    db = initialize_firebase()
+
+    root = Path(args.out)
+    root.mkdir(parents=True, exist_ok=True)
+    create_snapshot(db, root)
+    prune_snapshots(root, args.keep)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+// Edit attendance tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('attendance-editor', function(shared) {
+    const { loadModule } = shared;
+
+    // Edit Attendance Elements
+    const editAttendanceDate = document.getElementById('editAttendanceDate');
+    const editAttendanceDepartment = document.getElementById('editAttendanceDepartment');
+    const editAttendanceYear = document.getElementById('editAttendanceYear');
+    const editAttendanceSemester = document.getElementById('editAttendanceSemester');
+    const editAttendanceSubject = document.getElementById('editAttendanceSubject');
+    const loadAttendanceBtn = document.getElementById('loadAttendanceBtn');
+    const markAllPresentBtn = document.getElementById('markAllPresentBtn');
+    const saveAttendanceChangesBtn = document.getElementById('saveAttendanceChangesBtn');
+
+    let attendanceData = {
+        subject: '',
+        date: '',
+        department: '',
+        year: '',
+        students: []
+    };
+    let attendanceChanged = false;
+
+    // Filled in on first show; the roster comes from the students tab
+    let studentsModule = null;
+
+    if (editAttendanceDate) {
+        flatpickr("#editAttendanceDate", {
+            dateFormat: "Y-m-d",
+            defaultDate: new Date()
+        });
+    }
+
+    // Edit Attendance Functions
+    function loadAttendanceForEdit() {
+        const subject = document.getElementById('editAttendanceSubject').value;
+        const department = document.getElementById('editAttendanceDepartment').value;
+        const year = document.getElementById('editAttendanceYear').value;
+        const semester = document.getElementById('editAttendanceSemester').value;
+        const date = document.getElementById('editAttendanceDate').value;
+        
+        if (!subject || !date) {
+            alert('Please enter a subject and select a date');
+            return;
+        }
+        
+        // Store current filters
+        attendanceData = {
+            subject,
+            department,
+            year,
+            semester,
+            date,
+            students: []
+        };
+        
+        // Update info display
+        document.getElementById('attendanceSubjectInfo').textContent = subject;
+        document.getElementById('attendanceDateInfo').textContent = date;
+        
+        // Get students for the selected department and year
+        loadStudentsForAttendance(department, year);
+    }
+    
+    // Function to load students based on department and year
+    function loadStudentsForAttendance(department, year) {
+        if (!department || !year) {
+            // Clear the table if department or year is not selected
+            const table = document.getElementById('editAttendanceTable');
+            if (table) {
+                const tbody = table.querySelector('tbody');
+                tbody.innerHTML = `
+                    <tr>
+                        <td colspan="4" class="text-center">Please select department and year to view students</td>
+                    </tr>
+                `;
+            }
+            
+            // Reset attendance stats
+            document.getElementById('totalStudentsCount').textContent = '0';
+            document.getElementById('presentStudentsCount').textContent = '0';
+            document.getElementById('absentStudentsCount').textContent = '0';
+            document.getElementById('attendancePercentage').textContent = '0%';
+            
+            return;
+    }
+
+        // In a real app, this would fetch students from your API based on department and year
+        // For now, we'll filter from the student management tab's list
+        const allStudents = studentsModule ? studentsModule.getStudents() : [];
+        const studentsForClass = allStudents.filter(student => {
+            return (!department || student.department === department) && 
+                   (!year || student.year === year);
+        });
+        
+        // Generate attendance data with random status or get from existing records
+        attendanceData.students = studentsForClass.map(student => {
+            // Check if we already have attendance data for this student
+            const existingRecord = attendanceData.students.find(s => s.id === student.id);
+            
+            // If we have existing data, use it; otherwise, set as absent by default
+            const status = existingRecord ? existingRecord.status : 'absent';
+            
+            return {
+                id: student.id,
+                name: student.name,
+                email: student.email,
+                status: status
+            };
+        });
+        
+        displayAttendanceData();
+    }
+    
+    // Event listeners for department and year dropdowns in Edit Attendance section
+    if (editAttendanceDepartment) {
+        editAttendanceDepartment.addEventListener('change', function() {
+            const department = this.value;
+            const year = editAttendanceYear.value;
+            
+            if (department && year) {
+                loadStudentsForAttendance(department, year);
+            }
+        });
+    }
+    
+    if (editAttendanceYear) {
+        editAttendanceYear.addEventListener('change', function() {
+            const year = this.value;
+            const department = editAttendanceDepartment.value;
+            
+            if (department && year) {
+                loadStudentsForAttendance(department, year);
+            }
+        });
+    }
+
+    function displayAttendanceData() {
+        const table = document.getElementById('editAttendanceTable');
+        if (!table) return;
+        
+        const tbody = table.querySelector('tbody');
+        tbody.innerHTML = '';
+        
+        if (attendanceData.students.length === 0) {
+            tbody.innerHTML = `
+                <tr>
+                    <td colspan="4" class="text-center">No students found for the selected criteria</td>
+                </tr>
+            `;
+            return;
+        }
+        
+        attendanceData.students.forEach(student => {
+            tbody.innerHTML += `
+                <tr>
+                    <td>${student.name}</td>
+                    <td>${student.email}</td>
+                    <td>${student.status === 'present' ? 'Present' : 'Absent'}</td>
+                    <td>
+                        <div class="status-toggle" data-student-id="${student.id}">
+                            <button class="status-btn present ${student.status === 'present' ? 'active' : ''}">
+                                <i class="fas fa-check"></i> Present
+                            </button>
+                            <button class="status-btn absent ${student.status === 'absent' ? 'active' : ''}">
+                                <i class="fas fa-times"></i> Absent
+                            </button>
+                        </div>
+                    </td>
+                </tr>
+            `;
+        });
+
+        // Add event listeners to status toggle buttons
+        tbody.querySelectorAll('.status-toggle').forEach(toggle => {
+            const studentId = toggle.getAttribute('data-student-id');
+            const presentBtn = toggle.querySelector('.status-btn.present');
+            const absentBtn = toggle.querySelector('.status-btn.absent');
+            
+            presentBtn.addEventListener('click', function() {
+                updateStudentStatus(studentId, 'present');
+                presentBtn.classList.add('active');
+                absentBtn.classList.remove('active');
+            });
+            
+            absentBtn.addEventListener('click', function() {
+                updateStudentStatus(studentId, 'absent');
+                absentBtn.classList.add('active');
+                presentBtn.classList.remove('active');
+            });
+        });
+        
+        // Update attendance stats
+        updateAttendanceStats();
+    }
+    
+    function updateStudentStatus(studentId, status) {
+        const studentIndex = attendanceData.students.findIndex(s => s.id === studentId);
+        if (studentIndex !== -1) {
+            attendanceData.students[studentIndex].status = status;
+            attendanceChanged = true;
+            updateAttendanceStats();
+        }
+    }
+    
+    function updateAttendanceStats() {
+        const totalStudents = attendanceData.students.length;
+        const presentStudents = attendanceData.students.filter(s => s.status === 'present').length;
+        const absentStudents = totalStudents - presentStudents;
+        const attendancePercentage = totalStudents > 0 ? Math.round((presentStudents / totalStudents) * 100) : 0;
+        
+        document.getElementById('totalStudentsCount').textContent = totalStudents;
+        document.getElementById('presentStudentsCount').textContent = presentStudents;
+        document.getElementById('absentStudentsCount').textContent = absentStudents;
+        document.getElementById('attendancePercentage').textContent = `${attendancePercentage}%`;
+    }
+    
+    // Edit Attendance event listeners
+    if (loadAttendanceBtn) {
+        loadAttendanceBtn.addEventListener('click', function() {
+            loadAttendanceForEdit();
+        });
+    }
+    
+    if (markAllPresentBtn) {
+        markAllPresentBtn.addEventListener('click', function() {
+            attendanceData.students.forEach(student => {
+                student.status = 'present';
+            });
+            attendanceChanged = true;
+            displayAttendanceData();
+        });
+    }
+    
+    if (saveAttendanceChangesBtn) {
+        saveAttendanceChangesBtn.addEventListener('click', function() {
+            if (!attendanceChanged) {
+                alert('No changes to save');
+                return;
+            }
+            
+            // In a real app, this would call your API to save the changes
+            alert('Attendance changes saved successfully!');
+            attendanceChanged = false;
+        });
+    }
+
+    return {
+        onShow: () => loadModule('students').then(module => {
+            studentsModule = module;
+            return module.ensureLoaded();
+        })
+    };
+});
@@ -0,0 +1,130 @@
+// Course management tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('courses', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Course Management
+    const addCourseBtn = document.getElementById('addCourseBtn');
+    const manageCurriculumBtn = document.getElementById('manageCurriculumBtn');
+    const courseSearchInput = document.getElementById('courseSearchInput');
+    const courseDepartmentFilter = document.getElementById('courseDepartmentFilter');
+    const courseSemesterFilter = document.getElementById('courseSemesterFilter');
+    const coursesTable = document.getElementById('coursesTable');
+
+    // Course Management
+    async function loadCourseData() {
+        try {
+            const data = await api.get('/api/courses');
+            if (data.error) throw new Error(data.error);
+            
+            const tbody = coursesTable.querySelector('tbody');
+            tbody.innerHTML = '';
+            
+            data.courses.forEach(course => {
+                const row = document.createElement('tr');
+                row.innerHTML = `
+                    <td>${course.code}</td>
+                    <td>${course.name}</td>
+                    <td>${course.department}</td>
+                    <td>${course.credits}</td>
+                    <td>${course.semester}</td>
+                    <td>${course.faculty}</td>
+                    <td>
+                        <button class="btn-icon" onclick="editCourse('${course.code}')">
+                            <i class="fas fa-edit"></i>
+                        </button>
+                        <button class="btn-icon" onclick="deleteCourse('${course.code}')">
+                            <i class="fas fa-trash"></i>
+                        </button>
+                    </td>
+                `;
+                tbody.appendChild(row);
+            });
+        } catch (error) {
+            handleError(error, 'loadCourseData');
+        }
+    }
+
+    if (addCourseBtn) {
+        addCourseBtn.addEventListener('click', () => {
+            const content = `
+                <form id="courseForm">
+                    <div class="form-group">
+                        <label for="code">Course Code</label>
+                        <input type="text" id="code" name="code" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="name">Course Name</label>
+                        <input type="text" id="name" name="name" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="department">Department</label>
+                        <select id="department" name="department" required>
+                            <option value="">Select Department</option>
+                            <option value="AIDS">AI & Data Science</option>
+                            <option value="CY">Cyber Security</option>
+                            <option value="CSE">Computer Science</option>
+                            <option value="AIML">AI & Machine Learning</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="credits">Credits</label>
+                        <input type="number" id="credits" name="credits" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="semester">Semester</label>
+                        <select id="semester" name="semester" required>
+                            <option value="">Select Semester</option>
+                            <option value="SEM1">Semester 1</option>
+                            <option value="SEM2">Semester 2</option>
+                            <option value="SEM3">Semester 3</option>
+                            <option value="SEM4">Semester 4</option>
+                            <option value="SEM5">Semester 5</option>
+                            <option value="SEM6">Semester 6</option>
+                            <option value="SEM7">Semester 7</option>
+                            <option value="SEM8">Semester 8</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="faculty">Faculty</label>
+                        <select id="faculty" name="faculty" required>
+                            <option value="">Select Faculty</option>
+                        </select>
+                    </div>
+                </form>
+            `;
+            
+            showModal('Add New Course', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#courseForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['code', 'name', 'department', 'credits', 'semester', 'faculty']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    // Fetch existing faculty to populate the dropdown
+                    const facultyData = await api.get('/api/faculty');
+                    if (facultyData.error) throw new Error(facultyData.error);
+
+                    const facultyOptions = facultyData.faculty.map(f => `<option value="${f.email}">${f.name} (${f.email})</option>`).join('');
+                    modal.querySelector('#faculty').innerHTML = `<option value="">Select Faculty</option>${facultyOptions}`;
+
+                    const response = await api.post('/api/courses', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Course added successfully');
+                    loadCourseData();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'addCourse');
+                }
+            });
+        });
+    }
+
+    return {
+        onShow: loadCourseData
+    };
+});
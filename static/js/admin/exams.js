@@ -0,0 +1,110 @@
+// Examinations tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('exams', function(shared) {
+    const { api, loadAttendanceRecords, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Exam Management
+    const scheduleExamBtn = document.getElementById('scheduleExamBtn');
+    const manageSeatingBtn = document.getElementById('manageSeatingBtn');
+    const assignInvigilatorsBtn = document.getElementById('assignInvigilatorsBtn');
+    const examType = document.getElementById('examType');
+    const examDepartment = document.getElementById('examDepartment');
+    const examStatus = document.getElementById('examStatus');
+    const examsTable = document.getElementById('examsTable');
+
+    if (scheduleExamBtn) {
+        scheduleExamBtn.addEventListener('click', () => {
+            const content = `
+                <form id="examForm">
+                    <div class="form-group">
+                        <label for="examType">Exam Type</label>
+                        <select id="examType" name="examType" required>
+                            <option value="">Select Exam Type</option>
+                            <option value="Midterm">Midterm</option>
+                            <option value="Final">Final</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="examDepartment">Department</label>
+                        <select id="examDepartment" name="examDepartment" required>
+                            <option value="">Select Department</option>
+                            <option value="AIDS">AI & Data Science</option>
+                            <option value="CY">Cyber Security</option>
+                            <option value="CSE">Computer Science</option>
+                            <option value="AIML">AI & Machine Learning</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="examYear">Year</label>
+                        <select id="examYear" name="examYear" required>
+                            <option value="">Select Year</option>
+                            <option value="FY">First Year</option>
+                            <option value="SY">Second Year</option>
+                            <option value="TY">Third Year</option>
+                            <option value="LY">Fourth Year</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="examSemester">Semester</label>
+                        <select id="examSemester" name="examSemester" required>
+                            <option value="">Select Semester</option>
+                            <option value="SEM1">Semester 1</option>
+                            <option value="SEM2">Semester 2</option>
+                            <option value="SEM3">Semester 3</option>
+                            <option value="SEM4">Semester 4</option>
+                            <option value="SEM5">Semester 5</option>
+                            <option value="SEM6">Semester 6</option>
+                            <option value="SEM7">Semester 7</option>
+                            <option value="SEM8">Semester 8</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="examDate">Date</label>
+                        <input type="date" id="examDate" name="examDate" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="examRoom">Room</label>
+                        <input type="text" id="examRoom" name="examRoom" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="examFaculty">Invigilator</label>
+                        <select id="examFaculty" name="examFaculty" required>
+                            <option value="">Select Invigilator</option>
+                        </select>
+                    </div>
+                </form>
+            `;
+
+            showModal('Schedule New Exam', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#examForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['examType', 'examDepartment', 'examYear', 'examSemester', 'examDate', 'examRoom', 'examFaculty']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    // Fetch existing faculty to populate the dropdown
+                    const facultyData = await api.get('/api/faculty');
+                    if (facultyData.error) throw new Error(facultyData.error);
+
+                    const facultyOptions = facultyData.faculty.map(f => `<option value="${f.email}">${f.name} (${f.email})</option>`).join('');
+                    modal.querySelector('#examFaculty').innerHTML = `<option value="">Select Invigilator</option>${facultyOptions}`;
+
+                    const response = await api.post('/api/exams', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Exam scheduled successfully');
+                    // Reload attendance records to show new exam
+                    loadAttendanceRecords();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'scheduleExam');
+                }
+            });
+        });
+    }
+
+    return {};
+});
@@ -0,0 +1,108 @@
+// Faculty management tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('faculty', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Faculty Management
+    const addFacultyBtn = document.getElementById('addFacultyBtn');
+    const importFacultyBtn = document.getElementById('importFacultyBtn');
+    const facultySearchInput = document.getElementById('facultySearchInput');
+    const facultyDepartmentFilter = document.getElementById('facultyDepartmentFilter');
+    const facultyStatusFilter = document.getElementById('facultyStatusFilter');
+    const facultyTable = document.getElementById('facultyTable');
+
+    // Faculty Management
+    async function loadFacultyData() {
+        try {
+            const data = await api.get('/api/faculty');
+            if (data.error) throw new Error(data.error);
+            
+            const tbody = facultyTable.querySelector('tbody');
+            tbody.innerHTML = '';
+            
+            data.faculty.forEach(faculty => {
+                const row = document.createElement('tr');
+                row.innerHTML = `
+                    <td>${faculty.name}</td>
+                    <td>${faculty.email}</td>
+                    <td>${faculty.department}</td>
+                    <td>${faculty.designation}</td>
+                    <td>${faculty.subjects}</td>
+                    <td><span class="status-badge ${faculty.status}">${faculty.status}</span></td>
+                    <td>
+                        <button class="btn-icon" onclick="editFaculty('${faculty.email}')">
+                            <i class="fas fa-edit"></i>
+                        </button>
+                        <button class="btn-icon" onclick="deleteFaculty('${faculty.email}')">
+                            <i class="fas fa-trash"></i>
+                        </button>
+                    </td>
+                `;
+                tbody.appendChild(row);
+            });
+        } catch (error) {
+            handleError(error, 'loadFacultyData');
+        }
+    }
+
+    // Event Listeners
+    if (addFacultyBtn) {
+        addFacultyBtn.addEventListener('click', () => {
+            const content = `
+                <form id="facultyForm">
+                    <div class="form-group">
+                        <label for="name">Name</label>
+                        <input type="text" id="name" name="name" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="email">Email</label>
+                        <input type="email" id="email" name="email" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="department">Department</label>
+                        <select id="department" name="department" required>
+                            <option value="">Select Department</option>
+                            <option value="AIDS">AI & Data Science</option>
+                            <option value="CY">Cyber Security</option>
+                            <option value="CSE">Computer Science</option>
+                            <option value="AIML">AI & Machine Learning</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="designation">Designation</label>
+                        <input type="text" id="designation" name="designation" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="subjects">Subjects</label>
+                        <input type="text" id="subjects" name="subjects" required>
+                    </div>
+                </form>
+            `;
+            
+            showModal('Add New Faculty', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#facultyForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['name', 'email', 'department', 'designation', 'subjects']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+                    
+                    const response = await api.post('/api/faculty', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Faculty added successfully');
+                    loadFacultyData();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'addFaculty');
+                }
+            });
+        });
+    }
+
+    return {
+        onShow: loadFacultyData
+    };
+});
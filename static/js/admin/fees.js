@@ -0,0 +1,101 @@
+// Fees tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('fees', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Fees Management
+    const generateChallanBtn = document.getElementById('generateChallanBtn');
+    const recordPaymentBtn = document.getElementById('recordPaymentBtn');
+    const feesReportBtn = document.getElementById('feesReportBtn');
+    const feesSearchInput = document.getElementById('feesSearchInput');
+    const feesDepartment = document.getElementById('feesDepartment');
+    const feesStatus = document.getElementById('feesStatus');
+    const feesTable = document.getElementById('feesTable');
+
+    if (generateChallanBtn) {
+        generateChallanBtn.addEventListener('click', () => {
+            const content = `
+                <form id="challanForm">
+                    <div class="form-group">
+                        <label for="challanDepartment">Department</label>
+                        <select id="challanDepartment" name="challanDepartment" required>
+                            <option value="">Select Department</option>
+                            <option value="AIDS">AI & Data Science</option>
+                            <option value="CY">Cyber Security</option>
+                            <option value="CSE">Computer Science</option>
+                            <option value="AIML">AI & Machine Learning</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="challanYear">Year</label>
+                        <select id="challanYear" name="challanYear" required>
+                            <option value="">Select Year</option>
+                            <option value="FY">First Year</option>
+                            <option value="SY">Second Year</option>
+                            <option value="TY">Third Year</option>
+                            <option value="LY">Fourth Year</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="challanSemester">Semester</label>
+                        <select id="challanSemester" name="challanSemester" required>
+                            <option value="">Select Semester</option>
+                            <option value="SEM1">Semester 1</option>
+                            <option value="SEM2">Semester 2</option>
+                            <option value="SEM3">Semester 3</option>
+                            <option value="SEM4">Semester 4</option>
+                            <option value="SEM5">Semester 5</option>
+                            <option value="SEM6">Semester 6</option>
+                            <option value="SEM7">Semester 7</option>
+                            <option value="SEM8">Semester 8</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="challanDate">Date</label>
+                        <input type="date" id="challanDate" name="challanDate" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="challanAmount">Amount</label>
+                        <input type="number" id="challanAmount" name="challanAmount" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="challanStudent">Student</label>
+                        <select id="challanStudent" name="challanStudent" required>
+                            <option value="">Select Student</option>
+                        </select>
+                    </div>
+                </form>
+            `;
+
+            showModal('Generate Fee Challan', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#challanForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['challanDepartment', 'challanYear', 'challanSemester', 'challanDate', 'challanAmount', 'challanStudent']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    // Fetch existing students to populate the dropdown
+                    const studentData = await api.get('/api/students');
+                    if (studentData.error) throw new Error(studentData.error);
+
+                    const studentOptions = studentData.students.map(s => `<option value="${s.email}">${s.name} (${s.email})</option>`).join('');
+                    modal.querySelector('#challanStudent').innerHTML = `<option value="">Select Student</option>${studentOptions}`;
+
+                    const response = await api.post('/api/challans', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Challan generated successfully');
+                    loadFeesData();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'generateChallan');
+                }
+            });
+        });
+    }
+
+    return {};
+});
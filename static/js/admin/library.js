@@ -0,0 +1,77 @@
+// Library tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('library', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Library Management
+    const addBookBtn = document.getElementById('addBookBtn');
+    const manageIssuedBtn = document.getElementById('manageIssuedBtn');
+    const generateReportBtn = document.getElementById('generateReportBtn');
+    const bookSearchInput = document.getElementById('bookSearchInput');
+    const bookCategory = document.getElementById('bookCategory');
+    const bookStatus = document.getElementById('bookStatus');
+    const libraryTable = document.getElementById('libraryTable');
+
+    if (addBookBtn) {
+        addBookBtn.addEventListener('click', () => {
+            const content = `
+                <form id="bookForm">
+                    <div class="form-group">
+                        <label for="bookTitle">Title</label>
+                        <input type="text" id="bookTitle" name="bookTitle" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="bookAuthor">Author</label>
+                        <input type="text" id="bookAuthor" name="bookAuthor">
+                    </div>
+                    <div class="form-group">
+                        <label for="bookCategory">Category</label>
+                        <select id="bookCategory" name="bookCategory" required>
+                            <option value="">Select Category</option>
+                            <option value="Computer Science">Computer Science</option>
+                            <option value="Mathematics">Mathematics</option>
+                            <option value="Physics">Physics</option>
+                            <option value="Chemistry">Chemistry</option>
+                            <option value="Biology">Biology</option>
+                            <option value="Electronics">Electronics</option>
+                            <option value="Others">Others</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="bookStatus">Status</label>
+                        <select id="bookStatus" name="bookStatus" required>
+                            <option value="">Select Status</option>
+                            <option value="Available">Available</option>
+                            <option value="Issued">Issued</option>
+                            <option value="Damaged">Damaged</option>
+                            <option value="Lost">Lost</option>
+                        </select>
+                    </div>
+                </form>
+            `;
+
+            showModal('Add New Book', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#bookForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['bookTitle', 'bookCategory', 'bookStatus']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    const response = await api.post('/api/books', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Book added successfully');
+                    loadLibraryData();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'addBook');
+                }
+            });
+        });
+    }
+
+    return {};
+});
@@ -0,0 +1,121 @@
+// Notifications tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('notifications', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Notifications Management
+    const createNotificationBtn = document.getElementById('createNotificationBtn');
+    const scheduleNotificationBtn = document.getElementById('scheduleNotificationBtn');
+    const notificationType = document.getElementById('notificationType');
+    const notificationStatus = document.getElementById('notificationStatus');
+    const notificationsList = document.querySelector('.notifications-list');
+
+    if (createNotificationBtn) {
+        createNotificationBtn.addEventListener('click', () => {
+            const content = `
+                <form id="notificationForm">
+                    <div class="form-group">
+                        <label for="notificationType">Type</label>
+                        <select id="notificationType" name="notificationType" required>
+                            <option value="">Select Type</option>
+                            <option value="Announcement">Announcement</option>
+                            <option value="Event">Event</option>
+                            <option value="Notice">Notice</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="notificationStatus">Status</label>
+                        <select id="notificationStatus" name="notificationStatus" required>
+                            <option value="">Select Status</option>
+                            <option value="Active">Active</option>
+                            <option value="Inactive">Inactive</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="notificationMessage">Message</label>
+                        <textarea id="notificationMessage" name="notificationMessage" rows="5" required></textarea>
+                    </div>
+                </form>
+            `;
+
+            showModal('Create New Notification', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#notificationForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['notificationType', 'notificationStatus', 'notificationMessage']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    const response = await api.post('/api/notifications', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Notification created successfully');
+                    loadNotifications();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'createNotification');
+                }
+            });
+        });
+    }
+
+    if (scheduleNotificationBtn) {
+        scheduleNotificationBtn.addEventListener('click', () => {
+            const content = `
+                <form id="scheduleNotificationForm">
+                    <div class="form-group">
+                        <label for="scheduleNotificationType">Type</label>
+                        <select id="scheduleNotificationType" name="scheduleNotificationType" required>
+                            <option value="">Select Type</option>
+                            <option value="Announcement">Announcement</option>
+                            <option value="Event">Event</option>
+                            <option value="Notice">Notice</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="scheduleNotificationStatus">Status</label>
+                        <select id="scheduleNotificationStatus" name="scheduleNotificationStatus" required>
+                            <option value="">Select Status</option>
+                            <option value="Active">Active</option>
+                            <option value="Inactive">Inactive</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="scheduleNotificationMessage">Message</label>
+                        <textarea id="scheduleNotificationMessage" name="scheduleNotificationMessage" rows="5" required></textarea>
+                    </div>
+                    <div class="form-group">
+                        <label for="scheduleNotificationDate">Date</label>
+                        <input type="date" id="scheduleNotificationDate" name="scheduleNotificationDate" required>
+                    </div>
+                </form>
+            `;
+
+            showModal('Schedule New Notification', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#scheduleNotificationForm');
+                    const formData = Object.fromEntries(new FormData(form));
+                    
+                    const errors = validateForm(formData, ['scheduleNotificationType', 'scheduleNotificationStatus', 'scheduleNotificationMessage', 'scheduleNotificationDate']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    const response = await api.post('/api/scheduled-notifications', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Notification scheduled successfully');
+                    loadNotifications();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'scheduleNotification');
+                }
+            });
+        });
+    }
+
+    return {};
+});
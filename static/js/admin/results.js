@@ -0,0 +1,97 @@
+// Results tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('results', function(shared) {
+    const { api, loadAttendanceRecords, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Results Management
+    const uploadResultsBtn = document.getElementById('uploadResultsBtn');
+    const generateGradesBtn = document.getElementById('generateGradesBtn');
+    const publishResultsBtn = document.getElementById('publishResultsBtn');
+    const resultsDepartment = document.getElementById('resultsDepartment');
+    const resultsExamType = document.getElementById('resultsExamType');
+    const resultsStatus = document.getElementById('resultsStatus');
+    const resultsTable = document.getElementById('resultsTable');
+
+    if (uploadResultsBtn) {
+        uploadResultsBtn.addEventListener('click', () => {
+            const content = `
+                <form id="resultsForm">
+                    <div class="form-group">
+                        <label for="resultsDepartment">Department</label>
+                        <select id="resultsDepartment" name="resultsDepartment" required>
+                            <option value="">Select Department</option>
+                            <option value="AIDS">AI & Data Science</option>
+                            <option value="CY">Cyber Security</option>
+                            <option value="CSE">Computer Science</option>
+                            <option value="AIML">AI & Machine Learning</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="resultsExamType">Exam Type</label>
+                        <select id="resultsExamType" name="resultsExamType" required>
+                            <option value="">Select Exam Type</option>
+                            <option value="Midterm">Midterm</option>
+                            <option value="Final">Final</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="resultsYear">Year</label>
+                        <select id="resultsYear" name="resultsYear" required>
+                            <option value="">Select Year</option>
+                            <option value="FY">First Year</option>
+                            <option value="SY">Second Year</option>
+                            <option value="TY">Third Year</option>
+                            <option value="LY">Fourth Year</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="resultsSemester">Semester</label>
+                        <select id="resultsSemester" name="resultsSemester" required>
+                            <option value="">Select Semester</option>
+                            <option value="SEM1">Semester 1</option>
+                            <option value="SEM2">Semester 2</option>
+                            <option value="SEM3">Semester 3</option>
+                            <option value="SEM4">Semester 4</option>
+                            <option value="SEM5">Semester 5</option>
+                            <option value="SEM6">Semester 6</option>
+                            <option value="SEM7">Semester 7</option>
+                            <option value="SEM8">Semester 8</option>
+                        </select>
+                    </div>
+                    <div class="form-group">
+                        <label for="resultsDate">Date</label>
+                        <input type="date" id="resultsDate" name="resultsDate" required>
+                    </div>
+                    <div class="form-group">
+                        <label for="resultsFile">Results File (CSV)</label>
+                        <input type="file" id="resultsFile" name="resultsFile" accept=".csv" required>
+                    </div>
+                </form>
+            `;
+
+            showModal('Upload Results', content, async (modal) => {
+                try {
+                    const form = modal.querySelector('#resultsForm');
+                    const formData = new FormData(form);
+                    
+                    const errors = validateForm(Object.fromEntries(formData), ['resultsDepartment', 'resultsExamType', 'resultsYear', 'resultsSemester', 'resultsDate', 'resultsFile']);
+                    if (errors.length > 0) {
+                        showNotification(errors.join('\n'), 'error');
+                        return;
+                    }
+
+                    const response = await api.post('/api/results', formData);
+                    if (response.error) throw new Error(response.error);
+                    
+                    showNotification('Results uploaded successfully');
+                    // Reload attendance records to show new results
+                    loadAttendanceRecords();
+                    modal.remove();
+                } catch (error) {
+                    handleError(error, 'uploadResults');
+                }
+            });
+        });
+    }
+
+    return {};
+});
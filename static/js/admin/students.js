@@ -0,0 +1,447 @@
+// Student management tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('students', function(shared) {
+    const { yearToSemesters, semesterNames } = shared;
+
+    // Student Management Elements
+    const addStudentBtn = document.getElementById('addStudentBtn');
+    const importStudentsBtn = document.getElementById('importStudentsBtn');
+    const studentModal = document.getElementById('studentModal');
+    const closeModalBtn = document.querySelector('.close-modal');
+    const saveStudentBtn = document.getElementById('saveStudentBtn');
+    const cancelStudentBtn = document.getElementById('cancelStudentBtn');
+    const studentForm = document.getElementById('studentForm');
+    const studentSearchInput = document.getElementById('studentSearchInput');
+    const studentDepartmentFilter = document.getElementById('studentDepartmentFilter');
+    const studentYearFilter = document.getElementById('studentYearFilter');
+    const studentYear = document.getElementById('studentYear');
+    const studentSemester = document.getElementById('studentSemester');
+    const studentPassword = document.getElementById('studentPassword');
+    const passwordRequired = document.getElementById('passwordRequired');
+
+    let allStudents = [];
+    let filteredStudents = [];
+    let currentStudentPage = 1;
+    let studentsPerPage = 10;
+
+    // Student Management Functions
+    function loadStudents() {
+        // In a real app, this would fetch from your database
+        // For now, we'll use mock data or fetch from Firebase
+        return fetch('/api/admin/students')
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    console.error('Error loading students:', data.error);
+                    return;
+                }
+                
+                allStudents = data.students || [];
+                applyStudentFilters();
+            })
+            .catch(error => {
+                console.error('Error loading students:', error);
+                // For demo purposes, load mock data
+                allStudents = getMockStudents();
+                applyStudentFilters();
+            });
+    }
+    
+    function getMockStudents() {
+        // Mock student data for demonstration
+        return [
+            { id: '1', name: 'John Doe', email: 'john.doe@example.com', department: 'CSE', year: 'FY', semester: 'SEM1' },
+            { id: '2', name: 'Jane Smith', email: 'jane.smith@example.com', department: 'ECE', year: 'SY', semester: 'SEM3' },
+            { id: '3', name: 'Bob Johnson', email: 'bob.johnson@example.com', department: 'ME', year: 'TY', semester: 'SEM5' },
+            { id: '4', name: 'Alice Brown', email: 'alice.brown@example.com', department: 'CSE', year: 'LY', semester: 'SEM7' },
+            { id: '5', name: 'Charlie Wilson', email: 'charlie.wilson@example.com', department: 'AIDS', year: 'FY', semester: 'SEM1' },
+            { id: '6', name: 'Diana Miller', email: 'diana.miller@example.com', department: 'CE', year: 'SY', semester: 'SEM3' },
+            { id: '7', name: 'Edward Davis', email: 'edward.davis@example.com', department: 'CSE', year: 'TY', semester: 'SEM5' },
+            { id: '8', name: 'Fiona Garcia', email: 'fiona.garcia@example.com', department: 'ECE', year: 'LY', semester: 'SEM7' },
+            { id: '9', name: 'George Martinez', email: 'george.martinez@example.com', department: 'ME', year: 'FY', semester: 'SEM1' },
+            { id: '10', name: 'Hannah Robinson', email: 'hannah.robinson@example.com', department: 'CSE', year: 'SY', semester: 'SEM3' },
+            { id: '11', name: 'Ian Clark', email: 'ian.clark@example.com', department: 'AIDS', year: 'TY', semester: 'SEM5' },
+            { id: '12', name: 'Julia Lewis', email: 'julia.lewis@example.com', department: 'CE', year: 'LY', semester: 'SEM7' }
+        ];
+    }
+    
+    function applyStudentFilters() {
+        const searchTerm = studentSearchInput ? studentSearchInput.value.toLowerCase() : '';
+        const departmentFilter = studentDepartmentFilter ? studentDepartmentFilter.value : '';
+        const yearFilter = studentYearFilter ? studentYearFilter.value : '';
+        
+        filteredStudents = allStudents.filter(student => {
+            const matchesSearch = !searchTerm || 
+                student.name.toLowerCase().includes(searchTerm) || 
+                student.email.toLowerCase().includes(searchTerm);
+                
+            const matchesDepartment = !departmentFilter || student.department === departmentFilter;
+            const matchesYear = !yearFilter || student.year === yearFilter;
+            
+            return matchesSearch && matchesDepartment && matchesYear;
+        });
+        
+        displayStudents(1);
+    }
+    
+    function displayStudents(page) {
+        const studentsTable = document.getElementById('studentsTable');
+        if (!studentsTable) return;
+        
+        const tbody = studentsTable.querySelector('tbody');
+        const startIndex = (page - 1) * studentsPerPage;
+        const endIndex = startIndex + studentsPerPage;
+        const studentsToShow = filteredStudents.slice(startIndex, endIndex);
+        
+        tbody.innerHTML = '';
+        
+        if (studentsToShow.length === 0) {
+            tbody.innerHTML = `
+                <tr>
+                    <td colspan="5" class="text-center">No students found</td>
+                </tr>
+            `;
+            return;
+        }
+        
+        studentsToShow.forEach(student => {
+            tbody.innerHTML += `
+                <tr>
+                    <td>${student.name}</td>
+                    <td>${student.email}</td>
+                    <td>${student.department}</td>
+                    <td>${student.year}</td>
+                    <td>${student.semester}</td>
+                    <td>
+                        <div class="action-buttons">
+                            <button class="action-btn edit" data-id="${student.id}">
+                                <i class="fas fa-edit"></i>
+                            </button>
+                            <button class="action-btn delete" data-id="${student.id}">
+                                <i class="fas fa-trash"></i>
+                            </button>
+                        </div>
+                        </td>
+                    </tr>
+                `;
+            });
+        
+        // Add event listeners to action buttons
+        tbody.querySelectorAll('.action-btn.edit').forEach(btn => {
+            btn.addEventListener('click', function() {
+                const studentId = this.getAttribute('data-id');
+                editStudent(studentId);
+            });
+        });
+        
+        tbody.querySelectorAll('.action-btn.delete').forEach(btn => {
+            btn.addEventListener('click', function() {
+                const studentId = this.getAttribute('data-id');
+                deleteStudent(studentId);
+            });
+        });
+        
+        // Update pagination
+        currentStudentPage = page;
+        const totalStudentPages = Math.ceil(filteredStudents.length / studentsPerPage);
+        const studentsPageInfo = document.getElementById('studentsPageInfo');
+        if (studentsPageInfo) {
+            studentsPageInfo.textContent = `Page ${currentStudentPage} of ${totalStudentPages || 1}`;
+        }
+        
+        const studentsPrevPage = document.getElementById('studentsPrevPage');
+        const studentsNextPage = document.getElementById('studentsNextPage');
+        
+        if (studentsPrevPage) {
+            studentsPrevPage.disabled = currentStudentPage <= 1;
+            if (studentsPrevPage.disabled) {
+                studentsPrevPage.classList.add('disabled');
+            } else {
+                studentsPrevPage.classList.remove('disabled');
+            }
+        }
+        
+        if (studentsNextPage) {
+            studentsNextPage.disabled = currentStudentPage >= totalStudentPages;
+            if (studentsNextPage.disabled) {
+                studentsNextPage.classList.add('disabled');
+            } else {
+                studentsNextPage.classList.remove('disabled');
+            }
+        }
+    }
+    
+    // Student pagination controls
+    document.getElementById('studentsPrevPage')?.addEventListener('click', function() {
+        if (currentStudentPage > 1) {
+            displayStudents(currentStudentPage - 1);
+        }
+    });
+    
+    document.getElementById('studentsNextPage')?.addEventListener('click', function() {
+        const totalStudentPages = Math.ceil(filteredStudents.length / studentsPerPage);
+        if (currentStudentPage < totalStudentPages) {
+            displayStudents(currentStudentPage + 1);
+        }
+    });
+    
+    // Student search and filters
+    if (studentSearchInput) {
+        studentSearchInput.addEventListener('input', function() {
+            applyStudentFilters();
+        });
+    }
+    
+    if (studentDepartmentFilter) {
+        studentDepartmentFilter.addEventListener('change', function() {
+            applyStudentFilters();
+        });
+    }
+    
+    if (studentYearFilter) {
+        studentYearFilter.addEventListener('change', function() {
+            applyStudentFilters();
+        });
+    }
+    
+    // Student modal functions
+    function openStudentModal(title = 'Add New Student', student = null) {
+        if (!studentModal) return;
+        
+        document.getElementById('studentModalTitle').textContent = title;
+        document.getElementById('studentId').value = student ? student.id : '';
+        document.getElementById('studentName').value = student ? student.name : '';
+        document.getElementById('studentEmail').value = student ? student.email : '';
+        document.getElementById('studentDepartment').value = student ? student.department : '';
+        document.getElementById('studentYear').value = student ? student.year : '';
+        
+        // Reset and populate semester dropdown based on year
+        const selectedYear = student ? student.year : '';
+        populateStudentSemester(selectedYear);
+        
+        if (student && student.semester) {
+            document.getElementById('studentSemester').value = student.semester;
+        }
+        
+        document.getElementById('studentPassword').value = '';
+        
+        // Password is required for new students, optional for editing
+        if (student) {
+            studentPassword.required = false;
+            passwordRequired.style.display = 'none';
+            studentPassword.placeholder = 'Leave blank to keep unchanged';
+        } else {
+            studentPassword.required = true;
+            passwordRequired.style.display = 'inline';
+            studentPassword.placeholder = 'Minimum 6 characters';
+        }
+        
+        studentModal.style.display = 'block';
+    }
+    
+    // Populate semester dropdown based on selected year
+    function populateStudentSemester(year) {
+        if (!studentSemester) return;
+        
+        // Clear current options
+        studentSemester.innerHTML = '<option value="">Select Semester</option>';
+        
+        if (!year) return;
+        
+        // Get semesters for the selected year
+        const semesters = yearToSemesters[year] || [];
+        
+        // Add options to semester dropdown
+        semesters.forEach(sem => {
+            const option = document.createElement('option');
+            option.value = sem;
+            option.textContent = semesterNames[sem];
+            studentSemester.appendChild(option);
+        });
+    }
+    
+    // Add event listener for year dropdown to populate semester options
+    if (studentYear) {
+        studentYear.addEventListener('change', function() {
+            populateStudentSemester(this.value);
+        });
+    }
+    
+    function closeStudentModal() {
+        if (!studentModal) return;
+        studentModal.style.display = 'none';
+        studentForm.reset();
+    }
+    
+    function editStudent(studentId) {
+        const student = allStudents.find(s => s.id === studentId);
+        if (student) {
+            openStudentModal('Edit Student', student);
+        }
+    }
+    
+    function deleteStudent(studentId) {
+        if (confirm('Are you sure you want to delete this student?')) {
+            // Call the API to delete the student
+            fetch(`/api/admin/students/${studentId}`, {
+                method: 'DELETE'
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Remove from our arrays
+                    allStudents = allStudents.filter(s => s.id !== studentId);
+                    applyStudentFilters(); // This will update the table
+                    alert('Student deleted successfully');
+                } else {
+                    alert(data.error || 'Error deleting student');
+                }
+            })
+            .catch(error => {
+                console.error('Error deleting student:', error);
+                alert('Error deleting student. Please try again.');
+            });
+        }
+    }
+    
+    // Student modal event listeners
+    if (addStudentBtn) {
+        addStudentBtn.addEventListener('click', function() {
+            openStudentModal();
+        });
+    }
+    
+    if (closeModalBtn) {
+        closeModalBtn.addEventListener('click', closeStudentModal);
+    }
+    
+    if (cancelStudentBtn) {
+        cancelStudentBtn.addEventListener('click', closeStudentModal);
+    }
+    
+    if (saveStudentBtn) {
+        saveStudentBtn.addEventListener('click', function() {
+            const studentId = document.getElementById('studentId').value;
+            const name = document.getElementById('studentName').value;
+            const email = document.getElementById('studentEmail').value;
+            const department = document.getElementById('studentDepartment').value;
+            const year = document.getElementById('studentYear').value;
+            const semester = document.getElementById('studentSemester').value;
+            const password = document.getElementById('studentPassword').value;
+            
+            if (!name || !email || !department || !year || !semester) {
+                alert('Please fill in all required fields');
+                return;
+            }
+            
+            if (!studentId && !password) {
+                alert('Password is required for new students');
+                return;
+            }
+            
+            if (password && password.length < 6) {
+                alert('Password must be at least 6 characters long');
+                return;
+            }
+            
+            // Prepare data for API call
+            const studentData = {
+                name,
+                email,
+                department,
+                year,
+                semester
+            };
+            
+            if (password) {
+                studentData.password = password;
+            }
+            
+            // Show loading state
+            saveStudentBtn.disabled = true;
+            saveStudentBtn.textContent = 'Saving...';
+            
+            if (studentId) {
+                // Update existing student
+                fetch(`/api/admin/students/${studentId}`, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(studentData)
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        // Update student in our array
+                        const studentIndex = allStudents.findIndex(s => s.id === studentId);
+                        if (studentIndex !== -1) {
+                            allStudents[studentIndex] = {
+                                ...allStudents[studentIndex],
+                                name,
+                                email,
+                                department,
+                                year,
+                                semester
+                            };
+                        }
+                        closeStudentModal();
+                        applyStudentFilters(); // Update the table
+                        alert('Student updated successfully');
+                    } else {
+                        alert(data.error || 'Error updating student');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error updating student:', error);
+                    alert('Error updating student. Please try again.');
+                })
+                .finally(() => {
+                    saveStudentBtn.disabled = false;
+                    saveStudentBtn.textContent = 'Save Student';
+                });
+            } else {
+                // Add new student
+                fetch('/api/admin/students', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(studentData)
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        // Add new student to our array
+                        allStudents.push(data.student);
+                        closeStudentModal();
+                        applyStudentFilters(); // Update the table
+                        alert('Student added successfully');
+                    } else {
+                        alert(data.error || 'Error adding student');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error adding student:', error);
+                    alert('Error adding student. Please try again.');
+                })
+                .finally(() => {
+                    saveStudentBtn.disabled = false;
+                    saveStudentBtn.textContent = 'Save Student';
+                });
+            }
+        });
+    }
+    
+    if (importStudentsBtn) {
+        importStudentsBtn.addEventListener('click', function() {
+            alert('Import Students feature will be implemented in a future update.');
+        });
+    }
+
+    return {
+        onShow: loadStudents,
+        getStudents: () => allStudents,
+        // Resolves once the student list has been fetched at least once
+        ensureLoaded: () => allStudents.length ? Promise.resolve() : loadStudents()
+    };
+});
@@ -0,0 +1,79 @@
+// Timetable tab of the admin dashboard, loaded the first time the tab is opened.
+AdminDashboard.register('timetable', function(shared) {
+    const { api, handleError, showModal, showNotification, validateForm } = shared;
+
+    // Timetable Management
+    const generateTimetableBtn = document.getElementById('generateTimetableBtn');
+    const editTimetableBtn = document.getElementById('editTimetableBtn');
+    const publishTimetableBtn = document.getElementById('publishTimetableBtn');
+    const timetableDepartment = document.getElementById('timetableDepartment');
+    const timetableYear = document.getElementById('timetableYear');
+    const timetableSemester = document.getElementById('timetableSemester');
+    const timetableGrid = document.querySelector('.timetable-grid');
+
+    // Timetable Management
+    async function loadTimetable() {
+        try {
+            const department = timetableDepartment.value;
+            const year = timetableYear.value;
+            const semester = timetableSemester.value;
+            
+            if (!department || !year || !semester) {
+                showNotification('Please select department, year, and semester', 'error');
+                return;
+            }
+            
+            const data = await api.get(`/api/timetable?department=${department}&year=${year}&semester=${semester}`);
+            if (data.error) throw new Error(data.error);
+            
+            generateTimetable(data.timetable);
+        } catch (error) {
+            handleError(error, 'loadTimetable');
+        }
+    }
+
+    function generateTimetable(data = []) {
+        const days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'];
+        const slots = ['9:00 AM', '10:00 AM', '11:00 AM', '12:00 PM', '2:00 PM', '3:00 PM', '4:00 PM'];
+        
+        timetableGrid.innerHTML = '';
+        
+        // Add header row
+        days.forEach(day => {
+            const header = document.createElement('div');
+            header.className = 'timetable-header';
+            header.textContent = day;
+            timetableGrid.appendChild(header);
+        });
+        
+        // Add time slots
+        slots.forEach(slot => {
+            days.forEach(day => {
+                const slotData = data.find(d => d.day === day && d.time === slot);
+                const slotDiv = document.createElement('div');
+                slotDiv.className = `timetable-slot ${slotData ? 'occupied' : ''}`;
+                slotDiv.innerHTML = `
+                    <div class="slot-time">${slot}</div>
+                    <div class="slot-content">
+                        ${slotData ? `
+                            <div class="slot-subject">${slotData.subject}</div>
+                            <div class="slot-faculty">${slotData.faculty}</div>
+                            <div class="slot-room">${slotData.room}</div>
+                        ` : ''}
+                    </div>
+                `;
+                timetableGrid.appendChild(slotDiv);
+            });
+        });
+    }
+
+    if (generateTimetableBtn) {
+        generateTimetableBtn.addEventListener('click', () => {
+            loadTimetable();
+        });
+    }
+
+    return {
+        onShow: loadTimetable
+    };
+});
@@ -1,3 +1,22 @@
+// Exchange email/password for a Firebase ID token via the Identity Toolkit REST API
+async function getFirebaseIdToken(email, password) {
+    const response = await fetch(
+        `https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key=${window.FIREBASE_API_KEY}`,
+        {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ email, password, returnSecureToken: true })
+        }
+    );
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error('Invalid email or password');
+    }
+    return data.idToken;
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const loginForm = document.getElementById('loginForm');
     const tabButtons = document.querySelectorAll('.tab-btn');
@@ -22,15 +41,27 @@ document.addEventListener('DOMContentLoaded', function() {
         e.preventDefault();
         errorMessage.textContent = ''; // Clear any previous error
 
-        const formData = {
-            username: loginForm.username.value,
-            password: loginForm.password.value,
-            role: roleInput.value
-        };
-
-        console.log('Attempting login with:', formData);
+        const role = roleInput.value;
+        let formData;
 
         try {
+            if (window.FIREBASE_API_KEY) {
+                // Sign in with Firebase and send only the ID token to the server
+                try {
+                    const idToken = await getFirebaseIdToken(loginForm.username.value, loginForm.password.value);
+                    formData = { idToken, role };
+                } catch (error) {
+                    errorMessage.textContent = error.message;
+                    return;
+                }
+            } else {
+                formData = {
+                    username: loginForm.username.value,
+                    password: loginForm.password.value,
+                    role
+                };
+            }
+
             const response = await fetch('/auth/login', {
                 method: 'POST',
                 headers: {
@@ -44,7 +75,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             if (response.ok) {
                 // Redirect based on role
-                if (formData.role === 'admin') {
+                if (role === 'admin') {
                     window.location.href = '/admin/dashboard';
                 } else {
                     window.location.href = '/student/dashboard';